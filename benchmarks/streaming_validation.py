@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+__author__ = 'walzer'
+import gc
+import os
+import copy
+import json
+import time
+import tempfile
+import tracemalloc
+import warnings
+import click
+from mzqc.MZQCFile import JsonSerialisable as mzqc_io
+from mzqc.SemanticCheck import SemanticCheck
+from mzqc.StreamReader import MzQcStreamReader
+
+"""
+    Benchmark of semantic validation of large mzQC documents, object graph vs. plain JSON vs. streaming
+
+    Reports wall time and peak (Python heap) memory of reading and semantically validating a
+    document (ontologies are loaded and indexed before measuring). Without a document argument,
+    the runs of tests/examples/local-runs.mzQC are replicated into a synthetic document.
+
+    python benchmarks/streaming_validation.py --synthetic 20000
+"""
+
+CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
+TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests', 'examples', 'local-runs.mzQC')
+
+def synthetic_mzqc(path: str, n_runs: int):
+    with open(TEMPLATE, 'r') as template:
+        document = json.load(template)
+    mzqc = document['mzQC']
+    runs = mzqc['runQualities']
+    mzqc['runQualities'] = list()
+    for i in range(n_runs):
+        run = copy.deepcopy(runs[i % len(runs)])
+        run['metadata']['label'] = "run_{}".format(i)
+        for input_file in run['metadata'].get('inputFiles', ()):
+            input_file['name'] = "run_{}".format(i)
+            input_file['location'] = "file:///data/run_{}.mzML".format(i)
+        mzqc['runQualities'].append(run)
+    with open(path, 'w') as out:
+        json.dump(document, out)
+
+def measure(validate, repeat: int):
+    timings = list()
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = validate()
+        timings.append(time.perf_counter() - start)
+        del result
+    gc.collect()
+    tracemalloc.start()
+    result = validate()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak, sum(len(v) for v in result.values())
+
+@click.command(context_settings=CONTEXT_SETTINGS,
+               short_help='Benchmarks semantic validation of large mzQC documents.')
+@click.argument('document', required=False)
+@click.option('--synthetic', default=5000, show_default=True,
+              help="number of runs of the synthetic document, if none given")
+@click.option('--repeat', default=3, show_default=True, help="timing repetitions (minimum reported)")
+def benchmark(document, synthetic, repeat):
+    """
+    Validates DOCUMENT (a local mzQC file) along all three paths and reports time and memory.
+    """
+    tmp = None
+    if not document:
+        tmp = tempfile.NamedTemporaryFile(suffix='.mzQC', delete=False)
+        tmp.close()
+        synthetic_mzqc(tmp.name, synthetic)
+        document = tmp.name
+    file_path = os.path.dirname(os.path.abspath(TEMPLATE if tmp else document))
+
+    def semantic(mzqc_obj):
+        sem_val = SemanticCheck(mzqc_obj=mzqc_obj, file_path=file_path)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            sem_val.validate(load_local=True)
+        return sem_val
+
+    def with_objects():
+        with open(document, 'r') as f:
+            return semantic(mzqc_io.from_json(f.read()))
+
+    def with_json():
+        with open(document, 'r') as f:
+            return semantic(json.load(f))
+
+    def with_streaming():
+        return semantic(MzQcStreamReader(document))
+
+    try:
+        with_streaming()  # warms the vocabulary caches
+        click.echo("{:<10} {:>10} {:>12} {:>8}".format("path", "time [s]", "peak [MiB]", "issues"))
+        for name, validate in (("objects", with_objects), ("json", with_json), ("streaming", with_streaming)):
+            seconds, peak, n = measure(validate, repeat)
+            click.echo("{:<10} {:>10.3f} {:>12.1f} {:>8}".format(name, seconds, peak/2**20, n))
+    finally:
+        if tmp is not None:
+            os.remove(tmp.name)
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+__author__ = 'walzer'
+import gc
+import os
+import time
+import random
+import tempfile
+import tracemalloc
+import warnings
+import click
+from mzqc import OboLoader
+from mzqc.VocabularyIndex import VocabularyIndex
+
+"""
+    Benchmark of ontology loading for validation, pronto vs. the lightweight OboLoader
+
+    Reports wall time, peak, and retained (Python heap) memory of loading an ontology and
+    compiling it into a VocabularyIndex. Without an ontology argument, a synthetic OBO file
+    resembling PSI-MS is generated. N.B.: tracemalloc does not see memory allocated natively
+    (i.e. by pronto's fastobo parser), so pronto's peak is a lower bound.
+
+    python benchmarks/vocabulary_loading.py psi-ms.obo
+"""
+
+CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
+
+def synthetic_obo(path: str, n_terms: int, seed: int = 42):
+    rng = random.Random(seed)
+    with open(path, 'w') as obo:
+        obo.write("format-version: 1.2\ndata-version: 0.0.1\nontology: ms\n\n")
+        for rel in ('has_units', 'has_column', 'has_optional_column', 'has_metric_category'):
+            obo.write("[Typedef]\nid: {r}\nname: {r}\n\n".format(r=rel))
+        for i in range(n_terms):
+            obo.write("[Term]\nid: MS:{:07d}\nname: synthetic term {}\n".format(i, i))
+            obo.write('def: "A synthetic term \\"number {}\\" for benchmarking." [PSI:MS]\n'.format(i))
+            obo.write("synonym: \"syn {}\" EXACT []\n".format(i))
+            if i:
+                obo.write("is_a: MS:{:07d} ! parent\n".format(rng.randrange(i)))
+            if i % 7 == 0 and i:
+                obo.write("relationship: has_units MS:{:07d} ! unit\n".format(rng.randrange(i)))
+            obo.write("\n")
+
+def measure(load, repeat: int):
+    timings = list()
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = load()
+        timings.append(time.perf_counter() - start)
+        del result
+    gc.collect()
+    tracemalloc.start()
+    result = load()
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak, retained, len(result)
+
+@click.command(context_settings=CONTEXT_SETTINGS,
+               short_help='Benchmarks ontology loading with pronto and the OboLoader.')
+@click.argument('ontology', required=False)
+@click.option('--synthetic', default=20000, show_default=True,
+              help="number of terms of the synthetic ontology, if none given")
+@click.option('--repeat', default=3, show_default=True, help="timing repetitions (minimum reported)")
+def benchmark(ontology, synthetic, repeat):
+    """
+    Loads ONTOLOGY (path or URL) with both backends and reports time and memory.
+    """
+    tmp = None
+    if not ontology:
+        tmp = tempfile.NamedTemporaryFile(suffix='.obo', delete=False)
+        tmp.close()
+        synthetic_obo(tmp.name, synthetic)
+        ontology = tmp.name
+
+    def with_pronto():
+        from pronto import Ontology
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return VocabularyIndex.from_ontology(Ontology(ontology, import_depth=0))
+
+    def with_oboloader():
+        return OboLoader.load_vocabulary(ontology)
+
+    try:
+        click.echo("{:<10} {:>10} {:>12} {:>14} {:>8}".format(
+            "backend", "time [s]", "peak [MiB]", "retained [MiB]", "terms"))
+        for name, load in (("pronto", with_pronto), ("oboloader", with_oboloader)):
+            seconds, peak, retained, n = measure(load, repeat)
+            click.echo("{:<10} {:>10.3f} {:>12.1f} {:>14.1f} {:>8}".format(
+                name, seconds, peak/2**20, retained/2**20, n))
+    finally:
+        if tmp is not None:
+            os.remove(tmp.name)
+
+if __name__ == '__main__':
+    benchmark()
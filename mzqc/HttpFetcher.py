@@ -0,0 +1,167 @@
+__author__ = 'walzer'
+import os
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# The shared HTTP layer for remote schemas and ontologies: one pooled session (connections to
+# e.g. GitHub or the OBO PURL server are kept alive between loads), retries with backoff for
+# transient errors, and conditional requests so cached documents are revalidated with a 304.
+
+DEFAULT_TIMEOUT = (5.0, 30.0)  # seconds to connect and between received bytes
+DEFAULT_RETRIES = 3
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+@dataclass(frozen=True)
+class FetchResult:
+    """Class for the response of a (conditional) fetch:
+        url: the requested URL
+        status: the HTTP status, 200 or 304 (not modified)
+        content: the document, None if not modified
+        etag: the ETag of the document, if sent by the server
+        last_modified: the Last-Modified date of the document, if sent by the server
+    """
+    url: str
+    status: int
+    content: Optional[bytes] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+def _env_timeout() -> Union[float, Tuple[float, float]]:
+    env_timeout = os.getenv('PYMZQC_HTTP_TIMEOUT')
+    if not env_timeout:
+        return DEFAULT_TIMEOUT
+    try:
+        return float(env_timeout)
+    except ValueError:
+        logging.warning("Ignoring invalid PYMZQC_HTTP_TIMEOUT '{}'".format(env_timeout))
+        return DEFAULT_TIMEOUT
+
+def _env_retries() -> int:
+    env_retries = os.getenv('PYMZQC_HTTP_RETRIES')
+    if not env_retries:
+        return DEFAULT_RETRIES
+    try:
+        return int(env_retries)
+    except ValueError:
+        logging.warning("Ignoring invalid PYMZQC_HTTP_RETRIES '{}'".format(env_retries))
+        return DEFAULT_RETRIES
+
+class HttpFetcher(object):
+    """
+    HttpFetcher Pooled HTTP(S) downloads with retries and conditional revalidation
+
+    All requests go through one `requests.Session`, which keeps connections to each host
+    alive for reuse (also between threads). Connection errors and transient server errors
+    (429 and 5xx) are retried with exponential backoff. Given the ETag or Last-Modified
+    date of a cached copy, `fetch` sends a conditional request, so an unchanged document
+    costs a 304 response instead of a download.
+
+    Timeout and retries default to the environment variables `PYMZQC_HTTP_TIMEOUT` (seconds)
+    and `PYMZQC_HTTP_RETRIES`, if set.
+
+    Parameters
+    ----------
+    timeout : Union[float, Tuple[float, float]], optional
+        seconds to wait for the server, or a (connect, read) tuple, by default (5, 30)
+    retries : int, optional
+        retries of failed requests, by default 3
+    backoff : float, optional
+        backoff factor between retries (0.5 waits 0.5s, 1s, 2s, ...), by default 0.5
+    pool_maxsize : int, optional
+        connections kept per host, by default 10
+    """
+    def __init__(self, timeout: Optional[Union[float, Tuple[float, float]]] = None,
+                 retries: Optional[int] = None, backoff: float = 0.5, pool_maxsize: int = 10):
+        self.timeout = _env_timeout() if timeout is None else timeout
+        self.retries = _env_retries() if retries is None else retries
+        self.backoff = backoff
+        self.pool_maxsize = pool_maxsize
+        self._session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.revalidated = 0
+
+    @staticmethod
+    def handles(url: str) -> bool:
+        """True for the URLs fetched by the HttpFetcher, i.e. http and https"""
+        return url.startswith(('http://', 'https://'))
+
+    @property
+    def session(self) -> requests.Session:
+        """The pooled session, created on first use"""
+        with self._lock:
+            if self._session is None:
+                retry = Retry(total=self.retries, connect=self.retries, read=self.retries,
+                              status=self.retries, backoff_factor=self.backoff,
+                              status_forcelist=RETRY_STATUS, allowed_methods=frozenset(['GET', 'HEAD']),
+                              raise_on_status=False)
+                adapter = HTTPAdapter(max_retries=retry, pool_connections=self.pool_maxsize,
+                                      pool_maxsize=self.pool_maxsize)
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+            return self._session
+
+    def fetch(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+              timeout: Optional[Union[float, Tuple[float, float]]] = None) -> FetchResult:
+        """Downloads a document, conditionally if validators of a cached copy are given
+
+        Parameters
+        ----------
+        url : str
+            the http(s) URL
+        etag : str, optional
+            the ETag of the cached copy, by default None
+        last_modified : str, optional
+            the Last-Modified date of the cached copy, by default None
+        timeout : Union[float, Tuple[float, float]], optional
+            overrides the fetcher's timeout for this request, by default None
+
+        Returns
+        -------
+        FetchResult
+            the document and its validators, or a not modified result (status 304)
+
+        Raises
+        ------
+        requests.RequestException
+            if the request fails (after retries) or the server responds with an error
+        """
+        headers = dict()
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        response = self.session.get(url, headers=headers, timeout=timeout or self.timeout)
+        with self._lock:
+            self.requests += 1
+        if response.status_code == 304 and headers:
+            with self._lock:
+                self.revalidated += 1
+            return FetchResult(url=url, status=304, etag=response.headers.get('ETag', etag),
+                               last_modified=response.headers.get('Last-Modified', last_modified))
+        response.raise_for_status()
+        return FetchResult(url=url, status=response.status_code, content=response.content,
+                           etag=response.headers.get('ETag'),
+                           last_modified=response.headers.get('Last-Modified'))
+
+    def close(self):
+        """Closes the pooled connections"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+# the process-wide instance used by SyntaxCheck, OboLoader, and the ResourceCache
+http_fetcher = HttpFetcher()
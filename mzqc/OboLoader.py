@@ -0,0 +1,229 @@
+__author__ = 'walzer'
+import io
+import gzip
+import json
+import urllib.request
+from itertools import chain
+from typing import Any, Dict, Iterable, Optional
+
+from mzqc import HttpFetcher
+from mzqc.VocabularyIndex import VocabularyIndex
+
+# A minimal ontology loader for validation-only use: only the fields the SemanticCheck needs
+# (id, name, def, is_a, and relationships) are extracted from OBO flat files or OBO-graph JSON,
+# everything else is skipped unparsed. Imports are not followed (like pronto with import_depth=0).
+
+OBO_PURL = 'http://purl.obolibrary.org/obo/'
+OWL_VERSION_INFO = 'http://www.w3.org/2002/07/owl#versionInfo'
+
+_OBO_ESCAPES = {'n': '\n', 't': '\t', 'W': ' '}
+
+def _unescape(value: str) -> str:
+    """Resolves the backslash escapes of OBO values"""
+    if '\\' not in value:
+        return value
+    out = []
+    chars = iter(value)
+    for c in chars:
+        if c == '\\':
+            c = next(chars, '')
+            out.append(_OBO_ESCAPES.get(c, c))
+        else:
+            out.append(c)
+    return ''.join(out)
+
+def _quoted(value: str) -> str:
+    """Extracts the (unescaped) quoted string at the start of an OBO value, e.g. of def tags"""
+    if not value.startswith('"'):
+        return _unescape(value)
+    out = []
+    i = 1
+    while i < len(value):
+        c = value[i]
+        if c == '\\' and i+1 < len(value):
+            out.append(_OBO_ESCAPES.get(value[i+1], value[i+1]))
+            i += 2
+            continue
+        if c == '"':
+            break
+        out.append(c)
+        i += 1
+    return ''.join(out)
+
+def parse_obo(lines: Iterable[str]) -> VocabularyIndex:
+    """Compiles a VocabularyIndex from the lines of an OBO flat file
+
+    Parameters
+    ----------
+    lines : Iterable[str]
+        the OBO document, e.g. an open text file
+
+    Returns
+    -------
+    VocabularyIndex
+        the compiled index
+    """
+    raw: Dict[str, Dict[str, Any]] = dict()
+    data_version = ""
+    current: Optional[Dict[str, Any]] = None
+    in_header = True
+    in_term = False
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('!'):
+            continue
+        if line.startswith('['):
+            in_header = False
+            in_term = line == '[Term]'
+            current = None
+            continue
+        tag, _, value = line.partition(':')
+        value = value.strip()
+        if in_header:
+            if tag == 'data-version':
+                data_version = value
+            continue
+        if not in_term:
+            continue
+        if tag == 'id':
+            current = raw.setdefault(value, {'name': None, 'definition': None,
+                                             'parents': set(), 'relationships': dict()})
+        elif current is None:
+            continue
+        elif tag == 'name':
+            current['name'] = _unescape(value)
+        elif tag == 'def':
+            current['definition'] = _quoted(value)
+        elif tag == 'is_a':
+            current['parents'].add(value.split(None, 1)[0])
+        elif tag == 'relationship':
+            rel = value.split(None, 2)
+            if len(rel) >= 2:
+                current['relationships'].setdefault(rel[0], set()).add(rel[1])
+    return VocabularyIndex.compile(raw, data_version)
+
+def _compact(iri: str) -> str:
+    """Shortens OBO PURLs to CURIEs (e.g. .../obo/MS_4000002 to MS:4000002) and relation IRIs to their id"""
+    if iri.startswith(OBO_PURL):
+        local = iri[len(OBO_PURL):]
+        if '#' in local:
+            return local.rsplit('#', 1)[1]
+        return local.replace('_', ':', 1)
+    if '#' in iri:
+        return iri.rsplit('#', 1)[1]
+    return iri
+
+def parse_obograph(document: Dict[str, Any]) -> VocabularyIndex:
+    """Compiles a VocabularyIndex from an OBO-graph JSON document
+
+    Parameters
+    ----------
+    document : Dict[str, Any]
+        the deserialised OBO-graph JSON, all graphs contained are merged
+
+    Returns
+    -------
+    VocabularyIndex
+        the compiled index
+    """
+    raw: Dict[str, Dict[str, Any]] = dict()
+    data_version = ""
+    for graph in document.get('graphs', ()):
+        meta = graph.get('meta', {})
+        for bpv in meta.get('basicPropertyValues', ()):
+            if bpv.get('pred') == OWL_VERSION_INFO and not data_version:
+                data_version = bpv.get('val', "")
+        for node in graph.get('nodes', ()):
+            if node.get('type', 'CLASS') != 'CLASS':
+                continue
+            definition = node.get('meta', {}).get('definition', {}).get('val')
+            raw[_compact(node['id'])] = {'name': node.get('lbl'), 'definition': definition,
+                                        'parents': set(), 'relationships': dict()}
+        for edge in graph.get('edges', ()):
+            sub = raw.get(_compact(edge['sub']))
+            if sub is None:
+                continue
+            pred, obj = _compact(edge['pred']), _compact(edge['obj'])
+            if pred in ('is_a', 'subClassOf'):
+                sub['parents'].add(obj)
+            else:
+                sub['relationships'].setdefault(pred, set()).add(obj)
+    return VocabularyIndex.compile(raw, data_version)
+
+def _text(binary: io.BufferedReader) -> io.TextIOBase:
+    """Wraps a (optionally gzip compressed) binary stream as text stream"""
+    if binary.peek(2)[:2] == b'\x1f\x8b':
+        binary = gzip.GzipFile(fileobj=binary)
+    return io.TextIOWrapper(binary, encoding='utf-8-sig')
+
+def _open_source(uri: str) -> io.TextIOBase:
+    """Opens a local or remote (optionally gzip compressed) source as text stream"""
+    if HttpFetcher.http_fetcher.handles(uri):
+        binary = io.BufferedReader(io.BytesIO(HttpFetcher.http_fetcher.fetch(uri).content))
+    elif uri.startswith('ftp://'):
+        with urllib.request.urlopen(uri) as response:
+            binary = io.BufferedReader(io.BytesIO(response.read()))
+    else:
+        binary = open(uri, 'rb')
+    return _text(binary)
+
+def _read_vocabulary(source: io.TextIOBase, uri: str) -> VocabularyIndex:
+    """Recognises the format of an ontology text stream and parses it"""
+    first = source.readline()
+    while first and not first.strip():
+        first = source.readline()
+    if first.lstrip().startswith('{'):
+        return parse_obograph(json.loads(first + source.read()))
+    if not first.lstrip().startswith(('[', '!')) and ':' not in first:  # no header tag-value pair
+        raise ValueError("Could not recognise the ontology format of {}".format(uri))
+    return parse_obo(chain([first], source))
+
+def load_vocabulary(uri: str) -> VocabularyIndex:
+    """Loads an OBO or OBO-graph JSON ontology into a VocabularyIndex
+
+    The format is recognised by content, gzip compressed sources are supported. 
+    OBO sources are parsed line by line without reading them whole.
+
+    Parameters
+    ----------
+    uri : str
+        a local path or remote URL, http(s) URLs are fetched with the shared `HttpFetcher`
+
+    Returns
+    -------
+    VocabularyIndex
+        the compiled index
+
+    Raises
+    ------
+    Exception
+        if the source can not be read or is not a supported ontology document
+    """
+    with _open_source(uri) as source:
+        return _read_vocabulary(source, uri)
+
+def parse_vocabulary(content: bytes, uri: str = "") -> VocabularyIndex:
+    """Parses an OBO or OBO-graph JSON ontology document into a VocabularyIndex
+
+    As `load_vocabulary`, for documents already in memory (e.g. downloaded conditionally
+    by the ResourceCache).
+
+    Parameters
+    ----------
+    content : bytes
+        the (optionally gzip compressed) ontology document
+    uri : str, optional
+        the source of the document, for error messages, by default ""
+
+    Returns
+    -------
+    VocabularyIndex
+        the compiled index
+
+    Raises
+    ------
+    ValueError
+        if the content is not a supported ontology document
+    """
+    with _text(io.BufferedReader(io.BytesIO(content))) as source:
+        return _read_vocabulary(source, uri or "the given document")
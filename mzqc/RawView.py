@@ -0,0 +1,127 @@
+__author__ = 'walzer'
+from typing import Any, Dict, Tuple
+
+# Read-only views of deserialised (plain JSON) mzQC objects, exposing the same attributes (and
+# defaults) as the MZQCFile classes. Nested objects are wrapped on access only, so e.g. the
+# SemanticCheck can run on `json.load` output (or single run records) without building the
+# complete object graph first.
+
+class RawView(object):
+    """
+    RawView Read-only attribute view of a plain JSON object of the mzQC schema
+
+    Attributes are looked up in the wrapped dict, absent attributes get the default of the
+    corresponding MZQCFile class. Nested objects (and items of nested lists) are wrapped in the
+    view type of their position in the schema. Each attribute is resolved once, when first 
+    accessed. The underlying dict is not copied or modified.
+
+    Parameters
+    ----------
+    raw : Dict[str, Any]
+        the deserialised JSON object
+    """
+    # attribute names and defaults, in the order of the corresponding MZQCFile class attributes
+    _fields: Tuple[Tuple[str, Any], ...] = ()
+    # view types of the attributes holding nested objects or lists of objects
+    _nested: Dict[str, type] = {}
+    # derived from the above by _compile_fields
+    _defaults: Dict[str, Any] = {}
+    _plain: Tuple[Tuple[str, Any], ...] = ()
+
+    def __init__(self, raw: Dict[str, Any]):
+        attrs = self.__dict__
+        attrs['_raw'] = raw
+        # plain values are taken right away, nested objects are wrapped on first access
+        for name, default in self._plain:
+            attrs[name] = raw.get(name, default)
+
+    def __getattr__(self, name: str) -> Any:
+        # only called for attributes not resolved yet, which are then kept on the instance
+        if name not in self._defaults:
+            raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, name))
+        value = self._raw.get(name, self._defaults[name])
+        view = self._nested.get(name)
+        if view is not None:
+            if isinstance(value, (list, tuple)):
+                value = [view(v) if isinstance(v, dict) else v for v in value]
+            elif isinstance(value, dict):
+                value = view(value)
+        self.__dict__[name] = value
+        return value
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("'{}' object is read-only".format(type(self).__name__))
+
+    def __eq__(self, other: object) -> bool:
+        return type(self) == type(other) and self._raw == other._raw
+
+    def __repr__(self) -> str:
+        return "{}({!r})".format(type(self).__name__, self._raw)
+
+    @property
+    def raw(self) -> Dict[str, Any]:
+        """The wrapped JSON object"""
+        return self._raw
+
+class RawControlledVocabulary(RawView):
+    _fields = (('name', ""), ('uri', ""), ('version', ""))
+
+class RawCvParameter(RawView):
+    _fields = (('accession', ""), ('name', ""), ('description', ""), ('value', None), ('unit', ""))
+
+RawCvParameter._nested = {'unit': RawCvParameter}
+
+class RawQualityMetric(RawCvParameter):
+    pass
+
+class RawAnalysisSoftware(RawCvParameter):
+    _fields = RawCvParameter._fields + (('version', ""), ('uri', ""))
+
+class RawInputFile(RawView):
+    _fields = (('location', ""), ('name', ""), ('fileFormat', None), ('fileProperties', ()))
+    _nested = {'fileFormat': RawCvParameter, 'fileProperties': RawCvParameter}
+
+class RawMetaDataParameters(RawView):
+    _fields = (('label', ""), ('inputFiles', ()), ('analysisSoftware', ()))
+    _nested = {'inputFiles': RawInputFile, 'analysisSoftware': RawAnalysisSoftware}
+
+class RawBaseQuality(RawView):
+    _fields = (('metadata', None), ('qualityMetrics', ()))
+    _nested = {'metadata': RawMetaDataParameters, 'qualityMetrics': RawQualityMetric}
+
+class RawRunQuality(RawBaseQuality):
+    pass
+
+class RawSetQuality(RawBaseQuality):
+    pass
+
+class RawMzQcFile(RawView):
+    _fields = (('creationDate', None), ('version', ""), ('contactName', ""), ('contactAddress', ""),
+               ('description', ""), ('runQualities', ()), ('setQualities', ()), ('controlledVocabularies', ()))
+    _nested = {'runQualities': RawRunQuality, 'setQualities': RawSetQuality,
+               'controlledVocabularies': RawControlledVocabulary}
+
+def _compile_fields(cls: type):
+    for sub in cls.__subclasses__():
+        sub._defaults = dict(sub._fields)
+        sub._plain = tuple((name, default) for name, default in sub._fields if name not in sub._nested)
+        _compile_fields(sub)
+
+_compile_fields(RawView)
+
+def raw_view(document: Dict[str, Any]) -> RawMzQcFile:
+    """Wraps a deserialised mzQC document in a RawMzQcFile view
+
+    Parameters
+    ----------
+    document : Dict[str, Any]
+        the plain JSON, with or without the outer `mzQC` object
+
+    Returns
+    -------
+    RawMzQcFile
+        the view of the mzQC object
+    """
+    if isinstance(document.get('mzQC'), dict):
+        document = document['mzQC']
+    return RawMzQcFile(document)
@@ -0,0 +1,156 @@
+__author__ = 'walzer'
+import json
+import hashlib
+import zipfile
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from mzqc.VocabularyIndex import VocabularyIndex
+
+# Offline resource bundles: one zip archive with remote documents (i.e. mzQC schemas), ontology
+# sources, and their precompiled VocabularyIndex, which the ResourceCache serves instead of
+# fetching anything while a bundle is in use (see ResourceCache.use_bundle).
+
+BUNDLE_FORMAT = 1
+MANIFEST = 'bundle.json'
+
+def _member_name(folder: str, uri: str, suffix: str = "") -> str:
+    return '{}/{}{}'.format(folder, hashlib.sha1(uri.encode()).hexdigest(), suffix)
+
+class ResourceBundle(object):
+    """
+    ResourceBundle Read access to an offline resource bundle
+
+    The archive's manifest lists the bundled documents by URL and the ontologies by URI,
+    with their declared version and data-version. Ontologies are looked up by URI only,
+    as a remote URI serves a single version at a time. Indices are deserialised on first
+    request and kept. Any resource requested but not bundled raises a LookupError, so
+    validation with a bundle never falls back to the network.
+
+    Parameters
+    ----------
+    path : str
+        path to the bundle archive
+
+    Raises
+    ------
+    ValueError
+        if the file is not a resource bundle (of a supported format)
+    """
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with zipfile.ZipFile(path) as archive:
+                manifest = json.loads(archive.read(MANIFEST))
+        except (zipfile.BadZipFile, KeyError, ValueError) as e:
+            raise ValueError("{} is not a resource bundle: {}".format(path, e))
+        if manifest.get('format') != BUNDLE_FORMAT:
+            raise ValueError("Resource bundle format {} is not supported (expected {})".format(
+                manifest.get('format'), BUNDLE_FORMAT))
+        self.manifest: Dict[str, Any] = manifest
+        self._indices: Dict[str, VocabularyIndex] = dict()
+        self._lock = threading.Lock()
+
+    @property
+    def documents(self) -> List[str]:
+        """URLs of the bundled documents"""
+        return list(self.manifest.get('documents', {}))
+
+    @property
+    def ontologies(self) -> List[str]:
+        """URIs of the bundled ontologies"""
+        return list(self.manifest.get('ontologies', {}))
+
+    def _read(self, member: str) -> bytes:
+        # opened per read, so bundles can be shared by threads and forked processes
+        with zipfile.ZipFile(self.path) as archive:
+            return archive.read(member)
+
+    def _ontology(self, uri: str) -> Dict[str, Any]:
+        record = self.manifest.get('ontologies', {}).get(uri)
+        if record is None:
+            raise LookupError("Ontology {} is not in the resource bundle {}".format(uri, self.path))
+        return record
+
+    def document(self, url: str) -> str:
+        """Returns the bundled document for the given URL"""
+        record = self.manifest.get('documents', {}).get(url)
+        if record is None:
+            raise LookupError("Document {} is not in the resource bundle {}".format(url, self.path))
+        return self._read(record['file']).decode('utf-8')
+
+    def index(self, uri: str) -> VocabularyIndex:
+        """Returns the precompiled vocabulary index of the bundled ontology for the given URI"""
+        with self._lock:
+            index = self._indices.get(uri)
+            if index is None:
+                index = VocabularyIndex.from_dict(json.loads(self._read(self._ontology(uri)['index'])))
+                self._indices[uri] = index
+            return index
+
+    def data_version(self, uri: str) -> str:
+        """Returns the data-version of the bundled ontology for the given URI"""
+        return self._ontology(uri).get('data_version', "")
+
+    def source(self, uri: str) -> bytes:
+        """Returns the source document of the bundled ontology for the given URI"""
+        record = self._ontology(uri)
+        if not record.get('source'):
+            raise LookupError("Ontology {} is bundled without its source in {}".format(uri, self.path))
+        return self._read(record['source'])
+
+    @staticmethod
+    def create(path: str, **metadata) -> 'BundleWriter':
+        """Starts a new bundle archive at the given path, see BundleWriter"""
+        return BundleWriter(path, **metadata)
+
+class BundleWriter(object):
+    """
+    BundleWriter Writes an offline resource bundle
+
+    Use as context manager, the manifest is written on close.
+
+    Parameters
+    ----------
+    path : str
+        destination of the bundle archive, overwritten if existing
+    **metadata
+        further (JSON serialisable) manifest entries, e.g. the pymzqc version
+    """
+    def __init__(self, path: str, **metadata):
+        self.path = path
+        self.manifest: Dict[str, Any] = {**metadata, 'format': BUNDLE_FORMAT,
+                                         'created': datetime.now(timezone.utc).isoformat(),
+                                         'documents': dict(), 'ontologies': dict()}
+        self._archive = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    def add_document(self, url: str, content: str):
+        """Adds a text document (e.g. a schema) under its URL"""
+        member = _member_name('documents', url)
+        self._archive.writestr(member, content.encode('utf-8'))
+        self.manifest['documents'][url] = {'file': member}
+
+    def add_ontology(self, uri: str, index: VocabularyIndex, version: str = "", source: Optional[bytes] = None):
+        """Adds an ontology under its URI, with its compiled index and optionally its source document"""
+        index_member = _member_name('indices', uri, '.json')
+        self._archive.writestr(index_member, json.dumps(index.to_dict()))
+        source_member = None
+        if source is not None:
+            source_member = _member_name('ontologies', uri)
+            self._archive.writestr(source_member, source)
+        self.manifest['ontologies'][uri] = {'version': version, 'data_version': index.data_version,
+                                            'index': index_member, 'source': source_member}
+
+    def close(self):
+        self._archive.writestr(MANIFEST, json.dumps(self.manifest, indent=2))
+        self._archive.close()
+
+    def __enter__(self) -> 'BundleWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._archive.close()
@@ -0,0 +1,802 @@
+__author__ = 'walzer'
+import io
+import os
+import time
+import json
+import hashlib
+import logging
+import threading
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Iterable, Optional, Tuple, Union
+
+import requests
+
+from mzqc import HttpFetcher, OboLoader
+from mzqc.HttpFetcher import FetchResult
+from mzqc.ResourceBundle import ResourceBundle
+from mzqc.VocabularyIndex import VocabularyIndex
+
+if TYPE_CHECKING:
+    from pronto import Ontology
+
+DEFAULT_MAX_AGE = 7*24*60*60  # seconds an unversioned remote ontology is trusted
+DEFAULT_DOCUMENT_MAX_AGE = 5*60  # seconds a remote document is used before revalidation
+
+def default_cache_dir() -> str:
+    """Determines the directory for pymzqc's on-disk caches
+
+    The environment variable `PYMZQC_CACHE_DIR` takes precedence, otherwise the
+    XDG cache directory (or `~/.cache`) is used with a `pymzqc` subfolder.
+
+    Returns
+    -------
+    str
+        path to the cache directory (not necessarily existing yet)
+    """
+    env_dir = os.getenv('PYMZQC_CACHE_DIR')
+    if env_dir:
+        return env_dir
+    xdg_dir = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(xdg_dir, 'pymzqc')
+
+class LRUCache(object):
+    """
+    LRUCache A small thread-safe in-memory cache with least recently used eviction
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        the maximum number of entries kept, by default 8
+    """
+    def __init__(self, maxsize: int=8):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable, default: Any=None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > max(self.maxsize, 0):
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any=None) -> Any:
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+_bundle_setting: Optional[str] = None
+_bundle: Optional[ResourceBundle] = None
+_bundle_lock = threading.Lock()
+
+def use_bundle(path: Optional[str]):
+    """Sets the offline resource bundle served by the process-wide caches
+
+    While a bundle is in use, remote schemas and ontologies are taken from the bundle only,
+    resources not bundled fail to load instead of being fetched. Local files are read as usual.
+    Without a setting, the environment variable `PYMZQC_BUNDLE` is used.
+
+    Parameters
+    ----------
+    path : Optional[str]
+        path to the bundle archive, an empty string to use none, or None to return to the 
+        `PYMZQC_BUNDLE` default
+
+    Raises
+    ------
+    ValueError
+        if the file is not a resource bundle
+    """
+    global _bundle_setting
+    with _bundle_lock:
+        _bundle_setting = path
+    active_bundle()  # fails early for invalid bundles
+
+def active_bundle() -> Optional[ResourceBundle]:
+    """Returns the offline resource bundle in use, None if there is none (see `use_bundle`)"""
+    global _bundle
+    path = _bundle_setting if _bundle_setting is not None else os.getenv('PYMZQC_BUNDLE', '')
+    with _bundle_lock:
+        if not path:
+            return None
+        if _bundle is None or _bundle.path != path:
+            _bundle = ResourceBundle(path)
+        return _bundle
+
+def _revalidate(uri: str, stale: Optional[Dict[str,Any]],
+                fetcher: Optional[HttpFetcher.HttpFetcher] = None) -> Tuple[Optional[Dict[str,Any]], Optional[FetchResult]]:
+    """Fetches a remote http(s) source with the given (by default the shared) HttpFetcher, 
+    conditionally if an outdated cache entry (with the source's ETag or Last-Modified date) is given
+
+    Returns the outdated entry if it can be reused, i.e. the source is not modified (then the
+    entry is refreshed) or can not be reached, otherwise the fetched document. Both are None 
+    for sources other than http(s), which are read by the loaders. With a resource bundle in 
+    use, remote sources are taken from the bundle.
+    """
+    bundle = active_bundle()
+    if bundle is not None and not OntologyCache._is_local(uri):
+        return None, FetchResult(url=uri, status=200, content=bundle.source(uri))
+    fetcher = fetcher or HttpFetcher.http_fetcher
+    if not fetcher.handles(uri):
+        return None, None
+    try:
+        response = fetcher.fetch(uri, etag=stale.get('etag') if stale else None,
+                                 last_modified=stale.get('last_modified') if stale else None)
+    except requests.RequestException as e:
+        if not stale:
+            raise
+        logging.warning("Could not revalidate {}, reusing the cached copy: {}".format(uri, e))
+        return stale, None
+    if response.not_modified and stale:
+        stale.update({'created': time.time(), 'etag': response.etag, 'last_modified': response.last_modified})
+        return stale, None
+    return None, response
+
+class OntologyCache(object):
+    """
+    OntologyCache Process-wide and on-disk cache of loaded pronto ontologies
+
+    Ontologies are keyed by URI and (declared) version. Loaded ontologies are kept in memory
+    with LRU eviction; the cache directory holds their metadata as JSON and the fetched source
+    documents of remote ontologies, so a later process can skip the download. Each entry records
+    a stamp of its source which is checked before an entry is reused: local files must have the
+    same modification time and size, remote documents are trusted for `max_age` seconds unless 
+    pinned to their version, i.e. the version is a path segment of the URI (e.g. release 
+    downloads) or the ontology's data-version. Remote 
+    documents are fetched with the shared `HttpFetcher`; once their `max_age` has passed, they 
+    are revalidated with a conditional request, so an unchanged ontology costs a 304 response 
+    (and no parsing). If the server can not be reached, the outdated entry is reused. While an 
+    offline resource bundle is in use (see `use_bundle`), remote ontologies and their indices are 
+    served from the bundle only.
+
+    Next to the ontologies, the cache holds their compiled `VocabularyIndex` (see `load_index`),
+    persisted as JSON, which is all the SemanticCheck needs. Hence, validation does not load
+    (nor traverse) an ontology at all once its index is cached. Uncached indices are compiled
+    by the lightweight `OboLoader` by default, pronto is only imported for the 'pronto' backend
+    or when full ontologies are requested with `load`.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        number of ontologies (and four times as many indices) kept in memory, by default 8
+    cache_dir : str, optional
+        directory for the ontology sources and indices, by default `default_cache_dir()`/ontologies,
+        use an empty string to disable the disk cache
+    max_age : float, optional
+        seconds an unversioned remote ontology is reused without reloading, by default one week
+    backend : str, optional
+        'obo' to compile indices with the `OboLoader` or 'pronto' to compile them from fully
+        loaded ontologies, by default 'obo'
+    """
+    def __init__(self, maxsize: int=8, cache_dir: Optional[str]=None, max_age: float=DEFAULT_MAX_AGE,
+                 backend: str='obo'):
+        if backend not in ('obo', 'pronto'):
+            raise ValueError("Unknown ontology backend '{}', use 'obo' or 'pronto'".format(backend))
+        self.backend = backend
+        self.cache_dir = os.path.join(default_cache_dir(), 'ontologies') if cache_dir is None else cache_dir
+        self.max_age = max_age
+        self._memory = LRUCache(maxsize)
+        self._indices = LRUCache(maxsize*4)
+        self._locks: Dict[Tuple[str,str], threading.Lock] = dict()
+        self._locks_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _is_local(uri: str) -> bool:
+        return not uri.startswith(('http://', 'https://', 'ftp://'))
+
+    @staticmethod
+    def _is_pinned(uri: str, version: str, data_version: Optional[str] = None) -> bool:
+        """Remote ontologies pinned to their version never go stale: URIs with the version as a 
+        path segment (e.g. release downloads, also prefixed 'v') or documents of that data-version"""
+        if not version:
+            return False
+        version = version.lstrip('v')
+        segments = urllib.parse.urlsplit(uri).path.split('/')
+        if version in segments or 'v' + version in segments:
+            return True
+        return bool(data_version) and data_version.lstrip('v') == version
+
+    def _source_stamp(self, uri: str) -> Optional[Tuple[int,int]]:
+        if self._is_local(uri):
+            try:
+                st = os.stat(uri)
+            except OSError:
+                return None
+            return (st.st_mtime_ns, st.st_size)
+        return None
+
+    def _is_valid(self, entry: Dict[str,Any], uri: str, version: str) -> bool:
+        """Confirms a cache entry still corresponds to its source"""
+        if entry.get('uri') != uri or entry.get('version') != version:
+            return False
+        if self._is_local(uri):
+            return entry.get('stamp') == self._source_stamp(uri)
+        if self._is_pinned(uri, version, entry.get('data_version')):
+            return True
+        return (time.time() - entry.get('created', 0)) < self.max_age
+
+    def _disk_path(self, uri: str, version: str, suffix: str='.ontology.json') -> str:
+        digest = hashlib.sha1('{}|{}'.format(uri, version).encode()).hexdigest()
+        return os.path.join(self.cache_dir, digest + suffix)
+
+    def _read_disk(self, uri: str, version: str) -> Optional[Dict[str,Any]]:
+        """Reads the ontology's metadata and parses the ontology from its stored source (remote)
+        or the unchanged file (local); nothing is deserialised but JSON and the ontology itself"""
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(uri, version), 'r') as cache_in:
+                entry = json.load(cache_in)
+            entry['stamp'] = tuple(entry['stamp']) if entry.get('stamp') else None
+            if self._is_local(uri):
+                if entry['stamp'] != self._source_stamp(uri):
+                    return None
+                source = uri
+            else:
+                with open(self._disk_path(uri, version, '.source'), 'rb') as source_in:
+                    source = io.BytesIO(source_in.read())
+            from pronto import Ontology
+            entry['ontology'] = Ontology(source, import_depth=0)
+            return entry
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.debug("Discarding unreadable ontology cache entry for {}: {}".format(uri, e))
+            return None
+
+    def _read_disk_index(self, uri: str, version: str) -> Optional[Dict[str,Any]]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(uri, version, '.index.json'), 'r') as cache_in:
+                entry = json.load(cache_in)
+            entry['stamp'] = tuple(entry['stamp']) if entry.get('stamp') else None
+            entry['index'] = VocabularyIndex.from_dict(entry['index'])
+            return entry
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.debug("Discarding unreadable vocabulary index cache entry for {}: {}".format(uri, e))
+            return None
+
+    def _write_disk(self, entry: Dict[str,Any], suffix: str='.ontology.json', source: Optional[bytes]=None):
+        if not self.cache_dir:
+            return
+        target = self._disk_path(entry['uri'], entry['version'], suffix)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if source is not None:
+                source_target = self._disk_path(entry['uri'], entry['version'], '.source')
+                tmp = '{}.{}.tmp'.format(source_target, os.getpid())
+                with open(tmp, 'wb') as source_out:
+                    source_out.write(source)
+                os.replace(tmp, source_target)
+            # write and rename so concurrent readers never see a partial file
+            tmp = '{}.{}.tmp'.format(target, os.getpid())
+            if suffix in ('.ontology.json', '.meta.json'):
+                with open(tmp, 'w') as cache_out:
+                    json.dump({k: v for k, v in entry.items() if k not in ('index', 'ontology')}, cache_out)
+            else:
+                with open(tmp, 'w') as cache_out:
+                    json.dump(dict(entry, index=entry['index'].to_dict()), cache_out)
+            os.replace(tmp, target)
+        except Exception as e:
+            logging.debug("Could not write ontology cache entry for {}: {}".format(entry['uri'], e))
+
+    def _key_lock(self, key: Tuple[str,str]) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _load_entry(self, uri: str, version: str) -> Dict[str,Any]:
+        key = (uri, version or "")
+        with self._key_lock(key):
+            entry = self._memory.get(key)
+            if entry is not None and self._is_valid(entry, *key):
+                self.hits += 1
+                return entry
+
+            stale = entry
+            entry = self._read_disk(*key)
+            if entry is not None and self._is_valid(entry, *key):
+                self.hits += 1
+                self._memory.put(key, entry)
+                return entry
+
+            reused, response = _revalidate(uri, entry or stale)
+            if reused is not None:
+                self.hits += 1
+                self._memory.put(key, reused)
+                self._write_disk(reused)
+                return reused
+
+            self.misses += 1
+            from pronto import Ontology
+            stamp = self._source_stamp(uri)
+            ontology = Ontology(uri if response is None else io.BytesIO(response.content), import_depth=0)
+            entry = {'uri': key[0], 'version': key[1], 'stamp': stamp, 'created': time.time(),
+                     'etag': response and response.etag, 'last_modified': response and response.last_modified,
+                     'data_version': ontology.metadata.data_version, 'ontology': ontology}
+            self._memory.put(key, entry)
+            self._write_disk(entry, source=None if response is None else response.content)
+            return entry
+
+    def load(self, uri: str, version: str="") -> 'Ontology':
+        """Returns the ontology for given URI and version, loading it only if necessary
+
+        Parameters
+        ----------
+        uri : str
+            a local path or remote URL as accepted by pronto
+        version : str, optional
+            the version declared for the ontology, by default ""
+
+        Returns
+        -------
+        Ontology
+            the (possibly cached) pronto Ontology
+
+        Raises
+        ------
+        Exception
+            any exception raised by pronto while loading an uncached ontology
+        """
+        return self._load_entry(uri, version)['ontology']
+
+    def load_index(self, uri: str, version: str="") -> VocabularyIndex:
+        """Returns the compiled vocabulary index for given URI and version
+
+        The index is taken from memory or disk if still valid for its source (see class doc),
+        otherwise compiled (by the cache's backend) and persisted.
+
+        Parameters
+        ----------
+        uri : str
+            a local path or remote URL as accepted by pronto
+        version : str, optional
+            the version declared for the ontology, by default ""
+
+        Returns
+        -------
+        VocabularyIndex
+            the (possibly cached) index of the ontology
+
+        Raises
+        ------
+        Exception
+            any exception raised by the backend while loading an uncached ontology
+        """
+        bundle = active_bundle()
+        if bundle is not None and not self._is_local(uri):
+            self.hits += 1
+            return bundle.index(uri)
+        key = (uri, version or "")
+        with self._key_lock(('index',)+key):
+            entry = self._indices.get(key)
+            if entry is not None and self._is_valid(entry, *key):
+                self.hits += 1
+                return entry['index']
+
+            stale = entry
+            entry = self._read_disk_index(*key)
+            if entry is not None and self._is_valid(entry, *key):
+                self.hits += 1
+                self._indices.put(key, entry)
+                return entry['index']
+
+            if self.backend == 'pronto':
+                ontology_entry = self._load_entry(*key)
+                index = VocabularyIndex.from_ontology(ontology_entry['ontology'])
+                validators = {k: ontology_entry.get(k) for k in ('etag', 'last_modified')}
+                stamp, created = ontology_entry['stamp'], ontology_entry['created']
+            else:
+                reused, response = _revalidate(uri, entry or stale)
+                if reused is not None:
+                    self.hits += 1
+                    self._indices.put(key, reused)
+                    self._write_disk(reused, '.index.json')
+                    self._write_disk(reused, '.meta.json')
+                    return reused['index']
+                self.misses += 1
+                stamp, created = self._source_stamp(uri), time.time()
+                if response is None:
+                    index = OboLoader.load_vocabulary(uri)
+                else:
+                    index = OboLoader.parse_vocabulary(response.content, uri)
+                validators = {'etag': response and response.etag,
+                              'last_modified': response and response.last_modified}
+            entry = {'uri': key[0], 'version': key[1], 'stamp': stamp,
+                     'created': created, 'data_version': index.data_version,
+                     'index': index, **validators}
+            self._indices.put(key, entry)
+            self._write_disk(entry, '.index.json')
+            self._write_disk(entry, '.meta.json')
+            return index
+
+    def data_version(self, uri: str, version: str="") -> Optional[str]:
+        """Returns the data-version of the ontology for given URI and version
+
+        Answered from the cached index metadata if possible, which avoids deserialising the 
+        index, otherwise the index is loaded.
+
+        Parameters
+        ----------
+        uri : str
+            a local path or remote URL as accepted by pronto
+        version : str, optional
+            the version declared for the ontology, by default ""
+
+        Returns
+        -------
+        Optional[str]
+            the data-version, None if the ontology can not be loaded
+        """
+        bundle = active_bundle()
+        if bundle is not None and not self._is_local(uri):
+            try:
+                return bundle.data_version(uri)
+            except LookupError:
+                return None
+        key = (uri, version or "")
+        entry = self._indices.get(key)
+        if entry is None and self.cache_dir:
+            try:
+                with open(self._disk_path(uri, version or "", '.meta.json'), 'r') as meta_in:
+                    entry = json.load(meta_in)
+                entry['stamp'] = tuple(entry['stamp']) if entry.get('stamp') else None
+            except Exception:
+                entry = None
+        if entry is not None and self._is_valid(entry, *key):
+            return entry['data_version']
+        try:
+            return self.load_index(uri, version).data_version
+        except Exception:
+            return None
+
+    def clear(self, disk: bool=False):
+        """Empties the in-memory caches and optionally removes the serialised ontologies and indices
+
+        Parameters
+        ----------
+        disk : bool, optional
+            if True the on-disk entries are removed as well, by default False
+        """
+        self._memory.clear()
+        self._indices.clear()
+        if disk and self.cache_dir and os.path.isdir(self.cache_dir):
+            for fn in os.listdir(self.cache_dir):
+                if fn.endswith(('.ontology.json', '.source', '.index.json', '.meta.json', '.pkl')):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, fn))
+                    except OSError:
+                        pass
+
+class DocumentCache(object):
+    """
+    DocumentCache Process-wide and on-disk cache of remote text documents, e.g. the mzQC schema
+
+    Documents are fetched with the shared `HttpFetcher` and kept in memory with LRU eviction 
+    and as JSON files in the cache directory, together with their ETag and Last-Modified date. 
+    A document is reused for `max_age` seconds, afterwards it is revalidated with a conditional 
+    request, which costs a 304 response if it is unchanged. If the server can not be reached, 
+    the outdated copy is reused. Other than http(s) URLs are read without caching. While an 
+    offline resource bundle is in use (see `use_bundle`), documents are served from the bundle only.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        number of documents kept in memory, by default 16
+    cache_dir : str, optional
+        directory for the documents, by default `default_cache_dir()`/documents,
+        use an empty string to disable the disk cache
+    max_age : float, optional
+        seconds a document is reused without revalidation, by default five minutes
+    """
+    def __init__(self, maxsize: int=16, cache_dir: Optional[str]=None, max_age: float=DEFAULT_DOCUMENT_MAX_AGE):
+        self.cache_dir = os.path.join(default_cache_dir(), 'documents') if cache_dir is None else cache_dir
+        self.max_age = max_age
+        self._memory = LRUCache(maxsize)
+        self._locks: Dict[str, threading.Lock] = dict()
+        self._locks_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _disk_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode()).hexdigest() + '.document.json')
+
+    def _read_disk(self, url: str) -> Optional[Dict[str,Any]]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(url), 'r') as document_in:
+                entry = json.load(document_in)
+            return entry if entry.get('url') == url else None
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.debug("Discarding unreadable document cache entry for {}: {}".format(url, e))
+            return None
+
+    def _write_disk(self, entry: Dict[str,Any]):
+        if not self.cache_dir:
+            return
+        target = self._disk_path(entry['url'])
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = '{}.{}.tmp'.format(target, os.getpid())
+            with open(tmp, 'w') as document_out:
+                json.dump(entry, document_out)
+            os.replace(tmp, target)
+        except Exception as e:
+            logging.debug("Could not write document cache entry for {}: {}".format(entry['url'], e))
+
+    def get(self, url: str, fetcher: Optional[HttpFetcher.HttpFetcher] = None) -> str:
+        """Returns the document at the given URL, fetching or revalidating it only if necessary
+
+        Parameters
+        ----------
+        url : str
+            the document URL
+        fetcher : Optional[HttpFetcher.HttpFetcher], optional
+            the fetcher to download with, e.g. with shorter timeouts, by default the shared one
+
+        Returns
+        -------
+        str
+            the (possibly cached) document text
+
+        Raises
+        ------
+        Exception
+            if the document can not be fetched and is not cached
+        """
+        bundle = active_bundle()
+        if bundle is not None:
+            return bundle.document(url)
+        if not HttpFetcher.http_fetcher.handles(url):
+            with urllib.request.urlopen(url) as document_in:
+                return document_in.read().decode()
+        with self._locks_lock:
+            lock = self._locks.setdefault(url, threading.Lock())
+        with lock:
+            entry = self._memory.get(url)
+            if entry is None:
+                entry = self._read_disk(url)
+            if entry is not None and (time.time() - entry.get('created', 0)) < self.max_age:
+                self.hits += 1
+                self._memory.put(url, entry)
+                return entry['content']
+
+            reused, response = _revalidate(url, entry, fetcher)
+            if reused is not None:
+                self.hits += 1
+                entry = reused
+            else:
+                self.misses += 1
+                entry = {'url': url, 'created': time.time(), 'etag': response.etag,
+                         'last_modified': response.last_modified,
+                         'content': response.content.decode('utf-8-sig')}
+            self._memory.put(url, entry)
+            self._write_disk(entry)
+            return entry['content']
+
+    def digest(self, url: str) -> str:
+        """Returns the sha256 hex digest of the document at the given URL (see `get`), which 
+        identifies the document's content while it is reused or unchanged
+
+        Raises
+        ------
+        Exception
+            if the document can not be fetched and is not cached
+        """
+        return hashlib.sha256(self.get(url).encode()).hexdigest()
+
+    def clear(self, disk: bool=False):
+        """Empties the in-memory cache and optionally removes the stored documents
+
+        Parameters
+        ----------
+        disk : bool, optional
+            if True the on-disk entries are removed as well, by default False
+        """
+        self._memory.clear()
+        if disk and self.cache_dir and os.path.isdir(self.cache_dir):
+            for fn in os.listdir(self.cache_dir):
+                if fn.endswith('.document.json'):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, fn))
+                    except OSError:
+                        pass
+
+def canonical_hash(document: Union[str, bytes, Dict[str,Any]]) -> str:
+    """Hashes a JSON document independent of its formatting and key order
+
+    Parameters
+    ----------
+    document : Union[str, bytes, Dict[str,Any]]
+        the serialised or deserialised JSON document
+
+    Returns
+    -------
+    str
+        hex digest of the sha256 hash of the canonical serialisation
+
+    Raises
+    ------
+    ValueError
+        if the given string is not JSON
+    """
+    if isinstance(document, (str, bytes)):
+        document = json.loads(document)
+    return hashlib.sha256(json.dumps(document, sort_keys=True, separators=(',', ':'),
+                                     ensure_ascii=False).encode()).hexdigest()
+
+class ValidationResultCache(object):
+    """
+    ValidationResultCache Process-wide and on-disk cache of validation results
+
+    Results are stored as the (JSON serialisable) response dicts of the validators, i.e. 
+    `SemanticCheck.string_export()` merged with the `SyntaxCheck` result, and are keyed by the 
+    canonical content hash of the document, the schema version and the hash of its document as
+    currently served by the `document_cache` (schema versions like 'main' are moving targets), 
+    the data-versions of the referenced ontologies, the pymzqc version, and any further 
+    validation parameters (see `key`). Entries are kept in memory with LRU eviction and as JSON
+    files in the cache directory, and expire after `max_age` seconds.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        number of results kept in memory, by default 128
+    cache_dir : str, optional
+        directory for the results, by default `default_cache_dir()`/results,
+        use an empty string to disable the disk cache
+    max_age : float, optional
+        seconds a result is reused, by default one week
+    """
+    def __init__(self, maxsize: int=128, cache_dir: Optional[str]=None, max_age: float=DEFAULT_MAX_AGE):
+        self.cache_dir = os.path.join(default_cache_dir(), 'results') if cache_dir is None else cache_dir
+        self.max_age = max_age
+        self._memory = LRUCache(maxsize)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, document: Union[str, bytes, Dict[str,Any]], schema_version: str,
+            vocabularies: Iterable[Tuple[str,str]] = (), schema_url: Optional[str] = None,
+            schema_digest: Optional[str] = None, data_versions: Optional[Dict[Tuple[str,str],str]] = None,
+            **params) -> str:
+        """Computes the cache key of a validation
+
+        Parameters
+        ----------
+        document : Union[str, bytes, Dict[str,Any]]
+            the mzQC document as validated
+        schema_version : str
+            the schema version validated against
+        vocabularies : Iterable[Tuple[str,str]], optional
+            URI and declared version of the ontologies used, their data-version is retrieved 
+            through the process-wide `ontology_cache`, by default none
+        schema_url : Optional[str], optional
+            URL of the schema document, hashed through the process-wide `document_cache`, 
+            by default the schema version's URL as used by the `SyntaxCheck`
+        schema_digest : Optional[str], optional
+            the schema document's digest (see `DocumentCache.digest`) if already known, 
+            by default None to compute it from schema_url
+        data_versions : Optional[Dict[Tuple[str,str],str]], optional
+            the data-versions of (URI, version) pairs already known, the others are retrieved
+            through the `ontology_cache`, by default None
+        **params
+            any other (JSON serialisable) parameters influencing the result, e.g. max_errors
+
+        Returns
+        -------
+        str
+            the cache key
+
+        Raises
+        ------
+        ValueError
+            if the document is not JSON
+        Exception
+            if the schema document can not be fetched and is not cached
+        """
+        if schema_digest is None:
+            if schema_url is None:
+                from mzqc.SyntaxCheck import SCHEMA_URL
+                schema_url = SCHEMA_URL.format(branch=schema_version)
+            schema_digest = document_cache.digest(schema_url)
+        data_versions = data_versions or dict()
+        vocabularies = [[uri, version, data_versions[(uri, version)] if (uri, version) in data_versions
+                         else ontology_cache.data_version(uri, version)]
+                        for uri, version in vocabularies]
+        return canonical_hash({'document': canonical_hash(document),
+                               'schema': [schema_version, schema_digest],
+                               'vocabularies': vocabularies, 'params': params,
+                               'pymzqc': _pymzqc_version()})
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + '.result.json')
+
+    def get(self, key: str) -> Optional[Dict[str,Any]]:
+        """Returns the cached result for given key, None if there is none (or it expired)"""
+        entry = self._memory.get(key)
+        if entry is None and self.cache_dir:
+            try:
+                with open(self._disk_path(key), 'r') as result_in:
+                    entry = json.load(result_in)
+            except FileNotFoundError:
+                entry = None
+            except Exception as e:
+                logging.debug("Discarding unreadable result cache entry {}: {}".format(key, e))
+                entry = None
+        if entry is None or (time.time() - entry.get('created', 0)) >= self.max_age:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._memory.put(key, entry)
+        return json.loads(json.dumps(entry['result']))  # callers may alter their copy
+
+    def put(self, key: str, result: Dict[str,Any]):
+        """Stores a (JSON serialisable) validation result under given key"""
+        entry = {'created': time.time(), 'result': json.loads(json.dumps(result))}
+        self._memory.put(key, entry)
+        if not self.cache_dir:
+            return
+        target = self._disk_path(key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = '{}.{}.tmp'.format(target, os.getpid())
+            with open(tmp, 'w') as result_out:
+                json.dump(entry, result_out)
+            os.replace(tmp, target)
+        except Exception as e:
+            logging.debug("Could not write result cache entry {}: {}".format(key, e))
+
+    def clear(self, disk: bool=False):
+        """Empties the in-memory cache and optionally removes the stored results
+
+        Parameters
+        ----------
+        disk : bool, optional
+            if True the on-disk entries are removed as well, by default False
+        """
+        self._memory.clear()
+        if disk and self.cache_dir and os.path.isdir(self.cache_dir):
+            for fn in os.listdir(self.cache_dir):
+                if fn.endswith('.result.json'):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, fn))
+                    except OSError:
+                        pass
+
+def _pymzqc_version() -> str:
+    try:
+        from importlib.metadata import version
+        return version('pymzqc')
+    except Exception:
+        return 'unknown'
+
+# the process-wide instances used by SemanticCheck and the accessories
+ontology_cache = OntologyCache()
+document_cache = DocumentCache()
+result_cache = ValidationResultCache()
@@ -1,25 +1,53 @@
 __author__ = 'bittremieux, walzer'
 import os
 import sys
+import json
+import time
+import hashlib
+import inspect
+import tempfile
+import threading
 from itertools import chain
 from dataclasses import dataclass
 from collections import UserDict, defaultdict
-from typing import Dict, List, Set, Tuple
+from typing import Callable, Dict, Generator, Iterable, List, Optional, Set, Tuple, Union
 from contextlib import contextmanager
-from pronto import Ontology, Term
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import numpy as np
 from jsonschema.exceptions import ValidationError
-from mzqc.MZQCFile import MzQcFile, BaseQuality, RunQuality, SetQuality, MetaDataParameters, QualityMetric, CvParameter
+from mzqc.MZQCFile import JsonSerialisable, MzQcFile, BaseQuality, RunQuality, SetQuality, MetaDataParameters, QualityMetric, CvParameter
+from mzqc import ResourceCache
+from mzqc.RawView import RawView, RawMzQcFile, RawBaseQuality, RawMetaDataParameters, RawQualityMetric, RawRunQuality, RawSetQuality, raw_view
+from mzqc.StreamReader import MzQcStreamReader
+from mzqc.VocabularyIndex import VocabularyIndex, TermRecord
+
+PENDING_SPOOL_SIZE = 1 << 24  # characters of pending streamed runs and sets kept in memory before spilling to disk
+
+_suppress_lock = threading.Lock()
+_suppress_state = {'depth': 0, 'stderr': None, 'devnull': None}
 
 @contextmanager
 def suppress_verbose_modules():
-    """prevent verbosity spill from other modules' messaging on stderr"""
-    with open(os.devnull, "w") as devnull:
-        sys_stderr_bak = sys.stderr
-        sys.stderr = devnull
-        try:
-            yield
-        finally:
-            sys.stderr = sys_stderr_bak
+    """prevent verbosity spill from other modules' messaging on stderr
+
+    Nesting and concurrent use from several threads is safe, stderr is 
+    restored when the last user exits.
+    """
+    with _suppress_lock:
+        if _suppress_state['depth'] == 0:
+            _suppress_state['devnull'] = open(os.devnull, "w")
+            _suppress_state['stderr'] = sys.stderr
+            sys.stderr = _suppress_state['devnull']
+        _suppress_state['depth'] += 1
+    try:
+        yield
+    finally:
+        with _suppress_lock:
+            _suppress_state['depth'] -= 1
+            if _suppress_state['depth'] == 0:
+                sys.stderr = _suppress_state['stderr']
+                _suppress_state['devnull'].close()
 
 @dataclass
 class SemanticIssue:
@@ -37,6 +65,78 @@ class SemanticIssue:
     def _to_string(self):
         return self.name + " of severity "+ str(self.severity) + " and message: " + self.message
 
+def _value_kind(value_type: type) -> str:
+    if issubclass(value_type, (bool, np.bool_)):
+        return 'boolean'
+    if issubclass(value_type, (int, float, np.number)):
+        return 'number'
+    if issubclass(value_type, str):
+        return 'string'
+    if value_type is type(None):
+        return 'null'
+    return 'other'
+
+def _value_kinds(values: list) -> Set[str]:
+    """The kinds of values (number, string, boolean, null, or other) in a flat list"""
+    return {_value_kind(t) for t in set(map(type, values))}
+
+def _has_non_finite(values: list) -> bool:
+    """True if any of the given numbers is NaN or infinite"""
+    try:
+        return not np.isfinite(np.asarray(values, dtype=float)).all()
+    except OverflowError:
+        # integers too large for a float (valid JSON) are finite, only the others can be NaN or infinite
+        return not np.isfinite(np.asarray([v for v in values if not isinstance(v, int)], dtype=float)).all()
+
+def _load_vocabulary_index(uri: str, version: str) -> VocabularyIndex:
+    """Loads a vocabulary index through the process-wide cache, usable as executor task"""
+    with suppress_verbose_modules():
+        return ResourceCache.ontology_cache.load_index(uri, version)
+
+# the checks by the category they file issues under, in order of execution
+CHECKS = ('label uniqueness', 'ontology load errors', 'ontology term errors', 'metric use', 'input files')
+# checks needing the vocabularies, these imply 'ontology load errors'
+VOCABULARY_CHECKS = ('ontology term errors', 'metric use')
+# named selections of checks, 'structural' needs no ontology
+PROFILES = {'full': CHECKS,
+            'structural': ('label uniqueness', 'input files'),
+            'vocabulary': ('ontology load errors', 'ontology term errors', 'metric use')}
+
+def resolve_checks(profile: str = 'full', enable: Iterable[str] = (), disable: Iterable[str] = ()) -> Tuple[str, ...]:
+    """Resolves the checks to run from a profile and individually enabled or disabled checks
+
+    Parameters
+    ----------
+    profile : str, optional
+        name of the profile (see PROFILES), by default 'full'
+    enable : Iterable[str], optional
+        checks to run in addition to the profile's, by default none
+    disable : Iterable[str], optional
+        checks of the profile not to run, by default none
+
+    Returns
+    -------
+    Tuple[str, ...]
+        the checks in order of execution
+
+    Raises
+    ------
+    ValueError
+        for unknown profile or check names
+    """
+    if profile not in PROFILES:
+        raise ValueError("Unknown validation profile '{}', use one of {}".format(profile, list(PROFILES)))
+    unknown = (set(enable) | set(disable)) - set(CHECKS)
+    if unknown:
+        raise ValueError("Unknown validation check(s) {}, use any of {}".format(sorted(unknown), list(CHECKS)))
+    selected = (set(PROFILES[profile]) | set(enable)) - set(disable)
+    if selected & set(VOCABULARY_CHECKS):
+        selected.add('ontology load errors')
+    return tuple(c for c in CHECKS if c in selected)
+
+# a callback receiving (category, issue) or a generator receiving them by send()
+IssueSink = Union[Callable[[str, SemanticIssue], None], Generator[None, Tuple[str, SemanticIssue], None]]
+
 class SemanticCheck(UserDict):
     """Class for keeping track of all instances of SemanticIssues arising during semantic validation.
     
@@ -55,29 +155,115 @@ class SemanticCheck(UserDict):
     `string_export` which are present as convenience functions to the validator applications in the
     accessories of the project's repository. See the `validate` function documentation for further 
     details. 
+    The mzqc_obj can also be given as deserialised plain JSON (e.g. from `json.load`, with or without 
+    the outer `mzQC` object), which is then validated through a RawView (see mzqc.RawView) with the 
+    same issues as for the MzQcFile object, without constructing the object graph first. For 
+    documents too large to load whole, a MzQcStreamReader (see mzqc.StreamReader) can be given.
     
     Parameters
     ----------
     UserDict : Dict[str,List[SemanticIssue]]
         keeps track of the issues during validation
     """
-    def __init__(self, mzqc_obj: MzQcFile, version: str="", file_path: str=""):
+    def __init__(self, mzqc_obj: Union[MzQcFile, Dict], version: str="", file_path: str=""):
+        self._issue_count:int=0
         super().__init__()
         self.version = version
         self.file_path = file_path
-        self.mzqc_obj = mzqc_obj
+        # plain JSON is validated through a view, without building the mzQC object graph
+        self.mzqc_obj = raw_view(mzqc_obj) if isinstance(mzqc_obj, dict) else mzqc_obj
         # the following are to keep record of the validation parameters and 
         # set by the validate() function
         self._max_errors:int=0
         self._load_local:bool=False
         self._keep_issues:bool=False
         self._exceeded_errors:bool=False
+        self._started:float=0.0
+        self._deadline:Optional[float]=None
+        self._exceeded_time:bool=False
+        self._issue_sink:Optional[IssueSink]=None
+        self._checks:Tuple[str, ...]=CHECKS
+        # per-run/set summaries kept for incremental validation, see _validate_incremental
+        self._incremental_state:Optional[Dict]=None
+        # seconds spent per check (by category) in the last sequential or streaming validation
+        self.timings:Dict[str, float]=dict()
+
+    def _store(self, key, value):
+        """Stores a category's issue list and keeps the running issue count up-to-date"""
+        self._issue_count += len(value) - len(self.data.get(key, ()))
+        self.data[key] = value
+
+    def _abort_max_errors(self):
+        """Registers the general issue for exceeding max_errors and aborts the validation
+
+        Raises
+        ------
+        ValidationError
+            always, with the number of issues registered
+        """
+        self._exceeded_errors = True
+        general = SemanticIssue("Max semantic issues", 1,
+                        f"Maximum number of semantic errors incurred ({self._max_errors} < {self._issue_count}), aborting!")
+        self._store("general", [general])
+        self._emit("general", general)
+        raise ValidationError("Maximum number of semantic errors incurred ({me} < {ie}), aborting!".format(
+            ie=self._issue_count, me = self._max_errors))
+
+    def _remaining_time(self) -> Optional[float]:
+        """Seconds left until the validation deadline, None if there is none"""
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - time.monotonic())
+
+    @contextmanager
+    def _timed(self, category: str):
+        """Adds the time spent in the block to the check's entry in `timings`, also if it aborts"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[category] = self.timings.get(category, 0.0) + time.perf_counter() - start
+
+    def _check_deadline(self):
+        """Aborts the validation if its deadline (see `validate`) has passed"""
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            self._abort_time_budget()
+
+    def _abort_time_budget(self):
+        """Registers the general issue for exceeding the time budget and aborts the validation
+
+        Raises
+        ------
+        ValidationError
+            always, with the time spent
+        """
+        self._exceeded_time = True
+        elapsed = time.monotonic() - self._started
+        general = SemanticIssue("Time budget exceeded", 1,
+                        f"Validation time budget exceeded after {elapsed:.3f}s ({self._issue_count} issues found), aborting!")
+        self._store("general", [general])
+        self._emit("general", general)
+        raise ValidationError("Validation time budget exceeded after {t:.3f}s, aborting!".format(t=elapsed))
+
+    def _emit(self, category: str, issue: SemanticIssue):
+        """Passes a newly registered issue on to the issue sink, if one is set for the validation"""
+        if self._issue_sink is None:
+            return
+        if hasattr(self._issue_sink, 'send'):
+            if inspect.getgeneratorstate(self._issue_sink) == inspect.GEN_CREATED:
+                next(self._issue_sink)
+            self._issue_sink.send((category, issue))
+        else:
+            self._issue_sink(category, issue)
 
     def __setitem__(self, key, value):
         """Overrides the UserDict item to keep watch on the maximum allowed number of 
         registered issues before validation is interrupted (through an error raised from
         this function)
 
+        The number of registered issues is kept as a running count, no category lists 
+        need to be summed up.
+
         Parameters
         ----------
         key : str
@@ -90,39 +276,55 @@ class SemanticCheck(UserDict):
         ValidationError
             if self._max_errors is exceeded by the sum of items contained in category lists of issues
         """
-        if self._max_errors > 0:
-            if sum([len(x) for x in self.values()])+1 > self._max_errors:
-                self._exceeded_errors = True
-                super().__setitem__(key, value)
-                super().__setitem__("general", [SemanticIssue("Max semantic issues", 1,
-                                f"Maximum number of semantic errors incurred ({self._max_errors} < {sum([len(x) for x in self.values()])}), aborting!")])
-                raise ValidationError("Maximum number of semantic errors incurred ({me} < {ie}), aborting!".format(
-                    ie=sum([len(x) for x in self.values()]), me = self._max_errors))
-        super().__setitem__(key, value)
-    
+        exceeding = self._max_errors > 0 and self._issue_count+1 > self._max_errors
+        self._store(key, value)
+        if exceeding:
+            self._abort_max_errors()
+
+    def __delitem__(self, key):
+        self._issue_count -= len(self.data[key])
+        del self.data[key]
+
     def raising(self, category:str, issue:SemanticIssue):
         """Helper function to append new issues without circumventing the max_error 
         mechanism or initialising new issue types or categories
 
+        The issue is appended in place and passed on to the issue sink of the 
+        validation (see `validate`). Also the validation deadline is checked.
+
         Parameters
         ----------
         category : str
             issue type or category, key to __setitem__
         issue : SemanticIssue
-            A 
+            A newly found issue
         """
-        if category not in self.keys():
-            self[category]=[issue]
+        exceeding = self._max_errors > 0 and self._issue_count+1 > self._max_errors
+        if isinstance(self.data.get(category), list):
+            self.data[category].append(issue)
+            self._issue_count += 1
         else:
-            self[category]=self[category]+[issue]
+            self._store(category, list(self.data.get(category, ())) + [issue])
+        self._emit(category, issue)
+        if exceeding:
+            self._abort_max_errors()
+        self._check_deadline()
 
     def clear(self) -> None:
-        """Substitute to the UserDict clear which clears the dict and resets _exceeded_errors
+        """Substitute to the UserDict clear which clears the dict and resets _exceeded_errors 
+        and _exceeded_time
         """
-        super().clear()
+        self.data.clear()
+        self._issue_count = 0
         self._exceeded_errors = False
+        self._exceeded_time = False
         return
 
+    @property
+    def issue_count(self) -> int:
+        """The number of issues currently registered, over all categories"""
+        return self._issue_count
+
     def _get_cv_parameters(self, val: object):
         """Recursively retrieves all elements of type cvParameter from the object
 
@@ -136,13 +338,16 @@ class SemanticCheck(UserDict):
         cvParameter
             any object that has an 'accession' member
         """
-        if isinstance(val, List):
+        if isinstance(val, list):
             for v in val:
                 yield from self._get_cv_parameters(v)
         elif isinstance(val, (MzQcFile,SetQuality,RunQuality,MetaDataParameters)):
             for attr, value in vars(val).items():
                 yield from self._get_cv_parameters(value)
-        elif isinstance(val, QualityMetric):
+        elif isinstance(val, (RawMzQcFile,RawBaseQuality,RawMetaDataParameters)):
+            for attr, _ in val._fields:
+                yield from self._get_cv_parameters(getattr(val, attr))
+        elif isinstance(val, (QualityMetric, RawQualityMetric)):
             if hasattr(val, 'accession'):
                 yield from self._get_cv_parameters(val.unit)
                 yield val
@@ -165,23 +370,51 @@ class SemanticCheck(UserDict):
                     "Run/SetQuality label {} is not unique in file!".format("auto_doc")))
             return
 
-        uniq_labels = set()
-        for qle in chain(self.mzqc_obj.runQualities,self.mzqc_obj.setQualities):
-            if qle.metadata.label != "":
-                if qle.metadata.label in uniq_labels:
-                    self.raising(issue_type_category, SemanticIssue("Metadata labels", 6,
-                        "Run/SetQuality label {} is not unique in file!".format(qle.metadata.label)))
-                else:
-                    uniq_labels.add(qle.metadata.label)
-
+        for issue in self._label_issues(qle.metadata.label for qle in
+                                        chain(self.mzqc_obj.runQualities,self.mzqc_obj.setQualities)):
+            self.raising(issue_type_category, issue)
         return
 
+    def _label_issues(self, labels: Iterable[str], uniq_labels: Optional[Set[str]] = None) -> List[SemanticIssue]:
+        """Finds the non-unique labels among the given, in order of occurrence
+
+        Parameters
+        ----------
+        labels : Iterable[str]
+            the metadata labels of all runs and sets, empty labels are ignored
+        uniq_labels : Set[str], optional
+            the labels seen before, updated in place (e.g. when checking runs one at a time), 
+            by default None for none
+
+        Returns
+        -------
+        List[SemanticIssue]
+            an issue for each repeated label occurrence
+        """
+        issues = list()
+        uniq_labels = set() if uniq_labels is None else uniq_labels
+        for label in labels:
+            if label != "":
+                if label in uniq_labels:
+                    issues.append(SemanticIssue("Metadata labels", 6,
+                        "Run/SetQuality label {} is not unique in file!".format(label)))
+                else:
+                    uniq_labels.add(label)
+        return issues
+
     def _load_and_check_Vocabularies(self, issue_type_category: str, 
                                      load_local: bool = False, 
-                                     _document_collected_issues: bool = False
-                                     ) -> Dict[str,Ontology]:
+                                     _document_collected_issues: bool = False,
+                                     executor: Optional[Executor] = None,
+                                     controlled_vocabularies: Optional[Iterable] = None
+                                     ) -> Dict[str,VocabularyIndex]:
         """Loads remote or local vocabularies and registers any issues during load
 
+        Vocabularies are retrieved as compiled VocabularyIndex through the process-wide 
+        `ResourceCache.ontology_cache`, so repeated validations only parse each (URI, version) 
+        once, and subsequent checks need no ontology traversal. With an offline resource 
+        bundle in use (see `ResourceCache.use_bundle`), remote vocabularies come from the bundle.
+
         Parameters
         ----------
         issue_type_category : str
@@ -190,11 +423,15 @@ class SemanticCheck(UserDict):
             if True file URIs referencing a local fs are attempted to load, by default False
         _document_collected_issues : bool, optional
             for auto documentation this is set True, by default False
+        executor : Executor, optional
+            if given, all vocabularies are loaded concurrently on it, by default None
+        controlled_vocabularies : Iterable, optional
+            the controlled vocabulary entries to load, by default those of the mzqc_obj
 
         Returns
         -------
-        Dict[str,Ontology]
-            the loaded vocabularies as pronto Ontlogies, key is the name of the Ontology
+        Dict[str,VocabularyIndex]
+            the loaded vocabularies as compiled indices, key is the name of the Ontology
         """
         if _document_collected_issues:
             self.raising(issue_type_category, SemanticIssue("Loading local vocabulary", 5,
@@ -204,22 +441,39 @@ class SemanticCheck(UserDict):
             return
 
         vocs = dict()
+        loads = list()
 
         # check if ontologies are listed multiple times (different versions etc)
-        for cve in self.mzqc_obj.controlledVocabularies:
+        if controlled_vocabularies is None:
+            controlled_vocabularies = self.mzqc_obj.controlledVocabularies
+        for cve in controlled_vocabularies:
+            loc = cve.uri
+            # check if local CV was used
+            if load_local and loc.startswith('file://'):
+                loc = loc[len('file://'):]
+            if executor is None:
+                loads.append((cve, loc, None))
+            else:
+                loads.append((cve, loc, executor.submit(_load_vocabulary_index, loc, cve.version)))
+
+        # issues are registered in order of the CV list, regardless of completion order
+        for cve, loc, load in loads:
+            self._check_deadline()
             try:
-                # check if local CV was used
-                if load_local:
-                    loc = cve.uri
-                    if loc.startswith('file://'):
-                        loc = loc[len('file://'):]
-                        self.raising(issue_type_category, SemanticIssue("Loading local vocabulary", 5,
-                                                  f'Loading the following local ontology referenced in mzQC file: {loc}'))
-                    with suppress_verbose_modules():
-                        vocs[cve.name] = Ontology(loc, import_depth=0)
+                if load_local and cve.uri.startswith('file://'):
+                    self.raising(issue_type_category, SemanticIssue("Loading local vocabulary", 5,
+                                              f'Loading the following local ontology referenced in mzQC file: {loc}'))
+                if load is None:
+                    vocs[cve.name] = _load_vocabulary_index(loc, cve.version)
                 else:
-                    with suppress_verbose_modules():
-                        vocs[cve.name] = Ontology(cve.uri, import_depth=0)
+                    try:
+                        vocs[cve.name] = load.result(timeout=self._remaining_time())
+                    except FutureTimeoutError:
+                        if not load.done():
+                            self._abort_time_budget()
+                        raise  # the load itself timed out
+            except ValidationError:
+                raise  # max_errors or time budget exceeded while registering the local load
             except Exception as e:
                 self.raising(issue_type_category, SemanticIssue("Loading online vocabulary", 5,
                                           f'Error loading the following online ontology referenced in mzQC file: {e}'))
@@ -257,130 +511,168 @@ class SemanticCheck(UserDict):
 
             return
 
-        input_file_sets = defaultdict(set)  # [name: [location(s)]]
         for quality in chain(self.mzqc_obj.runQualities, self.mzqc_obj.setQualities):
-            one_input_file_location_set = set()
-            for input_file in quality.metadata.inputFiles:
-                input_file_sets[input_file.name].add(input_file.location)
-                if input_file.name not in input_file.location:
-                    self.raising(issue_type_category,
-                                 SemanticIssue("Inconsistent input file", 1,
-                                                f'Possible file name and location inconsistency:'
-                                                f'{input_file.name}/{input_file.location}'))
-                one_input_file_location_set.add(input_file.location)
-
-            # if more than 2 inputs but just one location
-            if len(quality.metadata.inputFiles) != len(one_input_file_location_set):
-                self.raising(issue_type_category,
-                             SemanticIssue("Reused file location", 5,
-                                            f'Duplicate inputFile locations within '
-                                            f'one metadata object: {one_input_file_location_set}'))
+            self._check_deadline()
+            for issue in self._quality_InputFile_issues(quality):
+                self.raising(issue_type_category, issue)
         # conceptually no problems with reuse of locations for different purposes
 
         # check duplicates
+        for issue in self._input_file_duplicate_issues(
+                (input_file.name, input_file.location) for quality in
+                chain(self.mzqc_obj.runQualities, self.mzqc_obj.setQualities)
+                for input_file in quality.metadata.inputFiles):
+            self.raising(issue_type_category, issue)
+        return
+
+    def _quality_InputFile_issues(self, quality: BaseQuality) -> List[SemanticIssue]:
+        """Checks the InputFile consistency within one run or set quality
+
+        Parameters
+        ----------
+        quality : BaseQuality
+            the run or set quality to check
+
+        Returns
+        -------
+        List[SemanticIssue]
+            the issues found, in order of detection
+        """
+        issues = list()
+        one_input_file_location_set = set()
+        for input_file in quality.metadata.inputFiles:
+            if input_file.name not in input_file.location:
+                issues.append(SemanticIssue("Inconsistent input file", 1,
+                                            f'Possible file name and location inconsistency:'
+                                            f'{input_file.name}/{input_file.location}'))
+            one_input_file_location_set.add(input_file.location)
+
+        # if more than 2 inputs but just one location
+        if len(quality.metadata.inputFiles) != len(one_input_file_location_set):
+            issues.append(SemanticIssue("Reused file location", 5,
+                                        f'Duplicate inputFile locations within '
+                                        f'one metadata object: {one_input_file_location_set}'))
+        return issues
+
+    def _input_file_duplicate_issues(self, input_files: Iterable[Tuple[str,str]]) -> List[SemanticIssue]:
+        """Checks that input file names correspond to one location each across all runs and sets
+
+        Parameters
+        ----------
+        input_files : Iterable[Tuple[str,str]]
+            name and location of all input files, in order of occurrence
+
+        Returns
+        -------
+        List[SemanticIssue]
+            an issue for each name with multiple locations
+        """
+        input_file_sets = defaultdict(set)  # [name: [location(s)]]
+        for name, location in input_files:
+            input_file_sets[name].add(location)
+        return self._input_file_location_issues(input_file_sets)
+
+    def _input_file_location_issues(self, input_file_sets: Dict[str,Set[str]]) -> List[SemanticIssue]:
+        """Reports the input file names with multiple locations, see `_input_file_duplicate_issues`
+
+        Parameters
+        ----------
+        input_file_sets : Dict[str,Set[str]]
+            the locations of each input file name, in order of occurrence of the names
+
+        Returns
+        -------
+        List[SemanticIssue]
+            an issue for each name with multiple locations
+        """
+        issues = list()
         for k,v in input_file_sets.items():
             if len(v)>1:
-                self.raising(issue_type_category,
-                            SemanticIssue("Duplicate names for input files with different locations ", 6,
+                issues.append(SemanticIssue("Duplicate names for input files with different locations ", 6,
                                             f'Input file names not location-unique '
                                             f'(one inputFile.name must correspond to one inputFile.location): '
                                             f'{k} = {v}'))
-        return
+        return issues
 
-    def _get_vocabulary_metrics(self, filevocabularies: Dict[str,Ontology]) -> Set[str]:
+    def _get_vocabulary_metrics(self, filevocabularies: Dict[str,VocabularyIndex]) -> Set[str]:
         """Retrieves all metric type accessions from given vocabularies
 
         Parameters
         ----------
-        filevocabularies : Dict[str,Ontology]
-            the vocabularies given as a dict of names and pronto Ontology objects
+        filevocabularies : Dict[str,VocabularyIndex]
+            the vocabularies given as a dict of names and compiled indices
 
         Returns
         -------
         Set[str]
             a set of accessions of metric type terms in the given vocabularies
         """
-        metricsubclass_sets_list = list()
-        for k,v in filevocabularies.items():
-            try:
-                metricsubclass_sets_list.append({x.id for x in v['MS:4000002'].subclasses().to_set()})
-            except KeyError:
-                pass
-        return set().union(chain.from_iterable(metricsubclass_sets_list))
+        return set().union(*(v.metrics for v in filevocabularies.values()))
 
-    def _get_vocabulary_idmetrics(self, filevocabularies: Dict[str,Ontology]) -> Set[str]:
+    def _get_vocabulary_idmetrics(self, filevocabularies: Dict[str,VocabularyIndex]) -> Set[str]:
         """Retrieves all ID based type accessions from given vocabularies
 
         Parameters
         ----------
-        filevocabularies : Dict[str,Ontology]
-            the vocabularies given as a dict of names and pronto Ontology objects
+        filevocabularies : Dict[str,VocabularyIndex]
+            the vocabularies given as a dict of names and compiled indices
 
         Returns
         -------
         Set[str]
             a set of accessions of ID based type terms in the given vocabularies
         """
-        metricsubclass_sets_list = list()
-        for k,v in filevocabularies.items():
-            try:
-                metricsubclass_sets_list.append(
-                    {pib.id for pib in {x for x in v['MS:4000002'].subclasses().to_set()} if \
-                        v['MS:4000008'] in pib.relationships.get(v.get_relationship('has_metric_category'),[])}\
-                )
-            except KeyError:
-                pass
-        return set().union(chain.from_iterable(metricsubclass_sets_list))
-
-    def _get_vocabulary_idfiles(self, filevocabularies: Dict[str,Ontology]) -> Set[str]:
+        return set().union(*(v.idmetrics for v in filevocabularies.values()))
+
+    def _get_vocabulary_idfiles(self, filevocabularies: Dict[str,VocabularyIndex]) -> Set[str]:
         """Retrieves all ID based file type accessions from given vocabularies
 
         Parameters
         ----------
-        filevocabularies : Dict[str,Ontology]
-            the vocabularies given as a dict of names and pronto Ontology objects
+        filevocabularies : Dict[str,VocabularyIndex]
+            the vocabularies given as a dict of names and compiled indices
 
         Returns
         -------
         Set[str]
             a set of accessions of ID based type terms in the given vocabularies
         """
-        idfilesubclass_sets_list = list()
-        for k,v in filevocabularies.items():
-            try:
-                idfilesubclass_sets_list.append(
-                    {pib.id for pib in {x for x in v['MS:1002130'].subclasses().to_set()}}
-                )
-            except KeyError:
-                pass
-        return set().union(chain.from_iterable(idfilesubclass_sets_list))
-
-    def _get_vocabulary_tables(self, filevocabularies: Dict[str,Ontology]) -> Set[str]:
+        return set().union(*(v.idfiles for v in filevocabularies.values()))
+
+    def _get_vocabulary_tables(self, filevocabularies: Dict[str,VocabularyIndex]) -> Set[str]:
         """Retrieves all table type accessions from given vocabularies
 
         Parameters
         ----------
-        filevocabularies : Dict[str,Ontology]
-            the vocabularies given as a dict of names and pronto Ontology objects
+        filevocabularies : Dict[str,VocabularyIndex]
+            the vocabularies given as a dict of names and compiled indices
 
         Returns
         -------
         Set[str]
             a set of accessions of table type terms in the given vocabularies
         """
-        tablesubclass_sets_list = list()
-        for k,v in filevocabularies.items():
-            try:
-                tablesubclass_sets_list.append(
-                    {x.id for x in v['MS:4000005'].subclasses().to_set()})
-            except KeyError:
-                pass
-        return set().union(chain.from_iterable(tablesubclass_sets_list))
+        return set().union(*(v.tables for v in filevocabularies.values()))
+
+    def _get_vocabulary_matrices(self, filevocabularies: Dict[str,VocabularyIndex]) -> Set[str]:
+        """Retrieves all matrix type accessions from given vocabularies
+
+        Parameters
+        ----------
+        filevocabularies : Dict[str,VocabularyIndex]
+            the vocabularies given as a dict of names and compiled indices
+
+        Returns
+        -------
+        Set[str]
+            a set of accessions of matrix type terms in the given vocabularies
+        """
+        return set().union(*(v.matrices for v in filevocabularies.values()))
 
     def _get_required_cols(self, accession: str,
-                         filevocabularies: Dict[str,Ontology]
-                         ) -> Tuple[Set[Term],Set[Term]]:
-        """Retrieves the names of required columns from the given accession
+                         filevocabularies: Dict[str,VocabularyIndex]
+                         ) -> Tuple[Set[str],Set[str]]:
+        """Retrieves the accessions of required columns from the given accession
 
         The accession is looked up in the given vocabularies
 
@@ -388,26 +680,20 @@ class SemanticCheck(UserDict):
         ----------
         accession : str
             accession of a table type metric within the given vocabularies
-        filevocabularies : Dict[str,Ontology]
-            the vocabularies given as a dict of names and pronto Ontology objects
+        filevocabularies : Dict[str,VocabularyIndex]
+            the vocabularies given as a dict of names and compiled indices
 
         Returns
         -------
-        Tuple[Set[Term],Set[Term]]
-            a tuple of sets, the first for required columns' names,  
-            the second for the optional columns' names 
+        Tuple[Set[str],Set[str]]
+            a tuple of sets, the first for required columns' accessions,  
+            the second for the optional columns' accessions 
         """
-        tab_def = None
-        for k,v in filevocabularies.items():
-            try:
-                tab_def = v[accession]
-                break
-            except KeyError:
-                pass
-        if not tab_def:
-            return set(),set()
-        else:
-            return set(next(filter(lambda x: x[0].name=='has_column', tab_def.relationships.items()), (None,frozenset()))[1]), set(next(filter(lambda x: x[0].name=='has_optional_column', tab_def.relationships.items()), (None,frozenset()))[1])
+        for v in filevocabularies.values():
+            tab_def = v.get(accession)
+            if tab_def:
+                return set(tab_def.required_columns), set(tab_def.optional_columns)
+        return set(),set()
 
     def _has_id_InputFile(self, run_or_set_quality: BaseQuality, idfile_cvs: Set) -> bool:
         """Confirms if a run or set_quality has ID type file in their inputFile
@@ -442,21 +728,29 @@ class SemanticCheck(UserDict):
         return False
 
     def _check_CVTerm_match(self, issue_type_category: str,
-                            cv_par: CvParameter, voc_par: Term,
-                            _document_collected_issues: bool = False):
+                            cv_par: CvParameter, voc_par: TermRecord,
+                            _document_collected_issues: bool = False) -> List[SemanticIssue]:
         """Checks any cvParameter for correct definition and reference
 
+        The detected issues are returned, not raised, so the caller can reuse them for 
+        repeated occurrences of the same parameter. Whether a term is a unit (and hence exempt 
+        from definition checks) comes from the memoized term ancestry of the VocabularyIndex.
+
         Parameters
         ----------
         issue_type_category : str
             the issue type or category under which detected issues are filed 
         cv_par : CvParameter
             the parameter to be checked
-        voc_par : Term
-            the ontology term it is referencing
+        voc_par : TermRecord
+            the (compiled) ontology term it is referencing
         _document_collected_issues : bool, optional
             for auto documentation this is set True, by default False
 
+        Returns
+        -------
+        List[SemanticIssue]
+            the issues found for the given parameter
         """
         if _document_collected_issues:
             self.raising(issue_type_category,
@@ -471,37 +765,69 @@ class SemanticCheck(UserDict):
                          SemanticIssue("Used CVTerms name conflict", 6,
                                         f'Term instance used in file with name different from ontology: '
                                         f'accession = {"auto_doc"}'))
-            return
+            return []
 
+        issues = list()
         # warn if definition is empty or mismatch
-        if not cv_par.description and 'UO:0000000' not in {t.id for t in voc_par.superclasses(with_self=False).to_set()}:
-            self.raising(issue_type_category,
-                         SemanticIssue("Used CVTerm without definition", 4,
+        if not cv_par.description and not voc_par.is_unit:
+            issues.append(SemanticIssue("Used CVTerm without definition", 4,
                                         f'Term instance used in file missing definition: '
                                         f'accession = {cv_par.accession}'))
-        elif cv_par.description != voc_par.definition and 'UO:0000000' not in {t.id for t in voc_par.superclasses(with_self=False).to_set()}:
+        elif cv_par.description != voc_par.definition and not voc_par.is_unit:
         # elif as the following error would be nonsensical for omitted definition
-            self.raising(issue_type_category,
-                         SemanticIssue("Used CVTerms definition conflict", 5,
+            issues.append(SemanticIssue("Used CVTerms definition conflict", 5,
                                         f'Term instance used in file with definition different from ontology: '
                                         f'accession = {cv_par.accession}'))
         if cv_par.name != voc_par.name:
-            self.raising(issue_type_category,
-                         SemanticIssue("Used CVTerms name conflict", 6,
+            issues.append(SemanticIssue("Used CVTerms name conflict", 6,
                                         f'Term instance used in file with name different from ontology: '
                                         f'accession = {cv_par.accession}'))
-        return
+        return issues
+
+    def _check_CVTerm(self, issue_type_category: str, cv_parameter: CvParameter,
+                      file_vocabularies: Dict[str,VocabularyIndex]) -> List[SemanticIssue]:
+        """Collects the issues of a single cvParameter occurrence
+
+        Parameters
+        ----------
+        issue_type_category : str
+            the issue type or category under which detected issues are filed 
+        cv_parameter : CvParameter
+            the parameter to be checked
+        file_vocabularies : Dict[str,VocabularyIndex]
+            the mzQC referenced vocabularies
+
+        Returns
+        -------
+        List[SemanticIssue]
+            the issues found for the given parameter
+        """
+        # Verify that the term exists in the CV.
+        voc_par: List[TermRecord] = list(filter(None, [cvoc.get(cv_parameter.accession) for cvoc in file_vocabularies.values()]))
+        if len(voc_par) > 1:
+            # multiple choices for accession error
+            occs = [str(o) for o in voc_par]
+            return [SemanticIssue("Ambiguous CVTerms", 6,
+                                  f'term found in multiple vocabularies = {",".join(occs)}')]
+        elif len(voc_par) < 1:
+            return [SemanticIssue("Unknown CVTerm", 7,
+                                  f'CV term used without matching ontology entry: '
+                                  f'accession = {cv_parameter.accession}')]
+        return self._check_CVTerm_match(issue_type_category, cv_parameter, voc_par[0])
 
     def _check_CVTerm_use(self, issue_type_category: str,
-                          file_vocabularies: Dict[str,Ontology],
+                          file_vocabularies: Dict[str,VocabularyIndex],
                           _document_collected_issues: bool = False):
         """Checks any cvParameter for correct use according to definition and schema
 
+        Each distinct (accession, name, description) combination is checked once per file, 
+        repeated occurrences register the same issues again without a new check.
+
         Parameters
         ----------
         issue_type_category : str
             the issue type or category under which detected issues are filed 
-        file_vocabularies : Dict[str,Ontology]
+        file_vocabularies : Dict[str,VocabularyIndex]
             the mzQC referenced vocabularies
         _document_collected_issues : bool, optional
             for auto documentation this is set True, by default False
@@ -517,27 +843,49 @@ class SemanticCheck(UserDict):
             self._check_CVTerm_match(issue_type_category, None, None, _document_collected_issues)
             return
 
-        # For all cv terms involved:
-        for cv_parameter in self._get_cv_parameters(self.mzqc_obj):
-            # Verify that the term exists in the CV.
-            voc_par: List[SemanticIssue] = list(filter(None, [cvoc.get(cv_parameter.accession) for cvoc in file_vocabularies.values()]))
-            if len(voc_par) > 1:
-                # multiple choices for accession error
-                occs = [str(o) for o in voc_par]
-                self.raising(issue_type_category,
-                             SemanticIssue("Ambiguous CVTerms", 6,
-                                        f'term found in multiple vocabularies = {",".join(occs)}'))
-            elif len(voc_par) < 1:
-                self.raising(issue_type_category, SemanticIssue("Unknown CVTerm", 7,
-                                        f'CV term used without matching ontology entry: '
-                                        f'accession = {cv_parameter.accession}'))
-            else:
-                self._check_CVTerm_match(issue_type_category, cv_parameter,
-                                         voc_par[0], _document_collected_issues)
+        checked: Dict[Tuple[str,str,str],List[SemanticIssue]] = dict()
+        for quality in chain(self.mzqc_obj.runQualities, self.mzqc_obj.setQualities):
+            self._check_deadline()
+            for issue in self._quality_CVTerm_issues(issue_type_category, quality, file_vocabularies, checked):
+                self.raising(issue_type_category, issue)
         return
 
+    def _quality_CVTerm_issues(self, issue_type_category: str, quality: BaseQuality,
+                               file_vocabularies: Dict[str,VocabularyIndex],
+                               checked: Dict[Tuple[str,str,str],List[SemanticIssue]]
+                               ) -> List[SemanticIssue]:
+        """Checks the cvParameters of one run or set quality, see `_check_CVTerm_use`
+
+        Parameters
+        ----------
+        issue_type_category : str
+            the issue type or category under which detected issues are filed 
+        quality : BaseQuality
+            the run or set quality to check
+        file_vocabularies : Dict[str,VocabularyIndex]
+            the mzQC referenced vocabularies
+        checked : Dict[Tuple[str,str,str],List[SemanticIssue]]
+            issues by (accession, name, description) already checked, updated in place
+
+        Returns
+        -------
+        List[SemanticIssue]
+            the issues found, in order of detection
+        """
+        issues = list()
+        # For all cv terms involved:
+        for cv_parameter in self._get_cv_parameters(quality):
+            try:
+                occurrence = (cv_parameter.accession, cv_parameter.name, cv_parameter.description)
+                if occurrence not in checked:
+                    checked[occurrence] = self._check_CVTerm(issue_type_category, cv_parameter, file_vocabularies)
+                issues.extend(checked[occurrence])
+            except TypeError:  # unhashable (i.e. malformed) parameter attributes
+                issues.extend(self._check_CVTerm(issue_type_category, cv_parameter, file_vocabularies))
+        return issues
+
     def _check_metric_use(self, issue_type_category: str,
-                          file_vocabularies: Dict[str,Ontology],
+                          file_vocabularies: Dict[str,VocabularyIndex],
                           _document_collected_issues: bool = False):
         """Checks any QC metric for correct use according to definition and schema
 
@@ -545,7 +893,7 @@ class SemanticCheck(UserDict):
         ----------
         issue_type_category : str
             the issue type or category under which detected issues are filed 
-        file_vocabularies : Dict[str,Ontology]
+        file_vocabularies : Dict[str,VocabularyIndex]
             the mzQC referenced vocabularies
         _document_collected_issues : bool, optional
             for auto documentation this is set True, by default False
@@ -577,6 +925,21 @@ class SemanticCheck(UserDict):
             self.raising(issue_type_category, SemanticIssue("Metric value undefined table column", 5,
                                                 f'Table metric CV term used with extra (undefined) columns: '
                                                 f'accession(s) = {"auto_doc"}'))
+            self.raising(issue_type_category, SemanticIssue("Metric value mixed-type column", 6,
+                                                f'Table metric CV term used with mixed value types in a column: '
+                                                f'accession = {"auto_doc"}, column(s) = {"auto_doc"}'))
+            self.raising(issue_type_category, SemanticIssue("Metric value non-finite", 5,
+                                                f'Metric CV term used with NaN or infinite values: '
+                                                f'accession = {"auto_doc"}'))
+            self.raising(issue_type_category, SemanticIssue("Metric value non-matrix", 6,
+                                                f'Matrix metric CV term used without being a list of rows: '
+                                                f'accession = {"auto_doc"}'))
+            self.raising(issue_type_category, SemanticIssue("Metric value non-rectangular matrix", 9,
+                                                f'Matrix metric CV term used with differing row lengths: '
+                                                f'accession = {"auto_doc"}'))
+            self.raising(issue_type_category, SemanticIssue("Metric value mixed-type matrix", 6,
+                                                f'Matrix metric CV term used with mixed value types: '
+                                                f'accession = {"auto_doc"}'))
             self.raising(issue_type_category, SemanticIssue("Metric value no-unit", 3,
                                                 f'Metric CV term used without value unit specification. '
                                                 f'accession(s) = {"auto_doc"}'))
@@ -590,98 +953,202 @@ class SemanticCheck(UserDict):
 
         metric_cvs = self._get_vocabulary_metrics(file_vocabularies)
         table_cvs = self._get_vocabulary_tables(file_vocabularies)
+        matrix_cvs = self._get_vocabulary_matrices(file_vocabularies)
         idmetric_cvs = self._get_vocabulary_idmetrics(file_vocabularies)
         idfile_cvs = self._get_vocabulary_idfiles(file_vocabularies)
 
         for run_or_set_quality in chain(self.mzqc_obj.runQualities,self.mzqc_obj.setQualities):
-            # Check for ID metrics and if present if ID file is present in input
-            if any([quality_metric.accession in idmetric_cvs for
-                    quality_metric in run_or_set_quality.qualityMetrics]):
-                if not self._has_id_InputFile(run_or_set_quality, idfile_cvs):
-                    if run_or_set_quality.metadata.label != "":
-                        lab = run_or_set_quality.metadata.label
-                    else:
-                        lab = '+'.join([i.name for i in run_or_set_quality.metadata.inputFiles])
-                    self.raising(issue_type_category,
-                                 SemanticIssue("ID based metric but no ID input file", 6,
-                                                f'ID based metrics present but no ID input file could be found registered in the mzQC file: '
-                                                f'run/set label = {lab}'))
-
-            # Verify that quality metrics are unique within a run/setQuality.
-            uniq_accessions: Set[str] = set()
-            for quality_metric in run_or_set_quality.qualityMetrics:
-                if quality_metric.accession in uniq_accessions:
-                    self.raising(issue_type_category, SemanticIssue("Metric uniqueness", 6,
-                                                f'Duplicate quality metric in a run/set: '
-                                                f'accession = {quality_metric.accession}'))
-                else:
-                    uniq_accessions.add(quality_metric.accession)
-                # Verify that quality_metric actually is of metric type
-                if quality_metric.accession not in metric_cvs:
-                    self.raising(issue_type_category, SemanticIssue("Metric use", 5,
-                                                f'Non-metric CV term used in metric context: '
-                                                f'accession = {quality_metric.accession}'))
+            self._check_deadline()
+            for issue in self._quality_metric_issues(run_or_set_quality, file_vocabularies, metric_cvs,
+                                                     table_cvs, matrix_cvs, idmetric_cvs, idfile_cvs):
+                self.raising(issue_type_category, issue)
+        return
 
-                # Check table's value types and column lengths
-                if quality_metric.accession in table_cvs:
-                    req_col_accs = {x.id for x in self._get_required_cols(quality_metric.accession, file_vocabularies)[0]}
-                    opt_col_accs = {x.id for x in self._get_required_cols(quality_metric.accession, file_vocabularies)[1]}
+    def _quality_metric_issues(self, run_or_set_quality: BaseQuality,
+                               file_vocabularies: Dict[str,VocabularyIndex],
+                               metric_cvs: Set[str], table_cvs: Set[str], matrix_cvs: Set[str],
+                               idmetric_cvs: Set[str], idfile_cvs: Set[str]) -> List[SemanticIssue]:
+        """Checks the QC metrics of one run or set quality, see `_check_metric_use`
 
-                    if not isinstance(quality_metric.value , dict):
-                        self.raising(issue_type_category, SemanticIssue("Metric value non-table", 6,
-                                                f'Table metric CV term used without being a table: '
-                                                f'accession = {quality_metric.accession}'))
-                    elif not all([isinstance(sv, list) for sv in quality_metric.value.values()]):
-                        self.raising(issue_type_category, SemanticIssue("Metric value non-column", 6,
+        Parameters
+        ----------
+        run_or_set_quality : BaseQuality
+            the run or set quality to check
+        file_vocabularies : Dict[str,VocabularyIndex]
+            the mzQC referenced vocabularies
+        metric_cvs, table_cvs, matrix_cvs, idmetric_cvs, idfile_cvs : Set[str]
+            the accessions of metric, table, matrix, ID based metric, and ID file terms in the vocabularies
+
+        Returns
+        -------
+        List[SemanticIssue]
+            the issues found, in order of detection
+        """
+        issues = list()
+        # Check for ID metrics and if present if ID file is present in input
+        if any([quality_metric.accession in idmetric_cvs for
+                quality_metric in run_or_set_quality.qualityMetrics]):
+            if not self._has_id_InputFile(run_or_set_quality, idfile_cvs):
+                if run_or_set_quality.metadata.label != "":
+                    lab = run_or_set_quality.metadata.label
+                else:
+                    lab = '+'.join([i.name for i in run_or_set_quality.metadata.inputFiles])
+                issues.append(
+                    SemanticIssue("ID based metric but no ID input file", 6,
+                                            f'ID based metrics present but no ID input file could be found registered in the mzQC file: '
+                                            f'run/set label = {lab}'))
+
+        # Verify that quality metrics are unique within a run/setQuality.
+        uniq_accessions: Set[str] = set()
+        for quality_metric in run_or_set_quality.qualityMetrics:
+            if quality_metric.accession in uniq_accessions:
+                issues.append(SemanticIssue("Metric uniqueness", 6,
+                                            f'Duplicate quality metric in a run/set: '
+                                            f'accession = {quality_metric.accession}'))
+            else:
+                uniq_accessions.add(quality_metric.accession)
+            # Verify that quality_metric actually is of metric type
+            if quality_metric.accession not in metric_cvs:
+                issues.append(SemanticIssue("Metric use", 5,
+                                            f'Non-metric CV term used in metric context: '
+                                            f'accession = {quality_metric.accession}'))
+
+            # Check table's value types and column lengths
+            if quality_metric.accession in table_cvs:
+                req_col_accs, opt_col_accs = self._get_required_cols(quality_metric.accession, file_vocabularies)
+
+                table = quality_metric.value
+                if not isinstance(table, dict):
+                    issues.append(SemanticIssue("Metric value non-table", 6,
+                                            f'Table metric CV term used without being a table: '
+                                            f'accession = {quality_metric.accession}'))
+                else:
+                    columns_only = all(isinstance(sv, list) for sv in table.values())
+                    col_accs = set(table.keys())
+                    if not columns_only:
+                        issues.append(SemanticIssue("Metric value non-column", 6,
                                                 f'Table metric CV term used with non-column elements: '
                                                 f'accession = {quality_metric.accession}'))
-                    elif len({len(sv) for sv in quality_metric.value.values()}) != 1:
-                        self.raising(issue_type_category, SemanticIssue("Metric value disproportional table", 9,
+                    elif len({len(sv) for sv in table.values()}) != 1:
+                        issues.append(SemanticIssue("Metric value disproportional table", 9,
                                                 f'Table metric CV term used with differing column lengths: '
                                                 f'accession = {quality_metric.accession}'))
-                    elif not req_col_accs.issubset(set(quality_metric.value.keys())):
-                        deviants = ','.join(req_col_accs.difference(set(quality_metric.value.keys())))
-                        self.raising(issue_type_category, SemanticIssue("Metric value missing table column", 8,
+                    elif not req_col_accs.issubset(col_accs):
+                        deviants = ','.join(req_col_accs.difference(col_accs))
+                        issues.append(SemanticIssue("Metric value missing table column", 8,
                                                 f'Table metric CV term used missing required column(s): '
                                                 f'accession(s) = {deviants}'))
-                    elif not set(quality_metric.value.keys()).issubset(req_col_accs.union(opt_col_accs)):
-                        extras = ','.join(set(quality_metric.value.keys()).difference(req_col_accs.union(opt_col_accs)))
-                        self.raising(issue_type_category, SemanticIssue("Metric value undefined table column", 5,
+                    elif not col_accs.issubset(req_col_accs.union(opt_col_accs)):
+                        extras = ','.join(col_accs.difference(req_col_accs.union(opt_col_accs)))
+                        issues.append(SemanticIssue("Metric value undefined table column", 5,
                                                 f'Table metric CV term used with extra (undefined) columns: '
                                                 f'accession(s) = {extras}'))
-                # For regular metrics do a units use check (makes only sense for metrics with terms
-                # - those without are flagged already above)
-                else:
-                    # pythonic one-liner got out of hand, for maintainability the following is
-                    # explicit, no matter the performance:
-                    # we want the first matching term in the first vocabulary,
-                    # and the first unit if it has one
-                    quality_metric_term, quality_metric_term_unit = None, None
-                    for voc in file_vocabularies.values():
-                        if voc.get(quality_metric.accession):
-                            quality_metric_term = voc.get(quality_metric.accession)
-                            quality_metric_term_unit = next(iter(voc.get(quality_metric.accession).relationships.get(voc.get_relationship('has_units'),[None])))
-                            break
-                    if quality_metric_term_unit:
-                        if quality_metric.unit is None or quality_metric.unit == "":
-                            self.raising(issue_type_category,
-                                         SemanticIssue("Metric value no-unit", 3,
-                                            f'Metric CV term used without value unit specification. '
-                                            f'accession(s) = {quality_metric.accession}'))
-                        else:  # Unit present
-                            if quality_metric.unit.accession != quality_metric_term_unit.id:
-                                self.raising(issue_type_category,
-                                             SemanticIssue("Metric value unit misuse", 3,
-                                                f'Metric CV term used value unit specification diverging from CV specification. '
-                                                f'accession(s) = {quality_metric.accession}'))
-                    else:  # no unit on term but unit on metric
-                        if quality_metric.unit is not None or quality_metric.unit != "":
-                            self.raising(issue_type_category,
-                                         SemanticIssue("Metric value undefined unit", 3,
-                                            f'Metric CV term used value unit specification undefined in CV. '
+                    # the column values are checked regardless of the table's layout issues
+                    if columns_only:
+                        issues.extend(self._table_value_issues(quality_metric.accession, table))
+            # For regular metrics do a units use check (makes only sense for metrics with terms
+            # - those without are flagged already above)
+            else:
+                if quality_metric.accession in matrix_cvs:
+                    issues.extend(self._matrix_value_issues(quality_metric.accession, quality_metric.value))
+                # we want the first matching term in the first vocabulary,
+                # and the first unit if it has one
+                quality_metric_term_unit = None
+                for voc in file_vocabularies.values():
+                    quality_metric_term = voc.get(quality_metric.accession)
+                    if quality_metric_term:
+                        quality_metric_term_unit = next(iter(quality_metric_term.units), None)
+                        break
+                if quality_metric_term_unit:
+                    if quality_metric.unit is None or quality_metric.unit == "":
+                        issues.append(
+                            SemanticIssue("Metric value no-unit", 3,
+                                        f'Metric CV term used without value unit specification. '
+                                        f'accession(s) = {quality_metric.accession}'))
+                    else:  # Unit present
+                        if quality_metric.unit.accession != quality_metric_term_unit:
+                            issues.append(
+                                SemanticIssue("Metric value unit misuse", 3,
+                                            f'Metric CV term used value unit specification diverging from CV specification. '
                                             f'accession(s) = {quality_metric.accession}'))
+                else:  # no unit on term but unit on metric
+                    if quality_metric.unit is not None or quality_metric.unit != "":
+                        issues.append(
+                            SemanticIssue("Metric value undefined unit", 3,
+                                        f'Metric CV term used value unit specification undefined in CV. '
+                                        f'accession(s) = {quality_metric.accession}'))
+        return issues
 
-        return
+    def _table_value_issues(self, accession: str, table: Dict[str,list]) -> List[SemanticIssue]:
+        """Checks the values of a table metric's columns
+
+        Each column is checked for a single value type (numbers, strings, booleans, or nulls) and 
+        numeric columns for NaN or infinite values. Types are resolved once per distinct type 
+        in a column and finiteness is checked vectorised, so large tables check quickly.
+
+        Parameters
+        ----------
+        accession : str
+            accession of the table metric
+        table : Dict[str,list]
+            the table value, column accession to column values
+
+        Returns
+        -------
+        List[SemanticIssue]
+            the issues found, at most one per issue type
+        """
+        issues = list()
+        kinds = {col: _value_kinds(values) for col, values in table.items()}
+        mixed = [col for col, column_kinds in kinds.items() if len(column_kinds) > 1]
+        if mixed:
+            issues.append(SemanticIssue("Metric value mixed-type column", 6,
+                                        f'Table metric CV term used with mixed value types in a column: '
+                                        f'accession = {accession}, column(s) = {",".join(mixed)}'))
+        if any(kinds[col] == {'number'} and _has_non_finite(values) for col, values in table.items()):
+            issues.append(SemanticIssue("Metric value non-finite", 5,
+                                        f'Metric CV term used with NaN or infinite values: '
+                                        f'accession = {accession}'))
+        return issues
+
+    def _matrix_value_issues(self, accession: str, matrix: object) -> List[SemanticIssue]:
+        """Checks the value of a matrix metric (FloatMatrix, IntMatrix, or StringMatrix)
+
+        The matrix must be a list of rows of equal length, holding values of a single type and, 
+        if numeric, no NaN or infinite values.
+
+        Parameters
+        ----------
+        accession : str
+            accession of the matrix metric
+        matrix : object
+            the metric value
+
+        Returns
+        -------
+        List[SemanticIssue]
+            the issues found
+        """
+        if not isinstance(matrix, list) or not matrix or not all(isinstance(row, list) for row in matrix):
+            return [SemanticIssue("Metric value non-matrix", 6,
+                                  f'Matrix metric CV term used without being a list of rows: '
+                                  f'accession = {accession}')]
+        issues = list()
+        if len(set(map(len, matrix))) != 1:
+            issues.append(SemanticIssue("Metric value non-rectangular matrix", 9,
+                                        f'Matrix metric CV term used with differing row lengths: '
+                                        f'accession = {accession}'))
+        values = list(chain.from_iterable(matrix))
+        kinds = _value_kinds(values)
+        if len(kinds) > 1:
+            issues.append(SemanticIssue("Metric value mixed-type matrix", 6,
+                                        f'Matrix metric CV term used with mixed value types: '
+                                        f'accession = {accession}'))
+        elif kinds == {'number'} and _has_non_finite(values):
+            issues.append(SemanticIssue("Metric value non-finite", 5,
+                                        f'Metric CV term used with NaN or infinite values: '
+                                        f'accession = {accession}'))
+        return issues
 
     def string_export(self) -> Dict[str,List[str]]:
         """Helper function to properly export the validation results
@@ -709,7 +1176,12 @@ class SemanticCheck(UserDict):
                              keep_issues=False, _document_collected_issues=True)
 
     def validate(self, max_errors: int = 0, load_local: bool = False,
-                 keep_issues: bool = False, _document_collected_issues: bool = False):
+                 keep_issues: bool = False, issue_sink: Optional[IssueSink] = None,
+                 executor: Optional[Union[str, Executor]] = None,
+                 incremental: bool = False, profile: str = 'full',
+                 enable: Iterable[str] = (), disable: Iterable[str] = (),
+                 time_budget: float = 0, deadline: Optional[float] = None,
+                 _document_collected_issues: bool = False):
         """Validates the object given during class initialisation, considers a number of parameters
 
         Note before adding new checks: create functions to check specific types of issues, 
@@ -724,7 +1196,10 @@ class SemanticCheck(UserDict):
         The validation result is kept in the object itself, accessible through the UserDict 
         and additional member attributes (see class doc). A convenience function to 
         export the list of stringified dict of SemanticIssue lists, e.g. with the apps 
-        from the pymzqc's repository accessories, is provided with `string_export`.
+        from the pymzqc's repository accessories, is provided with `string_export`. The seconds 
+        spent per check are recorded in `timings` (by category), 'ontology load errors' being the 
+        loading of the vocabularies. For the parallel validation these are the summed durations of 
+        the check's tasks, which can exceed the validation's wall-clock time.
 
         Parameters
         ----------
@@ -734,13 +1209,43 @@ class SemanticCheck(UserDict):
             flag to indicate if referenced local files should be attempted to load, by default False does not make sense for online validation
         keep_issues : bool, optional
             flag to indicate if any SemanticIssues from previous should _NOT_ be cleared, by default False
+        issue_sink : IssueSink, optional
+            a callback called with (category, issue) or a generator sent (category, issue) for each issue 
+            as soon as it is found, by default None. The issues are registered in the object regardless.
+        executor : Union[str, Executor], optional
+            'thread', 'process', or an Executor instance to load the vocabularies concurrently and run 
+            the checks in parallel (see `_validate_parallel`), by default None for sequential validation
+        incremental : bool, optional
+            flag to re-run the per-run/set checks only for runs and sets changed since the last incremental 
+            validation of this object (see `_validate_incremental`), by default False. Incremental validation 
+            is sequential, the executor is not used. Neither is used when the mzqc_obj is a MzQcStreamReader, 
+            which is validated one run or set at a time (see `_validate_streaming`).
+        profile : str, optional
+            name of the selection of checks to run (see PROFILES), by default 'full'. The 'structural' 
+            profile (label uniqueness and input files) loads no vocabularies.
+        enable : Iterable[str], optional
+            checks (see CHECKS) to run in addition to the profile's, by default none
+        disable : Iterable[str], optional
+            checks of the profile not to run, by default none. Checks needing vocabularies always 
+            imply 'ontology load errors'.
+        time_budget : float, optional
+            the number of seconds the validation may take before it is aborted like for max_errors, 
+            by default 0 for no limit. The issues found so far are kept, a 'general' issue is added, 
+            and a ValidationError is raised. The budget is checked between checks, runs and sets, 
+            and vocabularies, and with every issue found, so it can be overrun by the duration of 
+            one such step (e.g. loading one vocabulary sequentially).
+        deadline : float, optional
+            an absolute deadline as `time.monotonic()` value, e.g. to share one budget over syntax 
+            and semantic validation, by default None. The earlier of deadline and time_budget applies.
         _document_collected_issues : bool, optional
             flag to indicate that every possible SemanticIssue is to be auto_doc generated, by default False
         """
         # needs to be kept up-to-date to document the implemented issue type or categories
         issue_types_genreated = ['input files', 'metric use', 'ontology load errors',
                                  'ontology term errors', 'label uniqueness']
-        
+        checks = issue_types_genreated if _document_collected_issues else resolve_checks(profile, enable, disable)
+        issue_types_genreated = [i for i in issue_types_genreated if i in checks]
+
         if not keep_issues:
             self.clear()
             for i in issue_types_genreated:
@@ -752,33 +1257,390 @@ class SemanticCheck(UserDict):
         self._max_errors = max_errors
         self._load_local = load_local
         self._keep_issues = keep_issues
+        self._issue_sink = issue_sink
+        self._checks = tuple(checks)
         self._invalid_mzqc_obj = False
         self._exceeded_errors = False
+        self._exceeded_time = False
+        self._started = time.monotonic()
+        self.timings = dict()
+        deadlines = [d for d in (deadline, self._started + time_budget if time_budget > 0 else None)
+                     if d is not None]
+        self._deadline = min(deadlines) if deadlines and not _document_collected_issues else None
+
+        if isinstance(self.mzqc_obj, MzQcStreamReader) and not _document_collected_issues:
+            return self._validate_streaming(load_local)
 
         # Stop early if we can't recognise the data object and return a stub validation_errs dict
-        if not isinstance(self.mzqc_obj, MzQcFile):
+        if not isinstance(self.mzqc_obj, (MzQcFile, RawMzQcFile)):
             self._invalid_mzqc_obj = True
             return
 
+        if incremental and not _document_collected_issues:
+            return self._validate_incremental(load_local)
+        if executor is not None and not _document_collected_issues:
+            return self._validate_parallel(executor, load_local)
+
         # Check that label (metadata) must be unique in the file
         # at some point with max_error > 0 this will raise an ValidationError for max_error exceeded
         # so either try_catch or more fancy with contextmanger to manage max_error execution
-        self._check_label_uniqueness('label uniqueness', _document_collected_issues)
+        if 'label uniqueness' in checks:
+            with self._timed('label uniqueness'):
+                self._check_label_uniqueness('label uniqueness', _document_collected_issues)
 
         # Check that all cvs referenced are linked to valid ontology
-        file_vocabularies = self._load_and_check_Vocabularies('ontology load errors',
-                                                             load_local,
-                                                             _document_collected_issues)
+        file_vocabularies = dict()
+        if 'ontology load errors' in checks:
+            self._check_deadline()
+            with self._timed('ontology load errors'):
+                file_vocabularies = self._load_and_check_Vocabularies('ontology load errors',
+                                                                     load_local,
+                                                                     _document_collected_issues)
 
         # Check that terms used are defined and used in the right place
-        self._check_CVTerm_use('ontology term errors',
-                               file_vocabularies,
-                               _document_collected_issues)
+        if 'ontology term errors' in checks:
+            self._check_deadline()
+            with self._timed('ontology term errors'):
+                self._check_CVTerm_use('ontology term errors',
+                                       file_vocabularies,
+                                       _document_collected_issues)
 
         # Check that qualityParameters are used as defined and unique within a run/setQuality
-        self._check_metric_use('metric use', file_vocabularies, _document_collected_issues)
+        if 'metric use' in checks:
+            self._check_deadline()
+            with self._timed('metric use'):
+                self._check_metric_use('metric use', file_vocabularies, _document_collected_issues)
 
         # Regarding metadata, verify that input files are consistent and unique.
-        self._check_InputFile_consistency('input files', _document_collected_issues)
+        if 'input files' in checks:
+            self._check_deadline()
+            with self._timed('input files'):
+                self._check_InputFile_consistency('input files', _document_collected_issues)
+
+        return
+
+    def _validate_parallel(self, executor: Union[str, Executor], load_local: bool = False):
+        """Runs the validation checks concurrently on an executor
+
+        Vocabularies are loaded concurrently. The checks independent of vocabularies (label 
+        uniqueness, input file consistency) run alongside, the vocabulary dependent checks (CV 
+        term and metric use) run in partitions of consecutive runs or sets each. Every task 
+        collects its issues in a scratch SemanticCheck, the issues are then registered here in 
+        the same order as the sequential validation would, so issue order, `max_errors`, and the 
+        issue sink behave the same. 
+
+        N.B.: a process pool pickles the mzQC partitions and vocabulary indices for each task, 
+        which only pays off for large files. The checks are pure Python, so thread pools 
+        mostly benefit the (I/O bound) vocabulary loading.
+
+        Parameters
+        ----------
+        executor : Union[str, Executor]
+            'thread' or 'process' for a pool created (and shut down) for this validation,
+            or an Executor instance managed by the caller
+        load_local : bool, optional
+            if True file URIs referencing a local fs are attempted to load, by default False
+        """
+        own_executor = None
+        if isinstance(executor, str):
+            pools = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+            if executor not in pools:
+                raise ValueError("Unknown executor '{}', use one of {}".format(executor, list(pools)))
+            executor = own_executor = pools[executor]()
+
+        futures = list()
+        def submit(check_name, issue_type_category, mzqc_part, file_vocabularies=None):
+            futures.append(executor.submit(_run_partial_check, check_name, issue_type_category,
+                                           mzqc_part, file_vocabularies, self._max_errors, self._deadline))
+            return futures[-1]
+
+        def merge(issue_type_category, partial):
+            try:
+                issues, seconds = partial.result(timeout=self._remaining_time())
+            except FutureTimeoutError:
+                self._abort_time_budget()
+            self.timings[issue_type_category] = self.timings.get(issue_type_category, 0.0) + seconds
+            for issue in issues:
+                self.raising(issue_type_category, issue)
+            self._check_deadline()  # the task may have stopped early for the deadline
+
+        try:
+            checks = self._checks
+            if 'input files' in checks:
+                inputs = submit('_check_InputFile_consistency', 'input files', self.mzqc_obj)
+            if 'label uniqueness' in checks:
+                merge('label uniqueness', submit('_check_label_uniqueness', 'label uniqueness', self.mzqc_obj))
+
+            file_vocabularies = dict()
+            if 'ontology load errors' in checks:
+                with self._timed('ontology load errors'):
+                    file_vocabularies = self._load_and_check_Vocabularies('ontology load errors', load_local,
+                                                                         executor=executor)
+            partitions = self._partition_qualities(os.cpu_count() or 1)
+            term_use = [submit('_check_CVTerm_use', 'ontology term errors', part, file_vocabularies)
+                        for part in partitions] if 'ontology term errors' in checks else []
+            metric_use = [submit('_check_metric_use', 'metric use', part, file_vocabularies)
+                          for part in partitions] if 'metric use' in checks else []
+
+            for partial in term_use:
+                merge('ontology term errors', partial)
+            for partial in metric_use:
+                merge('metric use', partial)
+            if 'input files' in checks:
+                merge('input files', inputs)
+        finally:
+            # after an abort (max_errors, time budget) pending tasks are of no use anymore
+            for f in futures:
+                f.cancel()
+            if own_executor is not None:
+                # running tasks are not waited for once out of time, they stop at the deadline
+                own_executor.shutdown(wait=not self._exceeded_time)
+        return
 
+    def _validate_streaming(self, load_local: bool = False):
+        """Runs the validation on a MzQcStreamReader, one run or set at a time
+
+        Only compact cross-run state is kept: the labels seen, the locations of each input file 
+        name, and the CV parameters checked. The vocabularies are loaded before the first run or 
+        set is checked; if the controlledVocabularies follow the runs and sets in the document, 
+        it is read twice. If it can not be re-read (e.g. stdin or a request body), the runs and 
+        sets before them are spooled to a temporary file (in memory up to PENDING_SPOOL_SIZE 
+        characters), so memory use stays bounded. The sets are spooled likewise and checked 
+        after the runs, as in the whole document.
+        Per category, the issues are the same and in the same order as for the whole document, 
+        but categories are interleaved (checks run per run or set), which shows with `max_errors` 
+        and the issue sink. A document that turns out not to be mzQC JSON sets `_invalid_mzqc_obj`.
+
+        Parameters
+        ----------
+        load_local : bool, optional
+            if True file URIs referencing a local fs are attempted to load, by default False
+        """
+        reader = self.mzqc_obj
+        checks = self._checks
+        def is_mzqc(header):
+            return set(header.keys()).issubset(RawMzQcFile._defaults.keys())
+
+        def replay(spool):
+            spool.seek(0)
+            for line in spool:
+                key, record = json.loads(line)
+                yield key, record
+
+        pending = tempfile.SpooledTemporaryFile(max_size=PENDING_SPOOL_SIZE, mode='w+')
+        deferred = tempfile.SpooledTemporaryFile(max_size=PENDING_SPOOL_SIZE, mode='w+')
+        try:
+            records = iter(reader)
+            header = reader.header
+            for record in records:
+                header = reader.header
+                if 'controlledVocabularies' in header or not is_mzqc(header):
+                    pending.write(json.dumps(record) + '\n')
+                    break
+                if reader.rewindable:
+                    records.close()
+                    header = reader.read_header()
+                    records = iter(reader)
+                    break
+                pending.write(json.dumps(record) + '\n')
+            if not is_mzqc(header):
+                self._invalid_mzqc_obj = True
+                return
+
+            file_vocabularies = dict()
+            if 'ontology load errors' in checks:
+                with self._timed('ontology load errors'):
+                    file_vocabularies = self._load_and_check_Vocabularies(
+                        'ontology load errors', load_local,
+                        controlled_vocabularies=RawMzQcFile(header).controlledVocabularies)
+            vocabulary_sets = (self._get_vocabulary_metrics(file_vocabularies),
+                               self._get_vocabulary_tables(file_vocabularies),
+                               self._get_vocabulary_matrices(file_vocabularies),
+                               self._get_vocabulary_idmetrics(file_vocabularies),
+                               self._get_vocabulary_idfiles(file_vocabularies))
+
+            labels: Set[str] = set()
+            input_file_sets: Dict[str,Set[str]] = defaultdict(set)
+            checked: Dict[Tuple[str,str,str],List[SemanticIssue]] = dict()
+            def check(key, record):
+                self._check_deadline()
+                quality = (RawRunQuality if key == 'runQualities' else RawSetQuality)(record)
+                if 'label uniqueness' in checks:
+                    with self._timed('label uniqueness'):
+                        for issue in self._label_issues([quality.metadata.label], labels):
+                            self.raising('label uniqueness', issue)
+                if 'ontology term errors' in checks:
+                    with self._timed('ontology term errors'):
+                        for issue in self._quality_CVTerm_issues('ontology term errors', quality,
+                                                                 file_vocabularies, checked):
+                            self.raising('ontology term errors', issue)
+                if 'metric use' in checks:
+                    with self._timed('metric use'):
+                        for issue in self._quality_metric_issues(quality, file_vocabularies, *vocabulary_sets):
+                            self.raising('metric use', issue)
+                if 'input files' in checks:
+                    with self._timed('input files'):
+                        for issue in self._quality_InputFile_issues(quality):
+                            self.raising('input files', issue)
+                        for input_file in quality.metadata.inputFiles:
+                            input_file_sets[input_file.name].add(input_file.location)
+
+            # runs first, as in the whole document; sets before the last run wait in a spool
+            for key, record in chain(replay(pending), records):
+                if key == 'runQualities':
+                    check(key, record)
+                else:
+                    deferred.write(json.dumps([key, record]) + '\n')
+            for key, record in replay(deferred):
+                check(key, record)
+        except ValueError:  # not (complete) JSON
+            self._invalid_mzqc_obj = True
+            return
+        finally:
+            pending.close()
+            deferred.close()
+        if not is_mzqc(reader.header):
+            self._invalid_mzqc_obj = True
+            return
+
+        if 'input files' in checks:
+            with self._timed('input files'):
+                for issue in self._input_file_location_issues(input_file_sets):
+                    self.raising('input files', issue)
+        return
+
+    def _validate_incremental(self, load_local: bool = False):
+        """Runs the validation, re-using the per-run/set results of unchanged runs and sets
+
+        Each run and set is identified by a fingerprint of its content. For every fingerprint, 
+        a summary is kept of the label, input files, and issues of the per-run/set checks (CV 
+        term use, metric use incl. units, tables and ID files, and input file consistency). Only 
+        runs and sets with a new fingerprint are checked, the cross-run checks (label uniqueness 
+        and input file name/location consistency) are re-evaluated from the summaries. The issues 
+        are registered in the same order as by a full validation, so `max_errors` and the issue 
+        sink behave the same. Issues depending on vocabularies are recomputed for all runs and 
+        sets if any vocabulary changed since the last validation. Runs or sets that can not be 
+        serialised are always checked.
+
+        Parameters
+        ----------
+        load_local : bool, optional
+            if True file URIs referencing a local fs are attempted to load, by default False
+        """
+        state = self._incremental_state
+        if state is None:
+            state = self._incremental_state = {'vocabularies': None, 'checked': dict(), 'qualities': dict()}
+
+        summaries = list()
+        for quality in chain(self.mzqc_obj.runQualities, self.mzqc_obj.setQualities):
+            self._check_deadline()
+            fingerprint = _quality_fingerprint(quality)
+            summary = state['qualities'].get(fingerprint) if fingerprint else None
+            if summary is None:
+                with self._timed('input files'):
+                    summary = {'label': quality.metadata.label,
+                               'input_files': [(f.name, f.location) for f in quality.metadata.inputFiles],
+                               'input files': self._quality_InputFile_issues(quality)}
+                if fingerprint:
+                    state['qualities'][fingerprint] = summary
+            summaries.append((fingerprint, quality, summary))
+        # forget runs and sets no longer in the file
+        current = {fingerprint for fingerprint, _, _ in summaries}
+        state['qualities'] = {k: v for k, v in state['qualities'].items() if k in current}
+
+        checks = self._checks
+        if 'label uniqueness' in checks:
+            with self._timed('label uniqueness'):
+                for issue in self._label_issues(summary['label'] for _, _, summary in summaries):
+                    self.raising('label uniqueness', issue)
+
+        if 'ontology load errors' in checks:
+            with self._timed('ontology load errors'):
+                file_vocabularies = self._load_and_check_Vocabularies('ontology load errors', load_local)
+            known = state['vocabularies']
+            if known is None or known.keys() != file_vocabularies.keys() or \
+                    any(known[k] is not v for k, v in file_vocabularies.items()):
+                state['vocabularies'] = file_vocabularies
+                state['vocabulary_sets'] = (self._get_vocabulary_metrics(file_vocabularies),
+                                            self._get_vocabulary_tables(file_vocabularies),
+                                            self._get_vocabulary_matrices(file_vocabularies),
+                                            self._get_vocabulary_idmetrics(file_vocabularies),
+                                            self._get_vocabulary_idfiles(file_vocabularies))
+                state['checked'] = dict()
+                for summary in state['qualities'].values():
+                    summary.pop('ontology term errors', None)
+                    summary.pop('metric use', None)
+
+        if 'ontology term errors' in checks:
+            for _, quality, summary in summaries:
+                self._check_deadline()
+                with self._timed('ontology term errors'):
+                    if 'ontology term errors' not in summary:
+                        summary['ontology term errors'] = self._quality_CVTerm_issues(
+                            'ontology term errors', quality, file_vocabularies, state['checked'])
+                    for issue in summary['ontology term errors']:
+                        self.raising('ontology term errors', issue)
+
+        if 'metric use' in checks:
+            for _, quality, summary in summaries:
+                self._check_deadline()
+                with self._timed('metric use'):
+                    if 'metric use' not in summary:
+                        summary['metric use'] = self._quality_metric_issues(quality, file_vocabularies,
+                                                                            *state['vocabulary_sets'])
+                    for issue in summary['metric use']:
+                        self.raising('metric use', issue)
+
+        if 'input files' in checks:
+            with self._timed('input files'):
+                for _, _, summary in summaries:
+                    for issue in summary['input files']:
+                        self.raising('input files', issue)
+                for issue in self._input_file_duplicate_issues(
+                        chain.from_iterable(summary['input_files'] for _, _, summary in summaries)):
+                    self.raising('input files', issue)
         return
+
+    def _partition_qualities(self, n: int) -> List[MzQcFile]:
+        """Splits the runs and sets of the mzqc_object into up to n partitions each, preserving order"""
+        def chunks(qualities):
+            size = max(1, -(-len(qualities) // max(n, 1)))
+            return [qualities[i:i+size] for i in range(0, len(qualities), size)]
+        return [MzQcFile(runQualities=c) for c in chunks(self.mzqc_obj.runQualities)] + \
+               [MzQcFile(setQualities=c) for c in chunks(self.mzqc_obj.setQualities)]
+
+def _quality_fingerprint(quality: BaseQuality) -> Optional[str]:
+    """Content hash of a run or set quality, None if the quality can not be serialised"""
+    if isinstance(quality, RawView):
+        quality = quality.raw
+    try:
+        return hashlib.sha1(json.dumps(quality, default=JsonSerialisable.complex_handler,
+                                       sort_keys=True).encode()).hexdigest()
+    except Exception:
+        return None
+
+def _run_partial_check(check_name: str, issue_type_category: str, mzqc_obj: MzQcFile,
+                       file_vocabularies: Optional[Dict[str,VocabularyIndex]],
+                       max_errors: int, deadline: Optional[float] = None) -> Tuple[List[SemanticIssue], float]:
+    """Runs one check on (a partition of) a mzQC object in a scratch SemanticCheck
+
+    Defined on module level to be usable as process pool task. The scratch check stops 
+    once it exceeds max_errors on its own, then the merged total exceeds it as well. 
+    Likewise, it stops at the (monotonic clock) deadline of the validation.
+
+    Returns
+    -------
+    Tuple[List[SemanticIssue], float]
+        the issues of the check, in order of detection, and the seconds the check took
+    """
+    scratch = SemanticCheck(mzqc_obj)
+    scratch._max_errors = max_errors
+    scratch._started = time.monotonic()
+    scratch._deadline = deadline
+    args = [issue_type_category] if file_vocabularies is None else [issue_type_category, file_vocabularies]
+    try:
+        with scratch._timed(issue_type_category):
+            getattr(scratch, check_name)(*args)
+    except ValidationError:
+        pass
+    return scratch.get(issue_type_category, []), scratch.timings[issue_type_category]
@@ -0,0 +1,224 @@
+__author__ = 'walzer'
+import io
+import re
+import gzip
+import json
+from typing import Any, Dict, IO, Iterator, Optional, Tuple, Union
+
+# Incremental reading of mzQC JSON documents: the runQualities and setQualities are decoded one
+# record at a time, all other members (which are small) as a whole. Memory use is bounded by the
+# largest single run or set, not the document.
+
+QUALITY_KEYS = ('runQualities', 'setQualities')
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_TRUNCATION_MARGIN = 16  # characters, longer than any partial literal, number, or escape
+
+class _JsonTokens(object):
+    """Minimal pull tokenizer over a text stream, decoding complete values with the json module"""
+    def __init__(self, stream: IO[str], chunk_size: int):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size: int = 0) -> bool:
+        """Appends more of the stream to the buffer (dropping the consumed part), False at EOF"""
+        data = self.stream.read(size or self.chunk_size)
+        if not data:
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """The next non-whitespace character (not consumed), '' at EOF"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        """Consumes the next non-whitespace character, which must be one of chars"""
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError("Expected one of '{}' but found '{}' in JSON stream".format(chars, c or "EOF"))
+        self.pos += 1
+        return c
+
+    def value(self) -> Any:
+        """Decodes the next complete JSON value, reading as much of the stream as it needs"""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                # only an error at the end of the buffer can be a value continuing in the stream,
+                # others are raised at once instead of reading the rest of the stream
+                if not self._truncated(e) or not self._fill(size):
+                    raise
+                size *= 2  # long values are read in growing chunks
+                continue
+            # a number at the end of the buffer may continue in the stream
+            if end == len(self.buffer) and not isinstance(value, (str, list, dict)) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def _truncated(self, error: json.JSONDecodeError) -> bool:
+        """True if the decoding error may be due to the end of the buffer, i.e. an unterminated
+        string or an error within the last few characters (e.g. a partial literal or escape)"""
+        return error.msg.startswith('Unterminated string') or len(self.buffer) - error.pos <= _TRUNCATION_MARGIN
+
+    def keys(self) -> Iterator[str]:
+        """Iterates the keys of an object (after its opening brace), the caller consumes the values"""
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("Expected an object key in JSON stream, found {!r}".format(key))
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+class MzQcStreamReader(object):
+    """
+    MzQcStreamReader Reads mzQC JSON documents incrementally
+
+    Iterating the reader yields the run and set qualities as (key, record) pairs, key being
+    'runQualities' or 'setQualities' and record the plain JSON object, in the order of the
+    document. All other members of the mzQC object are collected in `header`, those outside the
+    (optional) outer `mzQC` object in `outer`. As member order is arbitrary in JSON, `header` is
+    only complete after a full iteration; `read_header` reads the document once, skipping the
+    runs and sets, to get it upfront.
+
+    Paths (also gzip compressed) and seekable files can be iterated repeatedly, other streams
+    once only.
+
+    Parameters
+    ----------
+    source : Union[str, IO]
+        path or open (text or binary) file of the mzQC document
+    chunk_size : int, optional
+        number of characters read at once, by default 65536
+    replace : Dict[str, Any], optional
+        members of the mzQC object to substitute in the header, e.g. to validate the document 
+        with a selection of its controlledVocabularies, by default None
+    """
+    def __init__(self, source: Union[str, IO], chunk_size: int = 1 << 16,
+                 replace: Optional[Dict[str, Any]] = None):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.replace = dict() if replace is None else replace
+        self.header: Dict[str, Any] = dict()
+        self.outer: Optional[Dict[str, Any]] = None
+        self.counts: Dict[str, int] = {k: 0 for k in QUALITY_KEYS}
+        self._complete = False
+        self._start = None
+        self._buffer: Optional[io.BufferedReader] = None
+        if not isinstance(source, str) and self.rewindable:
+            self._start = source.tell()
+
+    @property
+    def rewindable(self) -> bool:
+        """True if the document can be read more than once"""
+        if isinstance(self.source, str):
+            return True
+        try:
+            return self.source.seekable()
+        except (AttributeError, ValueError):
+            return False
+
+    @property
+    def complete(self) -> bool:
+        """True once the document was read to the end, so `header` is complete"""
+        return self._complete
+
+    def _open(self) -> IO[str]:
+        if isinstance(self.source, str):
+            binary = open(self.source, 'rb')
+        else:
+            if self._start is not None:
+                self.source.seek(self._start)
+            if isinstance(self.source, io.TextIOBase):
+                return self.source
+            binary = self.source
+            if not hasattr(binary, 'peek'):
+                binary = self._buffer = io.BufferedReader(binary)
+        if binary.peek(2)[:2] == b'\x1f\x8b':
+            binary = gzip.GzipFile(fileobj=binary)
+        return io.TextIOWrapper(binary, encoding='utf-8-sig')
+
+    def __iter__(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        stream = self._open()
+        try:
+            yield from self._records(_JsonTokens(stream, self.chunk_size))
+        finally:
+            if isinstance(self.source, str):
+                stream.close()
+            elif stream is not self.source:
+                stream.detach()  # leaves the caller's file open
+                if self._buffer is not None:
+                    self._buffer.detach()
+                    self._buffer = None
+
+    def _records(self, tokens: _JsonTokens) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        header: Dict[str, Any] = dict()
+        counts = {k: 0 for k in QUALITY_KEYS}
+        inner: Optional[Dict[str, Any]] = None
+        self.header, self.counts, self._complete = header, counts, False
+        tokens.expect('{')
+        for key in tokens.keys():
+            if key == 'mzQC' and inner is None and tokens.peek() == '{':
+                tokens.expect('{')
+                inner = dict()
+                self.outer, self.header, self.counts = header, inner, counts
+                for inner_key in tokens.keys():
+                    yield from self._member(tokens, inner_key, inner, counts)
+            else:
+                yield from self._member(tokens, key, header, counts)
+        if tokens.peek():
+            raise ValueError("Extra data after the JSON document")
+        if inner is None:
+            self.outer = None
+        self._complete = True
+
+    def _member(self, tokens: _JsonTokens, key: str, target: Dict[str, Any],
+                counts: Dict[str, int]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        if key not in QUALITY_KEYS or tokens.peek() != '[':
+            target[key] = tokens.value()
+            if key in self.replace:
+                target[key] = self.replace[key]
+            return
+        tokens.expect('[')
+        target[key] = None  # present, the records are streamed
+        if tokens.peek() == ']':
+            tokens.pos += 1
+            target[key] = []
+            return
+        while True:
+            counts[key] += 1
+            yield key, tokens.value()
+            if tokens.expect(',]') == ']':
+                return
+
+    def read_header(self) -> Dict[str, Any]:
+        """Reads the document once, skipping runs and sets, to complete `header`
+
+        Returns
+        -------
+        Dict[str, Any]
+            the members of the mzQC object other than runQualities and setQualities
+            (which are None if present, or [] if empty)
+        """
+        if not self._complete:
+            for _ in self:
+                pass
+        return self.header
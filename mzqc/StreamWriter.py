@@ -0,0 +1,91 @@
+__author__ = 'walzer'
+import json
+from typing import Any, Dict, Iterator, List, Optional, Set
+from mzqc.MZQCFile import JsonSerialisable as mzqc_io
+from mzqc.MZQCFile import MzqcJSONEncoder
+
+# Incremental writing of mzQC JSON documents, the counterpart of StreamReader: the runQualities and
+# setQualities are written one record at a time as they are added, so memory use is bounded by the
+# largest single run or set, not the document.
+
+def accessions(value: Any) -> Iterator[str]:
+    """all accessions referenced in a (plain JSON) mzQC element, e.g. of metrics, units, file formats, and software"""
+    if isinstance(value, dict):
+        if isinstance(value.get('accession'), str):
+            yield value['accession']
+        for v in value.values():
+            yield from accessions(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from accessions(v)
+
+class ShardWriter(object):
+    """
+    ShardWriter Writes an mzQC document (e.g. a shard of a split file) incrementally
+
+    The header members are written on creation, each added run
+    or set right away (`begin` starts the list of the other kind); the controlledVocabularies
+    are written on close, only those whose terms are referenced in the shard (all if `prefixes`
+    is None, or the prefixes of a vocabulary are unknown). A shard can be suspended to release
+    its file handle, it is reopened for appending on the next write.
+
+    Parameters
+    ----------
+    path : str
+        destination of the shard (document)
+    header : Dict
+        members of the mzQC object other than runs, sets, and controlledVocabularies
+    key : str, optional
+        the kind of qualities in the shard, by default 'runQualities'
+    """
+    def __init__(self, path: str, header: Dict, key: str = 'runQualities'):
+        self.path = path
+        self.key = key
+        self.count = 0
+        self.prefixes: Set[str] = set()
+        self._listed = 0
+        self._file = open(path, 'w')
+        self._file.write('{"mzQC": \n{\n')
+        for k, v in header.items():
+            self._file.write(f'  {json.dumps(k)}: {json.dumps(v, default=mzqc_io.complex_handler)},\n')
+        self._file.write(f'  {json.dumps(key)}: [')
+
+    @property
+    def suspended(self) -> bool:
+        """True if the shard's file is not open"""
+        return self._file.closed
+
+    def suspend(self):
+        """closes the shard's file until the next write"""
+        self._file.close()
+
+    def _reopen(self):
+        if self._file.closed:
+            self._file = open(self.path, 'a')
+
+    def begin(self, key: str):
+        """ends the list of qualities written so far, the following are added to the list of key"""
+        self._reopen()
+        self._file.write(f'\n  ],\n  {json.dumps(key)}: [')
+        self.key = key
+        self._listed = 0
+
+    def add(self, quality: Dict):
+        """writes a run or set to the shard"""
+        self._reopen()
+        self._file.write((',' if self._listed else '') + '\n    ')
+        self._file.write(json.dumps(quality, indent=2, cls=MzqcJSONEncoder).replace('\n', '\n    '))
+        self.prefixes.update(accession.partition(':')[0] for accession in accessions(quality))
+        self.count += 1
+        self._listed += 1
+
+    def close(self, controlled_vocabularies: List[Dict], prefixes: Optional[List[Optional[Set[str]]]] = None):
+        """writes the controlledVocabularies used by the shard and closes it"""
+        if prefixes is not None:
+            controlled_vocabularies = [cv for cv, cv_prefixes in zip(controlled_vocabularies, prefixes)
+                                       if cv_prefixes is None or cv_prefixes & self.prefixes]
+        self._reopen()
+        self._file.write('\n  ],\n  "controlledVocabularies": ')
+        self._file.write(json.dumps(controlled_vocabularies, indent=2).replace('\n', '\n  '))
+        self._file.write('\n} \n}\n')
+        self._file.close()
@@ -1,13 +1,38 @@
 __author__ = 'bittremieux, walzer'
 import json
 import os
-import urllib.request
-from typing import Dict, List, Union
+import copy
+import time
+from typing import Dict, List, Optional, Union
 
 import jsonschema
 #from jsonschema import Draft7Validator
 from jsonschema.exceptions import ValidationError
 
+from mzqc import ResourceCache
+from mzqc.HttpFetcher import HttpFetcher
+from mzqc.StreamReader import MzQcStreamReader, QUALITY_KEYS
+
+# the schema of a version (branch or tag), replace to validate against a schema hosted elsewhere
+SCHEMA_URL = 'https://raw.githubusercontent.com/HUPO-PSI/mzQC/{branch}/schema/mzqc_schema.json'
+SCHEMA_TIMEOUT = (2.0, 10.0)  # seconds to connect and between received bytes when fetching the schema
+SCHEMA_RETRIES = 1
+
+# fails fast when offline, unless PYMZQC_HTTP_TIMEOUT or PYMZQC_HTTP_RETRIES are set
+schema_fetcher = HttpFetcher(timeout=None if os.getenv('PYMZQC_HTTP_TIMEOUT') else SCHEMA_TIMEOUT,
+                             retries=None if os.getenv('PYMZQC_HTTP_RETRIES') else SCHEMA_RETRIES)
+
+class _TimeBudgetExceeded(Exception):
+    """Raised from within the schema validation once the deadline has passed"""
+
+def _budgeted(keyword_check, deadline: float):
+    """Wraps a jsonschema keyword validator function to check the deadline before descending"""
+    def budgeted_check(validator, value, instance, schema):
+        if time.monotonic() > deadline:
+            raise _TimeBudgetExceeded()
+        yield from keyword_check(validator, value, instance, schema) or ()
+    return budgeted_check
+
 class SyntaxCheck(object):
     """
     SyntaxCheck class for syntax validations of mzQC objects (after JSON dump)
@@ -31,7 +56,14 @@ class SyntaxCheck(object):
         regularly versioned branch or tag. Other names are to be treated as 
         experimental but should work with the SyntaxCheck class. One exception
         is (the default value) `main` which points to the tip of the main 
-        development branch.
+        development branch. The schema is kept in the process-wide (and on-disk) 
+        `ResourceCache.document_cache`, which revalidates it with a conditional 
+        request once it is older than a few minutes, or taken from the offline 
+        resource bundle in use (see `ResourceCache.use_bundle`). The schema is 
+        fetched with a short timeout and one retry (SCHEMA_TIMEOUT, SCHEMA_RETRIES), 
+        so without network and cached copy this fails within a few seconds; the 
+        environment variables `PYMZQC_HTTP_TIMEOUT` and `PYMZQC_HTTP_RETRIES` 
+        override both, as for all other downloads.
 
         Parameters
         ----------
@@ -43,30 +75,39 @@ class SyntaxCheck(object):
         #    self.schema = json.loads(s.read())
         # self.schema_url = 'https://raw.githubusercontent.com/HUPO-PSI/mzQC/' \
         #             'v{v}/schema/mzqc_schema.json'.format(v=version)  
-        # TODO the URI should go into a config.ini
-        self.schema_url = 'https://raw.githubusercontent.com/HUPO-PSI/mzQC/' \
-                        + '{branch}/schema/mzqc_schema.json'.format(branch=version)
-        with urllib.request.urlopen(self.schema_url, timeout=2) as schema_in:
-            self.schema = json.loads(schema_in.read().decode())
+        self.schema_url = SCHEMA_URL.format(branch=version)
+        self.schema = json.loads(ResourceCache.document_cache.get(self.schema_url, schema_fetcher))
 
-    def validate(self, mzqc_str: str):
+    def validate(self, mzqc_str: str, time_budget: float = 0, deadline: Optional[float] = None):
         """
         The validation function validates the given json string representation 
         against the class objects set schema (see __init__) with 
         jsonschema.validate and jsonschema.FormatChecker (default arguments).
 
+        With a time budget or deadline, the schema validation is aborted once 
+        out of time. The time is checked whenever the validation descends into 
+        an object's properties or an array's items.
+
         Parameters
         ----------
         mzqc_str : str
             The json object to be validated in string representation.
+        time_budget : float, optional
+            The number of seconds the validation may take, by default 0 for no limit.
+        deadline : float, optional
+            An absolute deadline as `time.monotonic()` value, by default None. 
+            The earlier of deadline and time_budget applies.
 
         Returns
         -------
         dict
             Returns a dictionary with key 'schema validation', containing a 
-            truncated error message or in the absence of an error 'success', 
-            both string type.
+            truncated error message, a time budget exceeded message, or in the 
+            absence of an error 'success', all string type.
         """        
+        started = time.monotonic()
+        deadlines = [d for d in (deadline, started + time_budget if time_budget > 0 else None) if d is not None]
+        deadline = min(deadlines) if deadlines else None
         try:
             mzqc_json = json.loads(mzqc_str)
         except:
@@ -74,12 +115,104 @@ class SyntaxCheck(object):
             return {'schema validation': "Given mzqc seems not to be a string representation of a json type."}
 
         try:
-            jsonschema.validate(mzqc_json, self.schema, format_checker=jsonschema.FormatChecker())
+            if deadline is None:
+                jsonschema.validate(mzqc_json, self.schema, format_checker=jsonschema.FormatChecker())
+            else:
+                # as jsonschema.validate, with the descending keywords checking the deadline
+                error = jsonschema.exceptions.best_match(
+                    self._validator(self.schema, deadline).iter_errors(mzqc_json))
+                if error is not None:
+                    raise error
+        except _TimeBudgetExceeded:
+            return {'schema validation': "Schema validation time budget exceeded after {:.3f}s, aborting!".format(
+                time.monotonic() - started)}
         except ValidationError as e:
-            try:
-                #res = "{} # {}".format(e.message, e.json_path )  # not what ValidationError doc says
-                res = e.message.partition('\n')[0] + ' @ ' + ''.join('[{}]'.format(k) for k in e.path )
-            except:
-                res = str(e)
-            return { 'schema validation': res }
-        return { 'schema validation': 'success' }        
+            return self._report(e)
+        return { 'schema validation': 'success' }
+
+    def validate_stream(self, reader: MzQcStreamReader, time_budget: float = 0, deadline: Optional[float] = None):
+        """
+        Validates the document of a MzQcStreamReader against the schema, one run or set 
+        quality at a time, without loading the document whole.
+
+        Each run and set is validated against the schema's item definition of its list, 
+        the rest of the document with run and set lists of the same lengths but no items. 
+        The error reported is chosen from all errors like by `validate` (the most relevant, 
+        i.e. the least deep), only the most relevant so far is kept while reading.
+
+        Parameters
+        ----------
+        reader : MzQcStreamReader
+            The reader of the mzQC document.
+        time_budget : float, optional
+            The number of seconds the validation may take, by default 0 for no limit.
+        deadline : float, optional
+            An absolute deadline as `time.monotonic()` value, by default None. 
+            The earlier of deadline and time_budget applies.
+
+        Returns
+        -------
+        dict
+            Returns a dictionary with key 'schema validation', like `validate`.
+        """
+        started = time.monotonic()
+        deadlines = [d for d in (deadline, started + time_budget if time_budget > 0 else None) if d is not None]
+        deadline = min(deadlines) if deadlines else None
+
+        # the runs and sets are validated individually, the skeleton schema only checks their lists
+        skeleton_schema = copy.deepcopy(self.schema)
+        mzqc_properties = skeleton_schema.get('properties', {}).get('mzQC', {}).get('properties', {})
+        item_schemas = {key: mzqc_properties[key].pop('items') for key in QUALITY_KEYS
+                        if 'items' in mzqc_properties.get(key, {})}
+        validator = self._validator(self.schema, deadline)
+        relevance = jsonschema.exceptions.relevance
+        best = None
+        def keep_best(errors, prefix):
+            nonlocal best
+            for error in errors:
+                error.path.extendleft(reversed(prefix))
+                if best is None or relevance(error) > relevance(best):
+                    best = error
+
+        try:
+            indices = {key: 0 for key in QUALITY_KEYS}
+            for key, record in reader:
+                if key in item_schemas:
+                    keep_best(validator.descend(record, item_schemas[key], path=indices[key]),
+                              ['mzQC', key] if reader.outer is not None else [key])
+                indices[key] += 1
+            skeleton = {key: value if key not in QUALITY_KEYS or value is not None else [None]*reader.counts[key]
+                        for key, value in reader.header.items()}
+            document = skeleton if reader.outer is None else dict(reader.outer, mzQC=skeleton)
+            keep_best(self._validator(skeleton_schema, deadline).iter_errors(document), [])
+        except _TimeBudgetExceeded:
+            return {'schema validation': "Schema validation time budget exceeded after {:.3f}s, aborting!".format(
+                time.monotonic() - started)}
+        except ValueError:
+            return {'schema validation': "Given mzqc seems not to be a string representation of a json type."}
+
+        error = jsonschema.exceptions.best_match([best]) if best is not None else None
+        if error is not None:
+            return self._report(error)
+        return { 'schema validation': 'success' }
+
+    def _validator(self, schema: Dict, deadline: Optional[float] = None):
+        """Creates a validator for the schema (checked), which checks the deadline if given"""
+        cls = jsonschema.validators.validator_for(schema)
+        cls.check_schema(schema)
+        if deadline is not None:
+            cls = jsonschema.validators.extend(cls, {kw: _budgeted(cls.VALIDATORS[kw], deadline)
+                                                     for kw in ('properties', 'items', 'additionalProperties',
+                                                                'prefixItems', '$ref')
+                                                     if kw in cls.VALIDATORS})
+        return cls(schema, format_checker=jsonschema.FormatChecker())
+
+    @staticmethod
+    def _report(e: ValidationError) -> Dict[str, str]:
+        """Formats the validation result for an error"""
+        try:
+            #res = "{} # {}".format(e.message, e.json_path )  # not what ValidationError doc says
+            res = e.message.partition('\n')[0] + ' @ ' + ''.join('[{}]'.format(k) for k in e.path )
+        except:
+            res = str(e)
+        return { 'schema validation': res }        
@@ -0,0 +1,277 @@
+__author__ = 'walzer'
+import json
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+# bump whenever the compiled structure changes, persisted indices of other formats are recompiled
+INDEX_FORMAT = 3
+
+METRIC_ROOT = 'MS:4000002'  # QC metric value type
+TABLE_ROOT = 'MS:4000005'  # table
+MATRIX_ROOT = 'MS:4000006'  # matrix
+IDMETRIC_CATEGORY = 'MS:4000008'  # ID based metric
+IDFILE_ROOT = 'MS:1002130'  # identification file format
+UNIT_ROOT = 'UO:0000000'  # unit
+
+@dataclass(frozen=True)
+class TermRecord:
+    """Class for the compiled subset of an ontology term needed during semantic validation:
+        id: accession of the term
+        name: name of the term
+        definition: definition text of the term, None if undefined
+        units: accessions of the term's `has_units` relations
+        required_columns: accessions of the term's `has_column` relations
+        optional_columns: accessions of the term's `has_optional_column` relations
+        parents: accessions of the term's direct is_a superclasses
+        is_unit: True if the term is a descendant of UO:0000000
+    The string representation follows pronto's, so issue messages stay the same.
+    """
+    id: str
+    name: str
+    definition: Optional[str] = None
+    units: Tuple[str, ...] = ()
+    required_columns: FrozenSet[str] = field(default_factory=frozenset)
+    optional_columns: FrozenSet[str] = field(default_factory=frozenset)
+    parents: FrozenSet[str] = field(default_factory=frozenset)
+    is_unit: bool = False
+
+    def __str__(self):
+        return "Term({!r}, name={!r})".format(self.id, self.name)
+
+    def _to_dict(self) -> Dict[str, Any]:
+        return {'id': self.id, 'name': self.name, 'definition': self.definition,
+                'units': list(self.units),
+                'required_columns': sorted(self.required_columns),
+                'optional_columns': sorted(self.optional_columns),
+                'parents': sorted(self.parents),
+                'is_unit': self.is_unit}
+
+    @classmethod
+    def _from_dict(cls, d: Dict[str, Any]) -> 'TermRecord':
+        return cls(id=d['id'], name=d['name'], definition=d.get('definition'),
+                   units=tuple(d.get('units', ())),
+                   required_columns=frozenset(d.get('required_columns', ())),
+                   optional_columns=frozenset(d.get('optional_columns', ())),
+                   parents=frozenset(d.get('parents', ())),
+                   is_unit=d.get('is_unit', False))
+
+def _descendants(root: str, children: Dict[str, Set[str]]) -> FrozenSet[str]:
+    """Collects the given root and all its is_a descendants"""
+    seen = {root}
+    stack = [root]
+    while stack:
+        for child in children.get(stack.pop(), ()):
+            if child not in seen:
+                seen.add(child)
+                stack.append(child)
+    return frozenset(seen)
+
+class VocabularyIndex(object):
+    """
+    VocabularyIndex Compiled lookup structure of one controlled vocabulary
+
+    All ontology traversal needed by the SemanticCheck is done once, when the index is
+    compiled: the sets of metric, table, matrix, ID-metric and ID-file accessions and a record of
+    every term's name, definition, unit, columns, and unit status. Afterwards, the semantic
+    checks run on dict and set lookups only. The index is versioned (format and source
+    data-version) and can be persisted as JSON.
+
+    Term ancestry is resolved with `ancestors`, which memoizes the transitive is_a closure
+    per accession. As indices are cached process-wide, the closures are shared by all
+    validations using the same vocabulary.
+
+    Parameters
+    ----------
+    terms : Dict[str, TermRecord]
+        the compiled terms by accession
+    metrics : Iterable[str]
+        accessions of metric type terms
+    tables : Iterable[str]
+        accessions of table type terms
+    matrices : Iterable[str]
+        accessions of matrix type terms
+    idmetrics : Iterable[str]
+        accessions of ID based metric terms
+    idfiles : Iterable[str]
+        accessions of ID file format terms
+    data_version : str, optional
+        the data-version of the source ontology, by default ""
+    """
+    def __init__(self, terms: Dict[str, TermRecord],
+                 metrics: Iterable[str] = (), tables: Iterable[str] = (),
+                 matrices: Iterable[str] = (),
+                 idmetrics: Iterable[str] = (), idfiles: Iterable[str] = (),
+                 data_version: str = ""):
+        self.terms = terms
+        self.metrics = frozenset(metrics)
+        self.tables = frozenset(tables)
+        self.matrices = frozenset(matrices)
+        self.idmetrics = frozenset(idmetrics)
+        self.idfiles = frozenset(idfiles)
+        self.data_version = data_version or ""
+        self.format = INDEX_FORMAT
+        self._ancestors: Dict[str, FrozenSet[str]] = dict()
+
+    def get(self, accession: str, default: Any = None) -> Optional[TermRecord]:
+        return self.terms.get(accession, default)
+
+    def __getitem__(self, accession: str) -> TermRecord:
+        return self.terms[accession]
+
+    def __contains__(self, accession: str) -> bool:
+        return accession in self.terms
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def ancestors(self, accession: str) -> FrozenSet[str]:
+        """Retrieves the transitive is_a superclasses of a term (excluding itself)
+
+        Closures are memoized, including those of all ancestors visited on the way.
+
+        Parameters
+        ----------
+        accession : str
+            accession of the term
+
+        Returns
+        -------
+        FrozenSet[str]
+            accessions of all ancestors, empty for unknown terms
+        """
+        closure = self._ancestors.get(accession)
+        if closure is not None:
+            return closure
+        # iterative post-order walk, ontologies can be deeper than the recursion limit
+        stack = [(accession, False)]
+        in_progress = set()
+        while stack:
+            tid, expanded = stack.pop()
+            if tid in self._ancestors:
+                continue
+            term = self.terms.get(tid)
+            parents = term.parents if term else frozenset()
+            if expanded:
+                closure = set(parents)
+                for p in parents:
+                    closure.update(self._ancestors.get(p, ()))
+                self._ancestors[tid] = frozenset(closure)
+                in_progress.discard(tid)
+            elif tid not in in_progress:  # guards against is_a cycles
+                in_progress.add(tid)
+                stack.append((tid, True))
+                stack.extend((p, False) for p in parents if p not in self._ancestors)
+        return self._ancestors[accession]
+
+    @classmethod
+    def compile(cls, raw: Dict[str, Dict[str, Any]], data_version: str = "") -> 'VocabularyIndex':
+        """Compiles the index from plain term data, as extracted by any ontology loader
+
+        Parameters
+        ----------
+        raw : Dict[str, Dict[str, Any]]
+            per term accession a dict with 'name', 'definition' (both optional), 'parents' 
+            (accessions of the direct is_a superclasses), and 'relationships' (relationship 
+            id to target accessions)
+        data_version : str, optional
+            the data-version of the source ontology, by default ""
+
+        Returns
+        -------
+        VocabularyIndex
+            the compiled index
+        """
+        children: Dict[str, Set[str]] = dict()
+        for tid, data in raw.items():
+            for p in data.get('parents', ()):
+                children.setdefault(p, set()).add(tid)
+
+        terms = dict()
+        for tid, data in raw.items():
+            rels = data.get('relationships', {})
+            terms[tid] = TermRecord(id=tid, name=data.get('name'),
+                                    definition=data.get('definition'),
+                                    units=tuple(sorted(rels.get('has_units', ()))),
+                                    required_columns=frozenset(rels.get('has_column', ())),
+                                    optional_columns=frozenset(rels.get('has_optional_column', ())),
+                                    parents=frozenset(data.get('parents', ())))
+        lineage_only = cls(terms)
+        for tid, term in terms.items():
+            if UNIT_ROOT in lineage_only.ancestors(tid):
+                terms[tid] = replace(term, is_unit=True)
+
+        metrics = _descendants(METRIC_ROOT, children) if METRIC_ROOT in raw else frozenset()
+        idmetrics = {tid for tid in metrics if
+                     IDMETRIC_CATEGORY in raw[tid].get('relationships', {}).get('has_metric_category', ())} \
+                    if IDMETRIC_CATEGORY in raw else set()
+        index = cls(terms,
+                    metrics=metrics,
+                    tables=_descendants(TABLE_ROOT, children) if TABLE_ROOT in raw else (),
+                    matrices=_descendants(MATRIX_ROOT, children) if MATRIX_ROOT in raw else (),
+                    idmetrics=idmetrics,
+                    idfiles=_descendants(IDFILE_ROOT, children) if IDFILE_ROOT in raw else (),
+                    data_version=data_version)
+        index._ancestors = lineage_only._ancestors  # closures only depend on the terms
+        return index
+
+    @classmethod
+    def from_ontology(cls, ontology) -> 'VocabularyIndex':
+        """Compiles the index from a pronto Ontology
+
+        Parameters
+        ----------
+        ontology : pronto.Ontology
+            the loaded ontology
+
+        Returns
+        -------
+        VocabularyIndex
+            the compiled index
+        """
+        # relations are taken by the accessions of their TermSets, which (unlike the Terms
+        # in them) do not fail on relations to terms of non-imported ontologies; relationships
+        # are those declared (as Typedef), pronto can not resolve undeclared ones
+        declared = list(ontology.relationships())
+        raw = dict()
+        for term in ontology.terms():
+            relationships = term.relationships
+            raw[term.id] = {'name': term.name,
+                            'definition': None if term.definition is None else str(term.definition),
+                            'parents': set(term.superclasses(distance=1, with_self=False).to_set().ids),
+                            'relationships': {relationship.id: set(relationships[relationship].ids)
+                                              for relationship in declared if relationship in relationships}}
+        return cls.compile(raw, ontology.metadata.data_version)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'format': self.format, 'data_version': self.data_version,
+                'metrics': sorted(self.metrics), 'tables': sorted(self.tables),
+                'matrices': sorted(self.matrices),
+                'idmetrics': sorted(self.idmetrics), 'idfiles': sorted(self.idfiles),
+                'terms': [t._to_dict() for t in self.terms.values()]}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> 'VocabularyIndex':
+        """Restores an index from its `to_dict` form
+
+        Raises
+        ------
+        ValueError
+            if the given structure was compiled with a different index format
+        """
+        if d.get('format') != INDEX_FORMAT:
+            raise ValueError("Vocabulary index format {} is not supported (expected {})".format(
+                d.get('format'), INDEX_FORMAT))
+        terms = {t['id']: TermRecord._from_dict(t) for t in d.get('terms', ())}
+        return cls(terms, metrics=d.get('metrics', ()), tables=d.get('tables', ()),
+                   matrices=d.get('matrices', ()),
+                   idmetrics=d.get('idmetrics', ()), idfiles=d.get('idfiles', ()),
+                   data_version=d.get('data_version', ""))
+
+    def save(self, path: str):
+        with open(path, 'w') as index_out:
+            json.dump(self.to_dict(), index_out)
+
+    @classmethod
+    def load(cls, path: str) -> 'VocabularyIndex':
+        with open(path, 'r') as index_in:
+            return cls.from_dict(json.load(index_in))
@@ -1,8 +1,14 @@
 #!/usr/bin/env python
+import os
+import sys
+import glob
+import json
 import datetime as dt
-from itertools import chain 
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from concurrent.futures import ProcessPoolExecutor
 import click
-from mzqc.MZQCFile import JsonSerialisable as mzqc_io
+from mzqc.StreamReader import MzQcStreamReader
 
 CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
 INFO = '''
@@ -11,6 +17,14 @@ from {m} different runs and {k} defined 'sets',
 and it was created @ {d}.
 
 '''
+AGGREGATE = '''
+The {f} mzQC files ({u} unreadable) have {n} different metrics registered,
+from {m} runs ({i} different instruments) and {k} defined 'sets'.
+'''
+MZQC_SUFFIXES = ('.mzqc', '.mzqc.gz')
+COMPLETION_TIME = "MS:1000747"
+INSTRUMENT_MODEL = "MS:1000031"
+
 def print_help():
     """
     Print the help of the tool
@@ -20,52 +34,200 @@ def print_help():
     click.echo(ctx.get_help())
     ctx.exit()
 
-@click.version_option('v1')
-@click.command(short_help='mzQCFileInfo will report basic info on the mzQC file.')
-@click.argument('infile', type=click.File('r'))
-def mzqcfileinfo(infile):
+def _file_property(input_files: List[Dict], accession: str) -> Optional[Any]:
+    return next((cd.get('value') for infi in input_files
+                 for cd in infi.get('fileProperties', []) if cd.get('accession') == accession), None)
+
+def summarize(source: Any) -> Dict[str, Any]:
     """
-    Find out which metrics are available from the given mzQC file derived from which runs/sets.
-    Currently only runs are supported.
+    summary of a (plain JSON) mzQC file, read one run or set at a time: the header metadata,
+    each run's label, input files, completion time, instrument model, and metrics, and the
+    metrics of the sets; metric values are dropped as they are read
     """
-    if not infile:
-        print_help()
+    reader = MzQcStreamReader(source)
+    runs: List[Dict[str, Any]] = list()
+    set_metrics: List[List[str]] = list()
+    for kind, quality in reader:
+        metrics = list({(m.get('accession', ''), m.get('name', '')): None
+                        for m in quality.get('qualityMetrics', [])})
+        if kind == 'setQualities':
+            set_metrics.append([accession for accession, _ in metrics])
+            continue
+        metadata = quality.get('metadata', {})
+        input_files = metadata.get('inputFiles', [])
+        runs.append({'label': metadata.get('label', ''),
+                     'inputFiles': [{'name': f.get('name', ''), 'location': f.get('location', ''),
+                                     'fileFormat': f.get('fileFormat', {}).get('name', "UNSPECIFIED")}
+                                    for f in input_files],
+                     'completionTime': _file_property(input_files, COMPLETION_TIME),
+                     'instrument': _file_property(input_files, INSTRUMENT_MODEL),
+                     'metrics': [list(m) for m in metrics]})
+    header = reader.header
+    metrics = {accession for run in runs for accession, _ in run['metrics']}
+    metrics.update(accession for sm in set_metrics for accession in sm)
+    return {'version': header.get('version'), 'creationDate': header.get('creationDate'),
+            'runs': runs, 'sets': len(set_metrics), 'metrics': sorted(metrics)}
+
+def summarize_path(path: str) -> Dict[str, Any]:
+    """
+    compact summary of the mzQC file at path, for aggregation (see summarize):
+    the counts of runs and sets, the metric accessions, and the runs' instrument models,
+    counted as the file is read so memory use does not grow with the runs;
+    files that can not be read (or are not mzQC as expected) have an 'error' instead
+    """
+    runs = sets = 0
+    metrics = set()
+    instruments: List[str] = list()
     try:
-        infofile = mzqc_io.from_json(infile)
-    except Exception:
-        print("No mzQC structure detected in input!")
-        print_help()
+        reader = MzQcStreamReader(path)
+        for kind, quality in reader:
+            metrics.update(m.get('accession', '') for m in quality.get('qualityMetrics', []))
+            if kind == 'setQualities':
+                sets += 1
+                continue
+            runs += 1
+            instrument = _file_property(quality.get('metadata', {}).get('inputFiles', []), INSTRUMENT_MODEL)
+            if instrument:
+                instruments.append(instrument)
+        header = reader.header
+    except Exception as e:  # one bad file must not abort the others in the pool
+        return {'file': path, 'error': str(e) or type(e).__name__}
+    return {'file': path, 'version': header.get('version'), 'creationDate': header.get('creationDate'),
+            'runs': runs, 'sets': sets, 'metrics': sorted(metrics), 'instruments': instruments}
+
+def find_inputs(inputs: Iterable[str]) -> Iterator[str]:
+    """
+    the mzQC files of the given inputs: files as they are, directories searched recursively
+    for files ending in one of MZQC_SUFFIXES (any case), and glob patterns (quoted, so
+    the shell does not expand them, with ** for any subdirectories) expanded
+    """
+    for entry in inputs:
+        if os.path.isfile(entry):
+            yield entry
+        elif os.path.isdir(entry):
+            for root, dirs, files in os.walk(entry):
+                dirs.sort()
+                yield from (os.path.join(root, f) for f in sorted(files) if f.lower().endswith(MZQC_SUFFIXES))
+        else:
+            matches = sorted(glob.iglob(entry, recursive=True))
+            if not matches:
+                raise click.BadParameter("No such file, directory, or match: {}".format(entry), param_hint='INPUTS')
+            yield from (m for m in matches if os.path.isfile(m))
 
-    rs = len(infofile.runQualities)
-    ss = len(infofile.setQualities)
-    mets = len({ metr.name for qm in chain(infofile.runQualities,
-                                           infofile.setQualities) for
-                                                metr in qm.qualityMetrics })
-    print(INFO.format(n=mets, m=rs, k=ss, d=infofile.creationDate) )
+def summarize_paths(paths: List[str], workers: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    the compact summaries (see summarize_path) of the files, read across a process pool of
+    the given number of workers (0 for one per CPU, 1 to read in this process), in input order
+    """
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        yield from map(summarize_path, paths)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # many small files: hand them out in batches to keep the scheduling overhead low
+        yield from pool.map(summarize_path, paths, chunksize=max(1, min(256, len(paths) // (workers * 4))))
 
-    for n, run in enumerate(infofile.runQualities, start=1):
-        mets = { (metr.name, metr.accession) for metr in run.qualityMetrics }
+def aggregate(summaries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    aggregate counts of the compact file summaries: files (and unreadable files), runs, and sets,
+    and per distinct metric and instrument model the number of files and runs they occur in
+    """
+    files = unreadable = runs = sets = 0
+    metrics: Counter = Counter()
+    instruments: Counter = Counter()
+    for summary in summaries:
+        files += 1
+        if 'error' in summary:
+            unreadable += 1
+            continue
+        runs += summary['runs']
+        sets += summary['sets']
+        metrics.update(summary['metrics'])
+        instruments.update(summary['instruments'])
+    return {'files': files, 'unreadable': unreadable, 'runs': runs, 'sets': sets,
+            'metrics': dict(metrics.most_common()), 'instruments': dict(instruments.most_common())}
 
-        files = list(run.metadata.inputFiles)  # "location", "name", "fileFormat.name
+def _timestamp(value: Optional[str]) -> Optional[dt.datetime]:
+    try:
+        return dt.datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith("Z") else value)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def print_file(summary: Dict[str, Any]):
+    """prints the summary of a single file (see summarize) for reading"""
+    print(INFO.format(n=len(summary['metrics']), m=len(summary['runs']), k=summary['sets'],
+                      d=_timestamp(summary['creationDate']) or summary['creationDate']))
+
+    for n, run in enumerate(summary['runs'], start=1):
         print("mzQC \"run\" #{n} was created for the input of the files:".format(n=n))
-        for file in files:
-            print(u"\t💾 {n} \n\t\t@ {l} \n\t\tof type".format(n=file.name, l=file.location),
-                  getattr(file.fileFormat, "name", "UNSPECIFIED"))
+        for file in run['inputFiles']:
+            print(u"\t💾 {n} \n\t\t@ {l} \n\t\tof type".format(n=file['name'], l=file['location']),
+                  file['fileFormat'])
 
-        try:
-            ct_str = next(iter([cd.value for infi in run.metadata.inputFiles
-                                for cd in infi.fileProperties if cd.accession=="MS:1000747"]))
-            if ct_str.endswith("Z"):
-                ct_str = ct_str[:-1]
+        ct_str = run['completionTime']
+        if ct_str is None:
+            print("\tNo completion time found in mzQC for this MS run object.")
+        else:
             try:
-                ct_datetime_object = dt.datetime.fromisoformat(ct_str)
+                ct_datetime_object = dt.datetime.fromisoformat(ct_str[:-1] if ct_str.endswith("Z") else ct_str)
                 print(u"\t🕑 The MS run object was completed at", ct_datetime_object.isoformat())
             except Exception:
                 print("\tCould not extract the run's completion time! Wrong format? Use the validator to find out.")
-        except Exception:
-            print("\tNo completion time found in mzQC for this MS run object.")
         print("\tMetrics:")
-        print(*[u"\t 📈" + str(m) for m in mets], sep='\n',)
+        print(*[u"\t 📈" + str((name, accession)) for accession, name in run['metrics']], sep='\n',)
+
+def print_line(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """prints the compact summary of a file (see summarize_path) as one line, and returns it"""
+    if 'error' in summary:
+        click.echo("{}\tunreadable: {}".format(summary['file'], summary['error']))
+    else:
+        click.echo("{}\t{} runs\t{} sets\t{} metrics\t{}".format(
+            summary['file'], summary['runs'], summary['sets'], len(summary['metrics']),
+            ', '.join(sorted(set(summary['instruments']))) or "no instrument model"))
+    return summary
+
+@click.version_option('v1')
+@click.command(context_settings=CONTEXT_SETTINGS,
+               short_help='mzQCFileInfo will report basic info on the mzQC file(s).')
+@click.argument('inputs', nargs=-1)
+@click.option('--json', 'as_json', is_flag=True, default=False,
+              help="Print the summary as JSON.")
+@click.option('-w', '--workers', type=int, default=0, show_default=True,
+              help="Number of processes reading files in parallel, 0 for one per CPU.")
+@click.option('-a', '--aggregate', 'force_aggregate', is_flag=True, default=False,
+              help="Summarize also a single file as aggregate.")
+def mzqcfileinfo(inputs, as_json, workers, force_aggregate):
+    """
+    Find out which metrics are available from the given mzQC file derived from which runs/sets.
+    The file is read one run at a time, also big files take little memory ('-' reads from stdin).
+
+    Given several files, directories (searched recursively for .mzQC and .mzQC.gz files), or
+    quoted glob patterns (e.g. 'archive/**/*.mzQC'), the files are read in parallel and
+    summarized in aggregate: one line per file, and the counts of runs, sets, and of
+    the distinct metrics and instrument models.
+    """
+    if not inputs:
+        print_help()
+    if len(inputs) == 1 and not force_aggregate and (inputs[0] == '-' or os.path.isfile(inputs[0])):
+        try:
+            summary = summarize(sys.stdin.buffer if inputs[0] == '-' else inputs[0])
+        except (OSError, ValueError, AttributeError, EOFError):
+            print("No mzQC structure detected in input!")
+            print_help()
+        if as_json:
+            click.echo(json.dumps(summary, indent=2))
+        else:
+            print_file(summary)
+        return
+
+    summaries = summarize_paths(list(find_inputs(inputs)), workers)
+    if as_json:
+        summaries = list(summaries)
+        click.echo(json.dumps({'files': summaries, 'aggregate': aggregate(summaries)}, indent=2))
+        return
+    total = aggregate(map(print_line, summaries))
+    click.echo(AGGREGATE.format(f=total['files'], u=total['unreadable'], n=len(total['metrics']),
+                                m=total['runs'], i=len(total['instruments']), k=total['sets']))
 
 if __name__ == '__main__':
     mzqcfileinfo()
@@ -1,9 +1,21 @@
 #!/usr/local/bin/python
+import os
+import json
+import heapq
+import hashlib
 import logging
+import tempfile
+from datetime import datetime
 from itertools import groupby
 from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
 import click
-from mzqc import MZQCFile as qc
+from mzqc.StreamReader import MzQcStreamReader
+from mzqc.StreamWriter import ShardWriter
+
+#ABI WIFF format/Thermo RAW format/mzML format; NOTE that any other format will have 0 as default so will be sorted to back when applying reverse sort
+REVERSED_ORDER = {'MS:1000562':0,'MS:1000563':1,'MS:1000584':2}
 
 def print_help():
     """
@@ -16,43 +28,177 @@ def print_help():
 
 def dedupe(list_of_cvparam_like):
     """
-    deduplicate lists of mzqc elements that are derived
-    from cvparam (i.e. they have an accession attribute)
+    deduplicate lists of (plain JSON) mzqc elements, the last of each key is kept
+    at the position of the first: controlled vocabularies by name and version, 
+    input files by name, and elements derived from cvparam by accession
     """
-    if not(all([isinstance(x, qc.CvParameter) for x in list_of_cvparam_like]) or\
-        all([isinstance(x, qc.ControlledVocabulary) for x in list_of_cvparam_like]) or\
-        all([isinstance(x, qc.InputFile) for x in list_of_cvparam_like])):
-        raise TypeError("List of elements to deduplicate contains non-CvParameter types.")
-
-    if all([isinstance(x, qc.ControlledVocabulary) for x in list_of_cvparam_like]):
-        return list({x.name+x.version: x for x in list_of_cvparam_like}.values())
-    elif all([isinstance(x, qc.InputFile) for x in list_of_cvparam_like]):
-        return list({x.name: x for x in list_of_cvparam_like}.values())
+    if not all(isinstance(x, dict) for x in list_of_cvparam_like):
+        raise TypeError("List of elements to deduplicate contains non-JSON object types.")
+    if all('uri' in x for x in list_of_cvparam_like):
+        return list({x.get('name', '')+x.get('version', ''): x for x in list_of_cvparam_like}.values())
+    elif all('location' in x for x in list_of_cvparam_like):
+        return list({x.get('name', ''): x for x in list_of_cvparam_like}.values())
     else:
-        return list({x.accession: x for x in list_of_cvparam_like}.values())
+        return list({x.get('accession', ''): x for x in list_of_cvparam_like}.values())
+
+def _digest(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+def run_key(run: Dict, compare: str) -> str:
+    """
+    hashed key of the run by which runs to merge are grouped: the digest of the whole metadata,
+    or of the location or name of the preferred input file (mzML before Thermo RAW before ABI 
+    WIFF, see REVERSED_ORDER); for the latter, the run's input files are sorted by that preference
+    """
+    metadata = run.get('metadata', {})
+    if compare == 'metadata':
+        return _digest(metadata)
+    input_files = metadata.get('inputFiles', [])
+    # stable, so files of the same format keep their order
+    input_files.sort(key=lambda x: REVERSED_ORDER.get(x.get('fileFormat', {}).get('accession'), 0), reverse=True)
+    if not input_files:
+        raise ValueError(f"Cannot compare runs by {compare}, run '{metadata.get('label', '')}' has no input files.")
+    return _digest(input_files[0].get(compare, ''))
+
+def set_key(quality: Dict, compare: str) -> str:
+    """
+    hashed key of a set by which sets to merge are matched: the digest of the whole metadata, 
+    or of the (unique, sorted) locations or names of all its input files
+    """
+    metadata = quality.get('metadata', {})
+    if compare == 'metadata':
+        return _digest(metadata)
+    return _digest(sorted({x.get(compare, '') for x in metadata.get('inputFiles', [])}))
+
+def software_key(software: Dict) -> Tuple[str, str]:
+    """key of an analysis software by which it is deduplicated: its accession and version"""
+    return software.get('accession', ''), software.get('version', '')
 
-def merge_into_single_run(runs):
+def merge_into_single_run(runs, software: Optional[Dict[Tuple[str, str], Dict]] = None):
     """
-    merge run quality objects if from the same run
-    runs are considerd the same if location, name, and format match
-    returns both files back, 
-        - first is the merger result or the first input if they dont match, 
-        - second is always second input
+    merge (plain JSON) run or set quality records if from the same run(s), i.e. 
+    combine their labels, and deduplicated input files, analysis software, and metrics;
+    the analysis software is looked up in (and added to) the software index shared by all
+    merged runs and sets (see software_key), so each software is given the same throughout
     """
     for f in runs: 
-        logging.debug(f.metadata)
+        logging.debug(f.get('metadata'))
 
-    metrics = dedupe(list(chain.from_iterable([x.qualityMetrics for x in runs])))
-    asw = dedupe(list(chain.from_iterable([x.metadata.analysisSoftware for x in runs])))
-    labels = '+'.join({x.metadata.label for x in runs if x.metadata.label != ''})
-    inf = dedupe(list(chain.from_iterable([x.metadata.inputFiles for x in runs])))
+    software = dict() if software is None else software
+    metrics = dedupe(list(chain.from_iterable([x.get('qualityMetrics', []) for x in runs])))
+    asw = list({software_key(sw): software.setdefault(software_key(sw), sw) for sw in
+                chain.from_iterable([x['metadata'].get('analysisSoftware', []) for x in runs])}.values())
+    labels = '+'.join(dict.fromkeys(x['metadata'].get('label', '') for x in runs if x['metadata'].get('label', '')))
+    inf = dedupe(list(chain.from_iterable([x['metadata'].get('inputFiles', []) for x in runs])))
 
-    return qc.RunQuality(metadata=qc.MetaDataParameters(
-            label=labels, inputFiles=inf, analysisSoftware=asw),
-        qualityMetrics=metrics)
+    return {'metadata': {'label': labels, 'inputFiles': inf, 'analysisSoftware': asw}, 'qualityMetrics': metrics}
 
-def match_and_merge_sets_files(sets):
-    pass
+def match_and_merge_sets_files(sets: Iterable[Tuple[str, Dict]],
+                               software: Optional[Dict[Tuple[str, str], Dict]] = None) -> List[Dict]:
+    """
+    merge the (key, set record) pairs of all inputs by key (see set_key), matched through 
+    an index of the keys, in order of the keys' first occurrence; software as for merge_into_single_run
+    """
+    index: Dict[str, List[Dict]] = dict()
+    for key, record in sets:
+        index.setdefault(key, []).append(record)
+    software = dict() if software is None else software
+    return [merge_into_single_run(group, software) for group in index.values()]
+
+def load_input(source: int, path: str, compare: str, spill_dir: str) -> Dict:
+    """
+    read the source-th input run by run (in a worker process): its runs are written to its 
+    spill file in spill_dir (see RunSpill), returned are the runs' index (key, position, offset), 
+    the sets with their keys, and the header members (controlledVocabularies and contacts)
+    """
+    reader = MzQcStreamReader(path)
+    index: List[Tuple[str, int, int]] = list()
+    sets: List[Tuple[str, Dict]] = list()
+    with open(RunSpill.spill_path(spill_dir, source), 'wb') as spill:
+        for kind, record in reader:
+            if kind == 'setQualities':
+                sets.append((set_key(record, compare), record))
+            else:
+                index.append((run_key(record, compare), len(index), spill.tell()))
+                spill.write(json.dumps(record).encode() + b'\n')
+    return {'index': index, 'sets': sets,
+            'controlledVocabularies': reader.header.get('controlledVocabularies', []),
+            'contactName': reader.header.get('contactName', ''),
+            'contactAddress': reader.header.get('contactAddress', '')}
+
+def load_inputs(paths: List[str], compare: str, spill_dir: str, workers: int = 0) -> Iterator[Dict]:
+    """
+    read the inputs (see load_input) across a process pool of the given number of workers
+    (0 for one per CPU, 1 to read in this process), the results come in input order
+    """
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    arguments = (range(len(paths)), paths, [compare] * len(paths), [spill_dir] * len(paths))
+    if workers <= 1:
+        yield from map(load_input, *arguments)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(load_input, *arguments)
+
+class RunSpill(object):
+    """
+    RunSpill Runs of many mzQC files, spilled to disk and grouped by key
+
+    The runs of each input are written to a spill file of their own in a temporary directory 
+    (see load_input); memory holds only the key, position, and file offset of each run. 
+    `groups` then k-way merges the inputs' runs and yields the runs of each key together, only 
+    one group at a time in memory. Groups are ordered by first occurrence (in input order), the 
+    runs in a group by input and position, so the result does not depend on hashing or timing.
+    """
+    def __init__(self):
+        self._directory = tempfile.TemporaryDirectory(prefix='mzqc-merge-')
+        self._indices: Dict[int, List[Tuple[str, int, int]]] = dict()
+        self._first: Dict[str, Tuple[int, int]] = dict()
+
+    @property
+    def directory(self) -> str:
+        """the directory of the spill files"""
+        return self._directory.name
+
+    @staticmethod
+    def spill_path(directory: str, source: int) -> str:
+        return os.path.join(directory, f'{source}.jsonl')
+
+    def __len__(self) -> int:
+        return sum(len(index) for index in self._indices.values())
+
+    def add_index(self, source: int, index: List[Tuple[str, int, int]]):
+        """registers the (key, position, offset) of the runs spilled for the source-th input, in input order"""
+        for key, position, _ in index:
+            self._first.setdefault(key, (source, position))
+        self._indices[source] = index
+
+    def _read(self, source: int, offset: int) -> Dict:
+        with open(self.spill_path(self.directory, source), 'rb') as spill:
+            spill.seek(offset)
+            return json.loads(spill.readline())
+
+    def groups(self) -> Iterator[List[Dict]]:
+        """yields the runs of each key, in order of the keys' first occurrence"""
+        def ordered(source, index):
+            for key, position, offset in sorted(index, key=lambda x: (self._first[x[0]], x[1])):
+                yield self._first[key], source, position, key, offset
+        merged = heapq.merge(*(ordered(source, index) for source, index in sorted(self._indices.items())))
+        for key, group in groupby(merged, key=lambda x: x[3]):
+            yield [self._read(source, offset) for _, source, _, _, offset in group]
+
+    def close(self):
+        self._directory.cleanup()
+
+def write_mzqc(path: str, header: Dict, runs: Iterator[Dict], sets: List[Dict], controlled_vocabularies: List[Dict]):
+    """writes an mzQC document (in the layout of mzqc_split's shards), the runs one by one as they come"""
+    writer = ShardWriter(path, header)
+    for run in runs:
+        writer.add(run)
+    if sets:
+        writer.begin('setQualities')
+        for quality in sets:
+            writer.add(quality)
+    writer.close(controlled_vocabularies)
 
 @click.version_option('v1BETA')
 @click.command(short_help='A simple mzQC file merger using pymzqc assuming file metadata is compatible. mzQC files will be merged, where possible runs matched and metrics combined.')
@@ -64,62 +210,46 @@ def match_and_merge_sets_files(sets):
 @click.option('--log', type=click.Choice(['debug', 'info', 'warn'], case_sensitive=False),
     default='warn', show_default=True,
     required=False, help="Log detail level. (verbosity: debug>info>warn)")
-def mzqcfilemerger(mzqc_output, mzqc_input, compare, log):
+@click.option('-w', '--workers', type=int, default=0, show_default=True,
+    help="Number of processes reading the inputs, 0 for one per CPU.")
+def mzqcfilemerger(mzqc_output, mzqc_input, compare, log, workers):
     # set loglevel - switch to match-case for py3.10+
     lev = {'debug': logging.DEBUG,
      'info': logging.INFO,
      'warn': logging.WARN }
     logging.basicConfig(format='%(levelname)s:%(message)s', level=lev[log])
 
-    cvs = list()
-    cname = set()
-    caddress = set()
-    to_merge = list()
-    for fn in mzqc_input:
-        with open(fn, "r") as file:
-            mzqc = qc.JsonSerialisable.from_json(file)
-            to_merge.extend(mzqc.runQualities)
-            cvs.extend(mzqc.controlledVocabularies)
-            cname.add(mzqc.contactName)
-            caddress.add(mzqc.contactAddress)
-            if len(mzqc.setQualities)>0:
-                # stop if there are msetQualities in either file - we don't cover that here yet - see match_and_merge_sets_files
-                raise IndexError("Cannot merge mzqc with sets yet!")
-
-    if len(to_merge) < 2:
-        raise IndexError("Need at least 2 mzQC files to merge!")
-
-    merged = []
-
-    # same metadata - why does it need merging in the first place?
-    if compare == 'metadata':
-        for key, group in groupby(to_merge, lambda x: x.metadata):
-            merged.append(merge_into_single_run(list(group)))
-
-    # scenario where you apply different tools to the same file, some might have additional inputFiles though
-    elif compare == 'location':
-        reversedorder = {'MS:1000562':0,'MS:1000563':1,'MS:1000584':2} #ABI WIFF format/Thermo RAW format/mzML format; NOTE that any other format will have 0 as default so will be sorted to back when applying reverse sort
-        for run in to_merge:
-            run.metadata.inputFiles.sort(key=lambda x: reversedorder.get(x.fileFormat.accession, 0), reverse=True)
-        for key, group in groupby(to_merge, lambda x: x.metadata.inputFiles[0].location):  # this might be an issue but sorting of the metadata input files might help
-            merged.append(merge_into_single_run(list(group)))
-
-    # scenario where you apply different tools to the same file but through workflow circumstances the location is registered as different
-    else:  # == 'name'
-        reversedorder = {'MS:1000562':0,'MS:1000563':1,'MS:1000584':2} #ABI WIFF format/Thermo RAW format/mzML format; NOTE that any other format will have 0 as default so will be sorted to back when applying reverse sort
-        for run in to_merge:
-            run.metadata.inputFiles.sort(key=lambda x: reversedorder.get(x.fileFormat.accession, 0), reverse=True)
-        for key, group in groupby(to_merge, lambda x: x.metadata.inputFiles[0].name):
-            merged.append(merge_into_single_run(list(group)))
-
-    with open(mzqc_output, "w") as file:
-        file.write(qc.JsonSerialisable.to_json(
-            qc.MzQcFile(description="Merged from multiple mzqc files",
-                        contactName='+'.join(cname),
-                        contactAddress='+'.join(caddress),
-                        version="v1.0",
-                        controlledVocabularies=dedupe(cvs),
-                        runQualities=merged), readability=1))
+    cvs = dict()
+    software = dict()
+    cname = dict()
+    caddress = dict()
+    sets = list()
+    spill = RunSpill()
+    try:
+        for source, loaded in enumerate(load_inputs(mzqc_input, compare, spill.directory, workers)):
+            spill.add_index(source, loaded['index'])
+            sets.extend(loaded['sets'])
+            for cv in loaded['controlledVocabularies']:
+                cvs[(cv.get('name', ''), cv.get('version', ''))] = cv
+            cname[loaded['contactName']] = None
+            caddress[loaded['contactAddress']] = None
+
+        if len(spill) + len(sets) < 2:
+            raise click.UsageError("Need at least 2 mzQC files to merge!")
+
+        # same metadata - why does it need merging in the first place?
+        # location: scenario where you apply different tools to the same file, some might have additional inputFiles though
+        # name: scenario where you apply different tools to the same file but through workflow circumstances the location is registered as different
+        header = {'version': "v1.0",
+                  'creationDate': datetime.now().replace(microsecond=0),
+                  'contactName': '+'.join(k for k in cname if k),
+                  'contactAddress': '+'.join(k for k in caddress if k),
+                  'description': "Merged from multiple mzqc files"}
+        write_mzqc(mzqc_output, {k: v for k, v in header.items() if v},
+                   (merge_into_single_run(group, software) for group in spill.groups()),
+                   match_and_merge_sets_files(sets, software), list(cvs.values()))
+    finally:
+        spill.close()
 
     click.echo("Files merged. Thank you for doing QC!")
 
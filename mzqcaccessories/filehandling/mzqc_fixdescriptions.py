@@ -1,16 +1,17 @@
 #!/usr/bin/env python
 from typing import Dict, List
 import click
-from pronto import Ontology, Term
 from mzqc.MZQCFile import JsonSerialisable as mzqc_io
 from mzqc.MZQCFile import MzQcFile, BaseQuality, RunQuality, SetQuality, QualityMetric, MetaDataParameters, CvParameter
+from mzqc.ResourceCache import ontology_cache
+from mzqc.VocabularyIndex import VocabularyIndex, TermRecord
 
 CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
 
 def rfix_term(val, vocs):
     if hasattr(val, 'accession'):
         if val.description == "":
-            terms: List[Term] = list(filter(None, [voc.get(val.accession) for voc in vocs.values()]))
+            terms: List[TermRecord] = list(filter(None, [voc.get(val.accession) for voc in vocs.values()]))
             if terms:
                 val.description = next(iter(terms)).definition
     elif isinstance(val, List):
@@ -45,10 +46,10 @@ def mzqcfixdescriptions(infile, outfile):
         print("No mzQC structure detected in input!")
         print_help()
 
-    vocs:Dict[str,Ontology] = dict()
+    vocs:Dict[str,VocabularyIndex] = dict()
     for cve in fixfile.controlledVocabularies:
         try:
-            vocs[cve.name] = Ontology(cve.uri, import_depth=0)
+            vocs[cve.name] = ontology_cache.load_index(cve.uri, cve.version)
         except Exception:
             pass
     rfix_term(fixfile, vocs)
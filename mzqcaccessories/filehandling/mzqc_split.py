@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+import os
+import re
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+import click
+from mzqc.ResourceCache import ontology_cache
+from mzqc.StreamReader import MzQcStreamReader
+from mzqc.StreamWriter import ShardWriter
+
+CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
+MAX_OPEN_SHARDS = 64  # shards written at a time by label prefix, the least recently used are suspended
+
+def vocabulary_prefixes(controlled_vocabularies: List[Dict]) -> List[Optional[Set[str]]]:
+    """
+    the accession prefixes (e.g. MS, UO) of the terms of each controlled vocabulary,
+    loaded through the ontology cache; None for vocabularies that can not be loaded (or are empty)
+    """
+    prefixes: List[Optional[Set[str]]] = list()
+    for cv in controlled_vocabularies:
+        uri = cv.get('uri', '')
+        try:
+            # local vocabularies as for the validation with load_local
+            index = ontology_cache.load_index(uri[len('file://'):] if uri.startswith('file://') else uri,
+                                              cv.get('version', ''))
+            prefixes.append({accession.partition(':')[0] for accession in index.terms} or None)
+        except Exception as e:
+            logging.warning("Could not load %s (%s), it is kept in all shards: %s", cv.get('name', ''), cv.get('uri', ''), e)
+            prefixes.append(None)
+    return prefixes
+
+def shard_name(value: str) -> str:
+    """a file name safe version of a label (prefix)"""
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', value).strip('._') or 'unlabelled'
+
+@click.version_option('v1')
+@click.command(context_settings=CONTEXT_SETTINGS,
+               short_help='mzqc-split splits a mzQC file into shards of runs.')
+@click.argument('infile', type=click.Path(exists=True, readable=True, dir_okay=False))
+@click.argument('outdir', type=click.Path(file_okay=False, writable=True))
+@click.option('-n', '--runs', type=click.IntRange(min=1), default=1, show_default=True,
+              help="Number of runs per shard.")
+@click.option('-l', '--label-prefix', default=None,
+              help="Group runs into shards by their label prefix, the part before the first occurrence of the given separator (instead of --runs).")
+@click.option('--all-cvs', is_flag=True, default=False,
+              help="Give every shard all controlledVocabularies, without loading them to find those used.")
+def mzqcsplit(infile, outdir, runs, label_prefix, all_cvs):
+    """
+    Splits the mzQC file INFILE into shards in OUTDIR, each with the file's metadata and
+    N runs (one by default), or the runs with the same label prefix. The runs are read and
+    written one at a time. Each shard lists the controlledVocabularies its terms are from
+    (found by loading the vocabularies, unless --all-cvs). Sets, which relate runs, are
+    written to a shard of their own (named STEM.sets.mzQC).
+    """
+    if label_prefix == '':
+        raise click.BadParameter("The label prefix separator must not be empty.", param_hint='--label-prefix')
+    reader = MzQcStreamReader(infile)
+    try:
+        header = reader.read_header()
+    except ValueError as e:
+        raise click.BadParameter("No mzQC structure detected in {}: {}".format(infile, e), param_hint='INFILE')
+    controlled_vocabularies = header.get('controlledVocabularies', [])
+    header = {k: v for k, v in header.items()
+              if k not in ('runQualities', 'setQualities', 'controlledVocabularies')}
+    prefixes = None if all_cvs else vocabulary_prefixes(controlled_vocabularies)
+    os.makedirs(outdir, exist_ok=True)
+    stem = shard_name(os.path.basename(infile).split('.')[0])
+
+    open_shards: Dict[Tuple[str, str], ShardWriter] = dict()
+    # the shards with an open file, least recently written first
+    active: "OrderedDict[Tuple[str, str], ShardWriter]" = OrderedDict()
+    written: List[ShardWriter] = list()
+    def close(key: Tuple[str, str]):
+        shard = open_shards.pop(key)
+        active.pop(key, None)
+        shard.close(controlled_vocabularies, prefixes)
+        written.append(shard)
+
+    try:
+        for kind, quality in reader:
+            if kind == 'setQualities':
+                key = (kind, stem + '.sets.mzQC')
+            elif label_prefix is not None:
+                name = shard_name(quality.get('metadata', {}).get('label', '').split(label_prefix, 1)[0])
+                key = (kind, stem + '_' + name + '.mzQC')
+            else:
+                key = (kind, stem + '_' + str(len(written)).zfill(5) + '.mzQC')
+            if key not in open_shards:
+                open_shards[key] = ShardWriter(os.path.join(outdir, key[1]), header, kind)
+            open_shards[key].add(quality)
+            active[key] = open_shards[key]
+            active.move_to_end(key)
+            while len(active) > MAX_OPEN_SHARDS:
+                active.popitem(last=False)[1].suspend()
+            if kind == 'runQualities' and label_prefix is None and open_shards[key].count == runs:
+                close(key)
+    except ValueError as e:
+        raise click.ClickException("Could not read {}: {}".format(infile, e))
+    finally:
+        for key in list(open_shards):
+            close(key)
+
+    for shard in written:
+        click.echo("{} ({} {})".format(shard.path, shard.count, 'runs' if shard.key == 'runQualities' else 'sets'))
+    click.echo("Split into {} shards.".format(len(written)))
+
+if __name__ == '__main__':
+    mzqcsplit()
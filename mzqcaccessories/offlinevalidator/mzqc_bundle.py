@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+__author__ = 'walzer'
+import urllib.request
+from typing import Dict
+import click
+from mzqc import OboLoader
+from mzqc.HttpFetcher import http_fetcher
+from mzqc.MZQCFile import JsonSerialisable as mzqc_io
+from mzqc.ResourceBundle import ResourceBundle
+from mzqc.ResourceCache import use_bundle, _pymzqc_version
+from mzqc.SyntaxCheck import SCHEMA_URL
+
+CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
+
+def download(uri: str) -> bytes:
+    if http_fetcher.handles(uri):
+        return http_fetcher.fetch(uri).content
+    with urllib.request.urlopen(uri) as response:
+        return response.read()
+
+@click.version_option('v1')
+@click.command(context_settings=CONTEXT_SETTINGS,
+               short_help='mzqc-bundle packs schemas and ontologies for offline validation.')
+@click.argument('bundle', type=click.Path(dir_okay=False, writable=True))
+@click.argument('mzqc', nargs=-1, type=click.File('r'))
+@click.option('-s', '--schema-version', multiple=True, default=['main'], show_default=True,
+              help="Schema version (branch or tag) to include, repeat for several.")
+@click.option('-o', '--ontology', multiple=True,
+              help="URI of an ontology to include, repeat for several.")
+@click.option('--no-sources', is_flag=True, default=False,
+              help="Include only the compiled indices, not the ontology documents (enough for validation).")
+def mzqcbundle(bundle, mzqc, schema_version, ontology, no_sources):
+    """
+    Packs the mzQC schema versions and the ontologies referenced in the given MZQC files
+    (and/or given as options) into the resource bundle BUNDLE. Point the validators to it with
+    the PYMZQC_BUNDLE environment variable (or `mzqc-validator --bundle`) to validate without
+    network access.
+    """
+    use_bundle('')  # everything is fetched anew
+    ontologies: Dict[str, str] = {uri: "" for uri in ontology}
+    for infile in mzqc:
+        try:
+            target = mzqc_io.from_json(infile)
+        except Exception:
+            raise click.BadParameter("No mzQC structure detected in {}".format(infile.name), param_hint='MZQC')
+        for cv in target.controlledVocabularies:
+            if not cv.uri.startswith(('http://', 'https://', 'ftp://')):
+                click.echo("Skipping local ontology {} (read from disk during validation)".format(cv.uri), err=True)
+                continue
+            ontologies[cv.uri] = ontologies.get(cv.uri) or cv.version
+    if not schema_version and not ontologies:
+        raise click.UsageError("Nothing to bundle, give schema versions, ontologies, or mzQC files.")
+
+    with ResourceBundle.create(bundle, pymzqc=_pymzqc_version()) as writer:
+        for version in schema_version:
+            url = SCHEMA_URL.format(branch=version)
+            writer.add_document(url, download(url).decode('utf-8-sig'))
+            click.echo("Bundled schema {}".format(version))
+        for uri, version in ontologies.items():
+            source = download(uri)
+            index = OboLoader.parse_vocabulary(source, uri)
+            writer.add_ontology(uri, index, version=version, source=None if no_sources else source)
+            click.echo("Bundled ontology {} (data-version {}, {} terms)".format(uri, index.data_version, len(index)))
+
+if __name__ == '__main__':
+    mzqcbundle()
@@ -1,11 +1,37 @@
+import os
+import sys
+import glob
 import json
+import time
+import functools
+import http.client
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, IO, Iterable, List, Optional, Tuple
 import click
+from jsonschema import ValidationError
 from mzqc.MZQCFile import MzQcFile as mzqc_file
 from mzqc.MZQCFile import JsonSerialisable as mzqc_io
-from mzqc.SemanticCheck import SemanticCheck
+from mzqc.SemanticCheck import SemanticCheck, PROFILES, resolve_checks
 from mzqc.SyntaxCheck import SyntaxCheck
+from mzqc.StreamReader import MzQcStreamReader
+from mzqc.ResourceCache import result_cache, use_bundle
 
-def validate(inpu):
+SCHEMA_VERSION = "main"
+
+# exit codes of batch validation
+EXIT_VALID = 0
+EXIT_ISSUES = 1
+EXIT_FAILED = 2
+
+DEFAULT_DAEMON_ADDRESS = '127.0.0.1:8491'
+
+@functools.lru_cache(maxsize=None)
+def syntax_check(version: str = SCHEMA_VERSION) -> SyntaxCheck:
+    """One SyntaxCheck (i.e. one schema download or cache lookup) per process and schema version"""
+    return SyntaxCheck(version)
+
+def validate(inpu, use_cache=True, profile='full', time_budget=0):
     """top-level function to validate mzqc input
 
     Calls on SemanticCheck and SyntaxCheck functionality of the pymzqc library
@@ -14,6 +40,14 @@ def validate(inpu):
     ----------
     inpu : JSON
         Input is assumed to be a a file or raw JSON string, other input fails validation
+    use_cache : bool, optional
+        if True, results for unchanged documents (and ontology versions) are reused from 
+        the process-wide (and on-disk) result cache, by default True
+    profile : str, optional
+        the selection of semantic checks to run (see SemanticCheck.PROFILES), by default 'full'
+    time_budget : float, optional
+        seconds the semantic and syntax validation may take together, by default 0 for no limit. 
+        Out of time, the partial result is returned (and not cached).
 
     Returns
     -------
@@ -22,6 +56,8 @@ def validate(inpu):
         ontology validation, or categories of semantic validation
     """
     default_unknown = {"general": "No mzQC structure detectable."}
+    if hasattr(inpu, 'read'):
+        inpu = inpu.read()
     try:
         target = mzqc_io.from_json(inpu)
     except Exception:
@@ -30,11 +66,26 @@ def validate(inpu):
     if not isinstance(target, mzqc_file):
         return default_unknown
 
+    cache_key = None
+    if use_cache:
+        cache_key = result_cache.key(inpu, SCHEMA_VERSION,
+                                     [(cv.uri, cv.version) for cv in target.controlledVocabularies
+                                      if cv.uri.startswith('http') and
+                                      'ontology load errors' in resolve_checks(profile)],
+                                     validator='offline', profile=profile)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
     removed_items = list(filter(lambda x: not x.uri.startswith('http'), target.controlledVocabularies))
     target.controlledVocabularies = list(filter(lambda x: x.uri.startswith('http'), target.controlledVocabularies))
 
+    deadline = time.monotonic() + time_budget if time_budget > 0 else None
     sem_val = SemanticCheck(mzqc_obj=target, file_path='.')
-    sem_val.validate(load_local=True)
+    try:
+        sem_val.validate(load_local=True, profile=profile, deadline=deadline)
+    except ValidationError:
+        pass  # out of time, the partial result is reported
     proto_response = sem_val.string_export()
 
     if removed_items:
@@ -42,7 +93,7 @@ def validate(inpu):
                             ["invalid ontology URI for "+ str(it.name) for it in removed_items]})
 
     valt = mzqc_io.to_json(target)
-    syn_val_res = SyntaxCheck().validate(valt)
+    syn_val_res = syntax_check(SCHEMA_VERSION).validate(valt, deadline=deadline)
     # older versions of the validator report a generic response in an array - return first only
     if isinstance(syn_val_res.get('schema validation', None), list):
         syn_val_res = {'schema validation':
@@ -52,14 +103,293 @@ def validate(inpu):
 
     # convert val_res ErrorTypes to strings
     # add note on removed CVs
+    out_of_time = deadline is not None and time.monotonic() > deadline
+    if cache_key and not sem_val._exceeded_time and not out_of_time:
+        result_cache.put(cache_key, proto_response)
+    return proto_response
+
+def validate_streaming(source, profile='full', time_budget=0):
+    """top-level function to validate mzqc input without loading it whole
+
+    Like `validate`, but the runs and sets are read and validated one at a time 
+    (see SemanticCheck and SyntaxCheck with a MzQcStreamReader). The document is 
+    read twice, once for the controlled vocabularies. Results are not cached.
+
+    Parameters
+    ----------
+    source : Union[str, IO]
+        path or seekable file of the mzQC document
+    profile : str, optional
+        the selection of semantic checks to run (see SemanticCheck.PROFILES), by default 'full'
+    time_budget : float, optional
+        seconds the semantic and syntax validation may take together, by default 0 for no limit
+
+    Returns
+    -------
+    JSON
+        Response structure as for `validate`
+    """
+    default_unknown = {"general": "No mzQC structure detectable."}
+    reader = MzQcStreamReader(source)
+    try:
+        header = reader.read_header()
+    except ValueError:
+        return default_unknown
+    controlled_vocabularies = header.get('controlledVocabularies', [])
+    if not isinstance(controlled_vocabularies, list) or \
+            not all(isinstance(cv, dict) for cv in controlled_vocabularies):
+        return default_unknown
+
+    removed_items = [cv for cv in controlled_vocabularies if not cv.get('uri', '').startswith('http')]
+    reader.replace['controlledVocabularies'] = [cv for cv in controlled_vocabularies
+                                                if cv.get('uri', '').startswith('http')]
+
+    deadline = time.monotonic() + time_budget if time_budget > 0 else None
+    sem_val = SemanticCheck(mzqc_obj=reader, file_path='.')
+    try:
+        sem_val.validate(load_local=True, profile=profile, deadline=deadline)
+    except ValidationError:
+        pass  # out of time, the partial result is reported
+    if sem_val._invalid_mzqc_obj:
+        return default_unknown
+    proto_response = sem_val.string_export()
+
+    if removed_items:
+        proto_response.update({"ontology validation":
+                            ["invalid ontology URI for "+ str(it.get('name', '')) for it in removed_items]})
+
+    proto_response.update(syntax_check(SCHEMA_VERSION).validate_stream(reader, deadline=deadline))
+    return proto_response
+
+def is_valid(proto_response: Dict) -> bool:
+    """True if a validation response reports neither schema nor semantic issues"""
+    return all(v == 'success' if k == 'schema validation' else (k != 'general' and not v)
+               for k, v in proto_response.items())
+
+def expand_inputs(patterns: Iterable[str], file_list: Optional[IO[str]] = None) -> List[str]:
+    """Resolves the input arguments (paths or glob patterns) and the lines of a file list to paths"""
+    paths = list()
+    for pattern in patterns:
+        if any(c in pattern for c in '*?['):
+            matched = sorted(glob.glob(pattern, recursive=True))
+            if not matched:
+                click.echo("No files match {}".format(pattern), err=True)
+            paths.extend(matched)
+        else:
+            paths.append(pattern)
+    if file_list is not None:
+        paths.extend(line.strip() for line in file_list if line.strip() and not line.startswith('#'))
+    return paths
+
+def validate_path(path: str, use_cache: bool = True, profile: str = 'full', time_budget: float = 0,
+                  streaming: bool = False) -> Tuple[str, Dict]:
+    """Validates one file, usable as process pool task, failures are reported in the response"""
+    try:
+        if streaming:
+            return path, validate_streaming(path, profile=profile, time_budget=time_budget)
+        with open(path, 'r') as infile:
+            return path, validate(infile, use_cache=use_cache, profile=profile, time_budget=time_budget)
+    except Exception as e:
+        return path, {"general": "Validation failed: {}".format(e)}
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """Splits a daemon address of the form [host:]port, the host defaults to localhost"""
+    host, _, port = address.rpartition(':')
+    try:
+        return host or '127.0.0.1', int(port)
+    except ValueError:
+        raise ValueError("Invalid daemon address '{}', expected [host:]port".format(address))
+
+def request_validation(daemon: str, path: Optional[str] = None, document: Optional[bytes] = None,
+                       **options) -> Dict:
+    """Has a running validator daemon (see mzqc_validator_daemon) validate a file or document
+
+    Parameters
+    ----------
+    daemon : str
+        the daemon address, [host:]port
+    path : str, optional
+        path of the file to validate, read by the daemon, by default None
+    document : bytes, optional
+        the document to validate, if no path is given, by default None
+    **options
+        use_cache, profile, time_budget, and streaming, as for `validate_path`
+
+    Returns
+    -------
+    Dict
+        the validation response
+
+    Raises
+    ------
+    ConnectionError
+        if the daemon can not be reached or rejects the request
+    """
+    query = {k: v for k, v in options.items() if v is not None}
+    if path is not None:
+        query['path'] = os.path.abspath(path)
+    connection = http.client.HTTPConnection(*parse_address(daemon))
+    try:
+        connection.request('POST', '/validate?' + urllib.parse.urlencode(query), body=document or b'',
+                           headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        proto_response = json.loads(response.read())
+    except (OSError, ValueError, http.client.HTTPException) as e:
+        raise ConnectionError("No validator daemon reachable at {}: {}".format(daemon, e))
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise ConnectionError("Validator daemon at {} failed: {}".format(daemon, proto_response.get('error')))
+    return proto_response
+
+def request_path(path: str, daemon: str, **options) -> Tuple[str, Dict]:
+    """As `validate_path`, with the validation done by a running validator daemon"""
+    try:
+        return path, request_validation(daemon, path=path, **options)
+    except ConnectionError as e:
+        return path, {"general": "Validation failed: {}".format(e)}
+
+def _init_worker(bundle: Optional[str]):
+    """Sets up a pool process with the bundle in use and the schema loaded"""
+    if bundle:
+        use_bundle(bundle)
+    try:
+        syntax_check(SCHEMA_VERSION)
+    except Exception:
+        pass  # reported per file
+
+def validate_batch(paths: List[str], out: IO[str], workers: int = 0, bundle: Optional[str] = None,
+                   daemon: Optional[str] = None, **options) -> int:
+    """Validates many files across a process pool, writing one JSON line per file as results come in
+
+    Each worker process keeps its schema and ontologies (and their indices) loaded for all 
+    files it validates. With a validator daemon, the files are sent to the daemon instead, 
+    `workers` requests at a time.
+
+    Parameters
+    ----------
+    paths : List[str]
+        the files to validate
+    out : IO[str]
+        destination of the JSON Lines, each an object with `file` and `result` (as from `validate`)
+    workers : int, optional
+        number of worker processes, by default 0 for one per CPU
+    bundle : str, optional
+        offline resource bundle used by the workers, by default None
+    daemon : str, optional
+        address of a validator daemon to validate with, by default None
+    **options
+        passed to `validate_path`
+
+    Returns
+    -------
+    int
+        the summary exit code, EXIT_VALID if all files are valid, EXIT_FAILED if any could 
+        not be validated, otherwise EXIT_ISSUES
+    """
+    counts = {EXIT_VALID: 0, EXIT_ISSUES: 0, EXIT_FAILED: 0}
+
+    def report(path: str, proto_response: Dict):
+        out.write(json.dumps({'file': path, 'result': proto_response}, sort_keys=True) + '\n')
+        out.flush()
+        if 'general' in proto_response:
+            counts[EXIT_FAILED] += 1
+        else:
+            counts[EXIT_ISSUES if not is_valid(proto_response) else EXIT_VALID] += 1
+
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if daemon:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for done in as_completed([pool.submit(request_path, path, daemon, **options) for path in paths]):
+                report(*done.result())
+    elif workers <= 1:
+        for path in paths:
+            report(*validate_path(path, **options))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(bundle,)) as pool:
+            for done in as_completed([pool.submit(validate_path, path, **options) for path in paths]):
+                report(*done.result())
+
+    click.echo("{} files validated: {} valid, {} with issues, {} failed".format(
+        len(paths), counts[EXIT_VALID], counts[EXIT_ISSUES], counts[EXIT_FAILED]), err=True)
+    if counts[EXIT_FAILED]:
+        return EXIT_FAILED
+    return EXIT_ISSUES if counts[EXIT_ISSUES] else EXIT_VALID
+
+def validate_input(path: str, no_cache: bool, profile: str, time_budget: float, streaming: bool) -> Dict:
+    """Validates a single input (path or - for stdin) here, as by the command line options"""
+    try:
+        infile = click.open_file(path, 'r')
+    except OSError as e:
+        raise click.BadParameter(str(e), param_hint='INFILES')
+    with infile:
+        if streaming:
+            if not infile.seekable():
+                raise click.BadParameter("streaming validation needs a (seekable) file", param_hint='INFILES')
+            proto_response = validate_streaming(infile, profile=profile, time_budget=time_budget)
+        else:
+            proto_response = validate(infile, use_cache=not no_cache, profile=profile, time_budget=time_budget)
     return proto_response
 
 @click.version_option('v1')
 @click.command()  # no command necessary if it's the only one
 @click.option('-j','--write-to-file', required=False, type=click.Path(), default=None, help="File destination for the output of the validation result.")
-@click.argument('infile', type=click.File('r'))
-def start(infile, write_to_file):
-    proto_response = validate(infile)
+@click.option('--no-cache', is_flag=True, default=False, help="Do not reuse (or store) cached validation results.")
+@click.option('-p', '--profile', type=click.Choice(list(PROFILES)), default='full', show_default=True,
+              help="Selection of semantic checks to run, 'structural' needs no ontologies.")
+@click.option('-t', '--time-budget', type=float, default=0, show_default=True,
+              help="Seconds the validation may take before it stops with partial results, 0 for no limit.")
+@click.option('-s', '--streaming', is_flag=True, default=False,
+              help="Validate one run/set at a time, for files too large to load whole (no caching).")
+@click.option('-b', '--bundle', type=click.Path(exists=True, dir_okay=False), default=None,
+              help="Offline resource bundle (see mzqc-bundle) to take schema and ontologies from, "
+                   "instead of the network (default: the PYMZQC_BUNDLE environment variable).")
+@click.option('-l', '--file-list', type=click.File('r'), default=None,
+              help="File with one path to validate per line (use - for stdin).")
+@click.option('-w', '--workers', type=int, default=0, show_default=True,
+              help="Processes validating files in parallel with several inputs, 0 for one per CPU.")
+@click.option('-d', '--daemon', envvar='MZQC_VALIDATOR_DAEMON', default=None,
+              help="Send the files to the validator daemon at this [host:]port instead of validating "
+                   "here (see mzqc-validator-daemon, default: the MZQC_VALIDATOR_DAEMON environment variable).")
+@click.argument('infiles', nargs=-1, type=click.Path(allow_dash=True))
+def start(infiles, write_to_file, no_cache, profile, time_budget, streaming, bundle, file_list, workers, daemon):
+    """
+    Validates the mzQC file(s) INFILES (paths or glob patterns, - for stdin). Several files
+    are validated in parallel and reported as JSON Lines, one object per file (with `file` and
+    `result`) in order of completion. Batch validation exits with 0 if all files are valid,
+    1 if any has issues, and 2 if any could not be validated.
+    """
+    if bundle and daemon:
+        raise click.UsageError("A daemon uses its own resource bundle, start it with --bundle instead.")
+    if bundle:
+        try:
+            use_bundle(bundle)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--bundle')
+    paths = expand_inputs(infiles, file_list)
+    if not paths:
+        raise click.UsageError("No input files given.")
+    if len(paths) > 1 or file_list is not None or any(c in p for p in infiles for c in '*?['):
+        if '-' in paths:
+            raise click.BadParameter("stdin can only be validated as single input", param_hint='INFILES')
+        options = dict(use_cache=not no_cache, profile=profile, time_budget=time_budget, streaming=streaming)
+        if write_to_file:
+            with open(write_to_file, 'w') as out:
+                sys.exit(validate_batch(paths, out, workers=workers, bundle=bundle, daemon=daemon, **options))
+        sys.exit(validate_batch(paths, sys.stdout, workers=workers, bundle=bundle, daemon=daemon, **options))
+
+    if daemon:
+        try:
+            if paths[0] == '-':
+                proto_response = request_validation(daemon, document=click.get_binary_stream('stdin').read(),
+                                                    use_cache=not no_cache, profile=profile, time_budget=time_budget)
+            else:
+                proto_response = request_validation(daemon, path=paths[0], use_cache=not no_cache, profile=profile,
+                                                    time_budget=time_budget, streaming=streaming)
+        except ConnectionError as e:
+            raise click.ClickException(str(e))
+    else:
+        proto_response = validate_input(paths[0], no_cache, profile, time_budget, streaming)
     if write_to_file:
         with open(write_to_file, 'w') as f:
             json.dump(proto_response, f)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+__author__ = 'walzer'
+import os
+import json
+import time
+import signal
+import ipaddress
+import logging
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, Optional, Tuple
+import click
+from mzqc.SemanticCheck import PROFILES
+from mzqc.ResourceCache import ontology_cache, use_bundle, active_bundle
+from mzqcaccessories.offlinevalidator.mzqc_offline_validator import (
+    SCHEMA_VERSION, DEFAULT_DAEMON_ADDRESS, parse_address, syntax_check, validate, validate_path)
+
+CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
+
+def parse_ontology(entry: str) -> Tuple[str, str]:
+    """Splits an ontology given as URI[@VERSION] into URI and version ("" if none)"""
+    uri, sep, version = entry.rpartition('@')
+    return (uri, version) if sep and '/' not in version else (entry, "")
+
+class ValidatorDaemon(ThreadingHTTPServer):
+    """
+    ValidatorDaemon A local HTTP server validating mzQC files with warm schema and vocabularies
+
+    Endpoints:
+        GET /status: the daemon's uptime and number of validations
+        POST /validate: validates the file given with the `path` query parameter (read by the
+            daemon, see below), or else the request body; the optional query parameters `profile`,
+            `time_budget`, `use_cache`, and `streaming` are as for `mzqc-validator`. The
+            response is the validation result as from `mzqc-validator`.
+
+    Requests are handled in threads, sharing the process-wide schema, ontology, and result caches.
+    Files are only read for the `path` parameter below the `root` directory, or, without a root,
+    if the daemon listens on a loopback address only (otherwise, the request is refused with 403).
+
+    Parameters
+    ----------
+    address : str
+        the [host:]port to listen on
+    root : str, optional
+        directory the files read for the `path` parameter must be in, by default None
+    """
+    daemon_threads = True
+
+    def __init__(self, address: str, root: Optional[str] = None):
+        super().__init__(parse_address(address), _Handler)
+        self.root = os.path.realpath(root) if root else None
+        self.started = time.time()
+        self.validated = 0
+        self._count_lock = threading.Lock()
+
+    @property
+    def loopback(self) -> bool:
+        """True if the daemon listens on a loopback address only"""
+        try:
+            return ipaddress.ip_address(self.server_address[0]).is_loopback
+        except ValueError:
+            return False
+
+    def readable(self, path: str) -> bool:
+        """True if the daemon may read the file at path for a client (see class doc)"""
+        if self.root is None:
+            return self.loopback
+        return os.path.commonpath([self.root, os.path.realpath(path)]) == self.root
+
+    def warm_up(self, ontologies: Iterable[str] = ()):
+        """Loads the schema and the given (URI[@VERSION]) and all bundled ontologies ahead of the first request
+
+        The indices are cached by the URI and version declared in the validated files, so
+        ontologies given without version are loaded under their current data-version, too,
+        and bundled ones under the version they were bundled with.
+        """
+        syntax_check(SCHEMA_VERSION)
+        bundle = active_bundle()
+        preload = [parse_ontology(entry) for entry in ontologies]
+        preload += [(uri, record.get('version', "")) for uri, record in
+                    (bundle.manifest.get('ontologies', {}).items() if bundle else [])]
+        for uri, version in preload:
+            try:
+                index = ontology_cache.load_index(uri, version)
+                if not version and index.data_version:
+                    ontology_cache.load_index(uri, index.data_version)
+            except Exception as e:
+                logging.warning("Could not preload ontology {}: {}".format(uri, e))
+
+    def count(self):
+        with self._count_lock:
+            self.validated += 1
+
+def _flag(value: str) -> bool:
+    return value.lower() in ('1', 'true', 'yes')
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive for clients sending many files
+
+    def _respond(self, status: int, body: Dict[str, Any]):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        if urllib.parse.urlsplit(self.path).path != '/status':
+            return self._respond(404, {'error': "Unknown endpoint, use /status or /validate"})
+        self._respond(200, {'status': 'running', 'pid': os.getpid(),
+                            'uptime': round(time.time() - self.server.started, 3),
+                            'validated': self.server.validated})
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if url.path != '/validate':
+            return self._respond(404, {'error': "Unknown endpoint, use /status or /validate"})
+        query = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            options = {'profile': query.get('profile', 'full'),
+                       'time_budget': float(query.get('time_budget', 0)),
+                       'use_cache': _flag(query.get('use_cache', 'true'))}
+        except ValueError as e:
+            return self._respond(400, {'error': str(e)})
+        if options['profile'] not in PROFILES:
+            return self._respond(400, {'error': "Unknown profile '{}', use one of: {}".format(
+                options['profile'], ', '.join(PROFILES))})
+        if 'path' in query and not self.server.readable(query['path']):
+            return self._respond(403, {'error': "Reading files is not allowed {}, send the document as request body".format(
+                "outside of {}".format(self.server.root) if self.server.root else "on a public address")})
+        try:
+            if 'path' in query:
+                _, proto_response = validate_path(query['path'], streaming=_flag(query.get('streaming', 'false')),
+                                                  **options)
+            else:
+                proto_response = validate(body.decode('utf-8-sig'), **options)
+        except Exception as e:
+            logging.exception("Validation failed")
+            return self._respond(500, {'error': str(e)})
+        self.server.count()
+        self._respond(200, proto_response)
+
+    def log_message(self, format, *args):
+        logging.debug("%s - %s", self.address_string(), format % args)
+
+@click.version_option('v1')
+@click.command(context_settings=CONTEXT_SETTINGS,
+               short_help='mzqc-validator-daemon keeps a validator with warm caches running.')
+@click.option('-a', '--address', default=DEFAULT_DAEMON_ADDRESS, show_default=True,
+              help="[host:]port to listen on.")
+@click.option('-b', '--bundle', type=click.Path(exists=True, dir_okay=False), default=None,
+              help="Offline resource bundle (see mzqc-bundle) to take schema and ontologies from.")
+@click.option('-o', '--ontology', multiple=True,
+              help="URI[@VERSION] of an ontology to load on start, the version as declared in the mzQC files, "
+                   "repeat for several (bundled ontologies are always loaded).")
+@click.option('-r', '--root', type=click.Path(exists=True, file_okay=False), default=None,
+              help="Directory of the files the daemon may read for clients (by default any file, on a loopback address only).")
+def mzqcvalidatordaemon(address, bundle, ontology, root):
+    """
+    Runs a local validator daemon, which keeps the schema and vocabularies loaded between
+    validations. Send files with `mzqc-validator --daemon ADDRESS FILES` (or set
+    MZQC_VALIDATOR_DAEMON), or POST them to http://ADDRESS/validate, e.g. with curl.
+    Files are read for clients only below --root, or if listening on a loopback address.
+    Stop it with Ctrl-C or SIGTERM.
+    """
+    if bundle:
+        try:
+            use_bundle(bundle)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--bundle')
+    try:
+        server = ValidatorDaemon(address, root)
+    except (OSError, ValueError) as e:
+        raise click.ClickException("Can not listen on {}: {}".format(address, e))
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    try:
+        server.warm_up(ontology)
+    except Exception as e:
+        click.echo("Could not preload the schema: {}".format(e), err=True)
+    click.echo("Validator daemon listening on {}:{}".format(*server.server_address), err=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    mzqcvalidatordaemon()
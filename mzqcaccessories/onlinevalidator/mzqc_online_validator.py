@@ -1,100 +1,799 @@
 import os
 import json
+import time
+import logging
+import threading
+import uuid
+import zlib
+import hashlib
+import bisect
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 from jsonschema import ValidationError
 from flask import Flask
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_restful import Resource, Api
 from flask_cors import CORS
 
 from mzqc.MZQCFile import MzQcFile as mzqc_file
 from mzqc.MZQCFile import JsonSerialisable as mzqc_io
-from mzqc.SemanticCheck import SemanticCheck
-from mzqc.SyntaxCheck import SyntaxCheck
+from mzqc.SemanticCheck import SemanticCheck, PROFILES, resolve_checks
+from mzqc.SyntaxCheck import SyntaxCheck, schema_fetcher
+from mzqc.StreamReader import MzQcStreamReader
+from mzqc.HttpFetcher import http_fetcher
+from mzqc import ResourceCache
+from mzqc.ResourceCache import result_cache, ontology_cache, active_bundle
+
+SCHEMA_VERSION = "main"
+DEFAULT_REFRESH_INTERVAL = 300  # seconds between background refreshes of schema and vocabularies
+RECENT_VOCABULARIES = 16  # requested vocabularies kept refreshed besides the preloaded ones
+RECENT_IDLE = 3600  # seconds after its last request a vocabulary is no longer refreshed
+DEFAULT_JOB_WORKERS = 2
+DEFAULT_JOB_LIMIT = 16  # jobs queued or running per process before new ones are refused
+DEFAULT_JOB_TTL = 600  # seconds the result of a finished job is kept
+DEFAULT_MAX_UPLOAD_MB = 100  # size limit of uploads, also after decompression
+UPLOAD_CHUNK_SIZE = 1 << 16
+UPLOAD_SPOOL_SIZE = 1 << 20  # bytes of an upload kept in memory, more is spooled to disk
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return type(default)(os.getenv(name, default))
+    except ValueError:
+        logging.warning("Ignoring invalid {} '{}'".format(name, os.getenv(name)))
+        return default
+
+MAX_UPLOAD_SIZE = int(_env_number('MAX_UPLOAD_MB', float(DEFAULT_MAX_UPLOAD_MB)) * (1 << 20))
 
 app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_SIZE  # larger requests are refused before reading (413)
 api = Api(app)
 CORS(app)
 
+# name: (type, help) of the metrics reported at /metrics, all prefixed with mzqc_validator_
+METRICS = {
+    'requests_total': ('counter', "Requests handled, by endpoint, method, and status"),
+    'request_duration_seconds': ('histogram', "Request latency, by endpoint"),
+    'stage_duration_seconds': ('histogram', "Latency of the validation stages (body parse, from_json, "
+                               "schema validation, ontology load, semantic check (by check), serialization)"),
+    'cache_hits_total': ('counter', "Cache hits, by cache (result, ontology, document)"),
+    'cache_misses_total': ('counter', "Cache misses, by cache (result, ontology, document)"),
+    'jobs_pending': ('gauge', "Validation jobs queued or running"),
+    'jobs_limit': ('gauge', "Validation jobs queued or running at most"),
+}
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in labels.values())
+    return '{' + ','.join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + '}'
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metrics(object):
+    """
+    Metrics Counters and latency histograms of this process, in the Prometheus text format
+
+    Metrics are identified by their name (see METRICS) and labels. As with any in-process
+    registry, each gunicorn worker reports its own numbers, scrape the workers individually
+    or run a single worker process (with threads).
+
+    Parameters
+    ----------
+    prefix : str, optional
+        prepended to the metric names, by default 'mzqc_validator'
+    buckets : Tuple[float, ...], optional
+        upper bounds (seconds) of the histogram buckets, by default LATENCY_BUCKETS
+    """
+    def __init__(self, prefix: str='mzqc_validator', buckets: Tuple[float, ...]=LATENCY_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(sorted(buckets))
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = dict()
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]] = dict()
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float=1, **labels):
+        """Increments a counter"""
+        key = (name, tuple(labels.items()))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Records a latency in a histogram"""
+        key = (name, tuple(labels.items()))
+        with self._lock:
+            # per bucket (non-cumulative, the last one is +Inf), then sum and count
+            histogram = self._histograms.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0, 0])
+            histogram[bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+
+    @contextmanager
+    def timed(self, name: str, **labels) -> Iterator[None]:
+        """Records the time spent in the block in a histogram, also if it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self, gauges: Iterable[Tuple[str, Dict[str, str], float]]=()) -> str:
+        """Returns the metrics, and the given (name, labels, value) of counters or gauges read out now"""
+        with self._lock:
+            samples: Dict[str, List[str]] = dict()
+            for (name, labels), value in self._counters.items():
+                samples.setdefault(name, []).append(f"{self.prefix}_{name}{_labels(dict(labels))} {_number(value)}")
+            for name, labels, value in gauges:
+                samples.setdefault(name, []).append(f"{self.prefix}_{name}{_labels(labels)} {_number(value)}")
+            for (name, labels), histogram in self._histograms.items():
+                lines = samples.setdefault(name, [])
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), histogram):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{self.prefix}_{name}_bucket{_labels(dict(labels, le=le))} {cumulative}")
+                lines.append(f"{self.prefix}_{name}_sum{_labels(dict(labels))} {_number(histogram[-2])}")
+                lines.append(f"{self.prefix}_{name}_count{_labels(dict(labels))} {histogram[-1]}")
+        text = list()
+        for name, (kind, help_text) in METRICS.items():
+            if name in samples:
+                text += [f"# HELP {self.prefix}_{name} {help_text}", f"# TYPE {self.prefix}_{name} {kind}"]
+                text += samples.pop(name)
+        for name, lines in samples.items():
+            text += [f"# TYPE {self.prefix}_{name} untyped"] + lines
+        return '\n'.join(text) + '\n'
+
+metrics = Metrics()
+
+@app.before_request
+def _start_timer():
+    g.started = time.perf_counter()
+
+@app.after_request
+def _count_request(response):
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unknown'
+    metrics.inc('requests_total', endpoint=endpoint, method=request.method, status=str(response.status_code))
+    if 'started' in g:
+        metrics.observe('request_duration_seconds', time.perf_counter() - g.started, endpoint=endpoint)
+    return response
+
+def _record_semantic_timings(sem_val: SemanticCheck):
+    for check, seconds in sem_val.timings.items():
+        if check == 'ontology load errors':
+            metrics.observe('stage_duration_seconds', seconds, stage='ontology_load')
+        else:
+            metrics.observe('stage_duration_seconds', seconds, stage='semantic_check', check=check)
+
 class Status(Resource):
     def get(self):
         try:
-            return {'status': 'API is running', 'endpoints': ['status', 'documentation', 'validator']}
+            return {'status': 'API is running', 'endpoints': ['status', 'documentation', 'validator', 'jobs', 'metrics']}
         except:
             return {'status': 'API fetch was unsuccessful'}
 
-class Documentation(Resource):
-    def get(self):
-        api_doc_string = """
+def _documentation() -> Dict[str, Any]:
+    api_doc_string = """
         This is the response to the API call for `documentation`. The API call for `status` will 
         be responded with a JSON object summarising the API `status` and list of `endpoints`. The 
         API call for `validator` with a POST of a mzqc JSON object responds with a JSON object, 
         nested for each validation mode: 
         `semantic validation` and `schema validation`. For each mode, the value will be a list of 
         validation items found to not (completely) correspond to the standard format.
+        The optional form field `profile` selects the semantic checks performed, one of: 
+        """ + ', '.join(f"`{k}` ({', '.join(v)})" for k,v in PROFILES.items()) + """.
         """
 
-        semantic_doc_string = """
+    semantic_doc_string = """
         The value to the 'semantic validation' key is an array of checks performed 
         on the deserialised mzQC object according to the latest specification. 
         The checks are the following:
         """
-        doc = SemanticCheck(mzqc_file(), file_path="")
-        doc._document_collected_issues()
-        semantic_doc_string = '\n'.join([semantic_doc_string]+[f"        * '{k}':\n"+
-                                         '\n'.join([f"            {i._to_string()}" for i in v]) for 
-                                         k,v in doc.items()])
+    doc = SemanticCheck(mzqc_file(), file_path="")
+    doc._document_collected_issues()
+    semantic_doc_string = '\n'.join([semantic_doc_string]+[f"        * '{k}':\n"+
+                                     '\n'.join([f"            {i._to_string()}" for i in v]) for 
+                                     k,v in doc.items()])
 
-        syntactic_doc_string = """
+    syntactic_doc_string = """
         The value to the 'schema validation' key is the parsed result to the JSONschema 
         validation of given file, using the current schema (unless stated otherwise).
         """
-        
-        return {'documentation': {'schema validation': syntactic_doc_string, 
-                                  'semantic validation': semantic_doc_string, 
-                                  'API doc': api_doc_string}}
+    
+    return {'documentation': {'schema validation': syntactic_doc_string, 
+                              'semantic validation': semantic_doc_string, 
+                              'API doc': api_doc_string}}
 
-class Validator(Resource):
-    def post(self):
-        default_unknown = jsonify({"general": "No mzQC structure detectable."})
-        inpu = request.form.get('validator_input', None)
-        try:
+def _env_ontologies() -> Tuple[Tuple[str, str], ...]:
+    # PRELOAD_ONTOLOGIES: whitespace separated URIs, each optionally with its declared version as URI@VERSION
+    preload = list()
+    for entry in os.getenv('PRELOAD_ONTOLOGIES', '').split():
+        uri, sep, version = entry.rpartition('@')
+        preload.append((uri, version) if sep and '/' not in version else (entry, ""))
+    return tuple(preload)
+
+def _env_refresh_interval() -> float:
+    try:
+        return float(os.getenv('REFRESH_INTERVAL', DEFAULT_REFRESH_INTERVAL))
+    except ValueError:
+        logging.warning("Ignoring invalid REFRESH_INTERVAL '{}'".format(os.getenv('REFRESH_INTERVAL')))
+        return DEFAULT_REFRESH_INTERVAL
+
+class WarmResources(object):
+    """
+    WarmResources The validation resources kept ready in each worker process
+
+    Holds the compiled schema (a SyntaxCheck), the documentation response, and keeps the
+    vocabulary indices of the preloaded (URI, version) pairs, the bundled ones, and the few most
+    recently requested ones (up to RECENT_VOCABULARIES, each until RECENT_IDLE seconds after its
+    last request) in the ontology cache. `warm_up` loads them once, e.g. in the gunicorn master
+    with `--preload` (see wsgi.py), so forked workers start warm. Each process then refreshes
+    them in a background thread every `refresh_interval` seconds: the schema is revalidated with
+    the server (a 304 if unchanged) and expired vocabularies are reloaded there, so requests
+    never wait for a download. A failed refresh keeps the previous resources. The schema's
+    digest and the vocabularies' data-versions, which key the cached results, are taken at
+    each refresh too (see `result_key`), so looking up a result does not revalidate them.
+
+    Vocabularies are cached by the (URI, version) declared in the validated files, so preloaded 
+    URIs without a version are kept under their current data-version, and bundled ones under 
+    the version they were bundled with.
+
+    Parameters
+    ----------
+    schema_version : str, optional
+        the schema version (branch or tag) to validate against, by default SCHEMA_VERSION
+    ontologies : Iterable[Tuple[str, str]], optional
+        (URI, version) pairs to preload, by default those in the env var PRELOAD_ONTOLOGIES
+    refresh_interval : float, optional
+        seconds between refreshes, by default the env var REFRESH_INTERVAL or 300, 0 disables
+    """
+    def __init__(self, schema_version: str=SCHEMA_VERSION, ontologies: Optional[Iterable[Tuple[str, str]]]=None, 
+                 refresh_interval: Optional[float]=None):
+        self.schema_version = schema_version
+        self.refresh_interval = _env_refresh_interval() if refresh_interval is None else refresh_interval
+        self.vocabularies: Set[Tuple[str, str]] = set(_env_ontologies() if ontologies is None else ontologies)
+        self.recent: OrderedDict = OrderedDict()  # (URI, version): time of the last request
+        self.refreshed: Optional[float] = None
+        self.data_versions: Dict[Tuple[str, str], str] = dict()
+        self._schema_digest: Optional[str] = None
+        self._syntax_check: Optional[SyntaxCheck] = None
+        self._documentation: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._stopped = threading.Event()
+
+    def _load_vocabularies(self):
+        bundle = active_bundle()
+        bundled = {(uri, record.get('version', "")) for uri, record in
+                   (bundle.manifest.get('ontologies', {}).items() if bundle else [])}
+        with self._lock:
+            idle = time.time() - RECENT_IDLE
+            for key in [k for k, used in self.recent.items() if used < idle]:
+                del self.recent[key]
+            vocabularies = set(self.vocabularies) | bundled | set(self.recent)
+        data_versions = dict()
+        for uri, version in vocabularies:
+            try:
+                index = ontology_cache.load_index(uri, version)
+                data_versions[(uri, version)] = index.data_version
+                if not version and index.data_version:
+                    ontology_cache.load_index(uri, index.data_version)  # as declared in files
+                    data_versions[(uri, index.data_version)] = index.data_version
+            except Exception as e:
+                logging.warning("Could not load ontology {}: {}".format(uri, e))
+        self.data_versions = data_versions
+
+    def warm_up(self):
+        """(Re-)loads schema and vocabularies, and builds the documentation if not done yet"""
+        syntax_check = SyntaxCheck(self.schema_version)  # revalidated through the document cache
+        self._schema_digest = ResourceCache.document_cache.digest(syntax_check.schema_url)  # just loaded
+        self._syntax_check = syntax_check
+        if self._documentation is None:
+            self._documentation = _documentation()
+        self._load_vocabularies()
+        self.refreshed = time.time()
+
+    def _refresh(self):
+        while not self._stopped.wait(self.refresh_interval):
+            try:
+                self.warm_up()
+            except Exception as e:
+                logging.warning("Refreshing the validation resources failed, keeping the previous: {}".format(e))
+
+    def _ensure_process(self):
+        # threads and connections do not survive a fork, so each worker starts its own on first use
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None or self._syntax_check is not None:
+                http_fetcher.close()  # pooled connections inherited from the preloading parent
+                schema_fetcher.close()
+            self._pid = os.getpid()
+            if self.refresh_interval > 0:
+                threading.Thread(target=self._refresh, name='mzqc-resource-refresh', daemon=True).start()
+
+    def stop(self):
+        """Stops refreshing in this process"""
+        self._stopped.set()
+
+    @property
+    def syntax_check(self) -> SyntaxCheck:
+        """The SyntaxCheck with the compiled schema, loaded on first use if not warmed up"""
+        self._ensure_process()
+        if self._syntax_check is None:
+            self._syntax_check = SyntaxCheck(self.schema_version)
+        return self._syntax_check
+
+    def result_key(self, document: Union[str, bytes, Dict[str, Any]], vocabularies: Iterable[Tuple[str, str]],
+                   **params) -> str:
+        """The result cache key of a validation (see `ValidationResultCache.key`), with the schema 
+        digest and the vocabularies' data-versions as of the last refresh"""
+        self._ensure_process()
+        if self._schema_digest is None:
+            self._schema_digest = ResourceCache.document_cache.digest(self.syntax_check.schema_url)
+        return result_cache.key(document, self.schema_version, vocabularies, schema_digest=self._schema_digest,
+                                data_versions=self.data_versions, **params)
+
+    @property
+    def documentation(self) -> Dict[str, Any]:
+        """The response of the documentation endpoint"""
+        self._ensure_process()
+        if self._documentation is None:
+            self._documentation = _documentation()
+        return self._documentation
+
+    def track(self, vocabularies: Iterable[Tuple[str, str]]):
+        """Keeps the given requested (URI, version) pairs refreshed while they are among the 
+        RECENT_VOCABULARIES most recently requested and requested within RECENT_IDLE seconds"""
+        self._ensure_process()
+        now = time.time()
+        with self._lock:
+            for key in vocabularies:
+                if key in self.vocabularies:
+                    continue
+                self.recent[key] = now
+                self.recent.move_to_end(key)
+            while len(self.recent) > RECENT_VOCABULARIES:
+                self.recent.popitem(last=False)
+
+resources = WarmResources()
+
+class Documentation(Resource):
+    def get(self):
+        return resources.documentation
+
+DEFAULT_UNKNOWN = {"general": "No mzQC structure detectable."}
+
+class UploadError(Exception):
+    """An upload refused before validation, with the HTTP status to respond"""
+    def __init__(self, message: str, status: int=400):
+        super().__init__(message)
+        self.status = status
+
+class Upload(object):
+    """
+    Upload An uploaded document, decompressed and spooled for streaming validation
+
+    Parameters
+    ----------
+    file : IO[bytes]
+        the seekable (spooled) document
+    digest : str
+        sha256 hex digest of the document
+    size : int
+        size of the document in bytes
+    """
+    def __init__(self, file: IO[bytes], digest: str, size: int):
+        self.file = file
+        self.digest = digest
+        self.size = size
+
+def spool_upload(stream: IO[bytes], gzipped: Optional[bool]=None, max_size: int=MAX_UPLOAD_SIZE) -> Upload:
+    """Copies an upload stream into a spooled temporary file, chunk by chunk
+
+    Gzip compressed streams (as indicated, or else detected by their magic number) are
+    decompressed. The upload is refused as soon as either its compressed or decompressed
+    size exceeds `max_size`, or if it does not start like a JSON object.
+
+    Parameters
+    ----------
+    stream : IO[bytes]
+        the request body or uploaded file
+    gzipped : bool, optional
+        if the stream is gzip compressed, by default None to detect it
+    max_size : int, optional
+        bytes allowed, by default MAX_UPLOAD_SIZE
+
+    Returns
+    -------
+    Upload
+        the spooled document, rewound
+
+    Raises
+    ------
+    UploadError
+        with status 413 if too large, 400 if not JSON or not decompressible
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE)
+    digest = hashlib.sha256()
+    decompressor = None
+    read = size = 0
+    try:
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            read += len(chunk)
+            if read > max_size:
+                raise UploadError(f"Upload exceeds the maximum size of {max_size} bytes.", 413)
+            if gzipped is None:
+                gzipped = chunk[:2] == b'\x1f\x8b'
+            if gzipped:
+                decompressor = decompressor or zlib.decompressobj(16 + zlib.MAX_WBITS)
+                chunk = decompressor.decompress(chunk, max_size - size + 1)
+                if decompressor.unconsumed_tail:
+                    raise UploadError(f"Upload exceeds the maximum size of {max_size} bytes (decompressed).", 413)
+            if size == 0 and chunk.lstrip(b' \t\r\n\xef\xbb\xbf')[:1] not in (b'', b'{'):
+                raise UploadError(DEFAULT_UNKNOWN['general'])
+            size += len(chunk)
+            if size > max_size:
+                raise UploadError(f"Upload exceeds the maximum size of {max_size} bytes (decompressed).", 413)
+            digest.update(chunk)
+            spool.write(chunk)
+        if decompressor is not None and not decompressor.eof:
+            raise UploadError("Upload is not a complete gzip stream.")
+    except zlib.error as e:
+        spool.close()
+        raise UploadError(f"Upload is not a valid gzip stream: {e}.")
+    except UploadError:
+        spool.close()
+        raise
+    if size == 0:
+        spool.close()
+        raise UploadError(DEFAULT_UNKNOWN['general'])
+    spool.seek(0)
+    return Upload(spool, digest.hexdigest(), size)
+
+def read_upload() -> Union[None, str, Upload]:
+    """Takes the document of the current request
+
+    Accepted are a file upload or form field `validator_input` (the profile is taken from the
+    form field `profile`), or a (gzip compressed) JSON request body (the profile is taken from
+    the query parameter `profile`). Files and bodies are read as stream into an Upload, the
+    form field is taken as string.
+
+    Raises
+    ------
+    UploadError
+        if the request body is refused (see `spool_upload`)
+    """
+    if request.content_length is not None and request.content_length > MAX_UPLOAD_SIZE:
+        raise UploadError(f"Upload exceeds the maximum size of {MAX_UPLOAD_SIZE} bytes.", 413)
+    if request.mimetype in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        upload = request.files.get('validator_input')
+        if upload is not None:
+            return spool_upload(upload.stream)
+        return request.form.get('validator_input', None)
+    gzipped = request.headers.get('Content-Encoding', '').lower() in ('gzip', 'x-gzip') or \
+        request.mimetype in ('application/gzip', 'application/x-gzip') or None
+    return spool_upload(request.stream, gzipped=gzipped)
+
+def _request_profile() -> str:
+    if request.mimetype in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        return request.form.get('profile', 'full')
+    return request.args.get('profile', 'full')
+
+def _validation_parameters() -> Tuple[int, Optional[float]]:
+    me = os.getenv('MAX_ERR', 0)
+    if isinstance(me, str) and me.isnumeric():
+        me = int(me)
+    # one time budget (in seconds) for the semantic and syntax validation together
+    try:
+        tb = float(os.getenv('TIME_BUDGET', 0))
+    except ValueError:
+        tb = 0
+    return me, time.monotonic() + tb if tb > 0 else None
+
+def validate_upload(inpu: Union[None, str, Upload], profile: str='full') -> Dict[str, Any]:
+    """Validates an uploaded mzQC document with the given (known) profile, returns the response object"""
+    if isinstance(inpu, Upload):
+        with inpu.file:
+            return validate_upload_stream(inpu, profile)
+    try:
+        with metrics.timed('stage_duration_seconds', stage='from_json'):
             target = mzqc_io.from_json(inpu)
+    except Exception as e:
+        return DEFAULT_UNKNOWN
+
+    if type(target) != mzqc_file:
+        return DEFAULT_UNKNOWN
+    else:
+        removed_items = list(filter(lambda x: not x.uri.startswith('http'), target.controlledVocabularies))
+        target.controlledVocabularies = list(filter(lambda x: x.uri.startswith('http'), target.controlledVocabularies))
+        me, deadline = _validation_parameters()
+
+        # resubmissions of unchanged files are answered from the result cache
+        cache_key = resources.result_key(inpu, [(cv.uri, cv.version) for cv in target.controlledVocabularies
+                                                if 'ontology load errors' in resolve_checks(profile)],
+                                         validator='online', max_errors=me, profile=profile)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        if 'ontology load errors' in resolve_checks(profile):
+            resources.track((cv.uri, cv.version) for cv in target.controlledVocabularies)
+
+        sem_val = SemanticCheck(mzqc_obj=target, file_path='.')
+        try:
+            sem_val.validate(load_local=False, max_errors=me, profile=profile, deadline=deadline)
+        except ValidationError as e:
+            print(e)
+        _record_semantic_timings(sem_val)
+        proto_response = sem_val.string_export()
+        if removed_items:
+            proto_response.update({"ontology validation": 
+                                   ["invalid ontology URI for "+ str(it.name) for it in removed_items]})
+
+        with metrics.timed('stage_duration_seconds', stage='schema_validation'):
+            valt = mzqc_io.to_json(target)
+            syn_val_res = resources.syntax_check.validate(valt, deadline=deadline)
+        # older versions of the validator report a generic response in an array - return first only
+        if type(syn_val_res.get('schema validation', None)) == list:
+            syn_val_res = {'schema validation': syn_val_res.get('schema validation', None)[0] if syn_val_res.get('schema validation', None) else ''}
+        proto_response.update(syn_val_res)
+
+        # print(json.dumps(proto_response, indent=2, sort_keys=True))            
+        # partial results of validations out of time are not reused
+        if not sem_val._exceeded_time and (deadline is None or time.monotonic() <= deadline):
+            result_cache.put(cache_key, proto_response)
+        return proto_response
+
+class JobQueue(object):
+    """
+    JobQueue Asynchronous validation jobs on a bounded in-process worker pool
+
+    Submitted uploads are validated (see `validate_upload`) by a pool of `workers` threads.
+    At most `limit` jobs can be queued or running, further submissions are refused so
+    clients back off (HTTP 429). The record of a finished job (status and result) is kept
+    for `ttl` seconds after it finished, expired records are dropped on the next access;
+    records of jobs still queued or running are kept however long they take.
+
+    Records are kept in memory, i.e. jobs are polled from the process they were submitted
+    to. With several (gunicorn) worker processes, give a `job_dir` shared by the processes
+    to which the records are written, so any process can answer the polls.
+
+    Parameters
+    ----------
+    workers : int, optional
+        validation threads, by default the env var JOB_WORKERS or 2
+    limit : int, optional
+        jobs queued or running at most, by default the env var JOB_LIMIT or 16
+    ttl : float, optional
+        seconds finished jobs are kept, by default the env var JOB_TTL or 600
+    job_dir : str, optional
+        directory shared by the worker processes, by default the env var JOB_DIR or None
+    """
+    def __init__(self, workers: Optional[int]=None, limit: Optional[int]=None, ttl: Optional[float]=None,
+                 job_dir: Optional[str]=None):
+        self.workers = _env_number('JOB_WORKERS', DEFAULT_JOB_WORKERS) if workers is None else workers
+        self.limit = _env_number('JOB_LIMIT', DEFAULT_JOB_LIMIT) if limit is None else limit
+        self.ttl = _env_number('JOB_TTL', float(DEFAULT_JOB_TTL)) if ttl is None else ttl
+        self.job_dir = os.getenv('JOB_DIR') if job_dir is None else job_dir
+        self.jobs: Dict[str, Dict[str, Any]] = dict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs queued or running in this process"""
+        with self._lock:
+            return sum(1 for job in self.jobs.values() if job['status'] in ('queued', 'running'))
+
+    @property
+    def full(self) -> bool:
+        """True if no more jobs are accepted at the moment"""
+        return self.pending >= self.limit
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # worker threads do not survive a fork, each process starts its own pool
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='mzqc-job')
+            self._pid = os.getpid()
+            self.jobs = {k: v for k, v in self.jobs.items() if v['status'] not in ('queued', 'running')}
+        return self._executor
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir, job_id + '.json')
+
+    def _store(self, job: Dict[str, Any]):
+        with self._lock:
+            self.jobs[job['job']] = job
+        if self.job_dir:
+            os.makedirs(self.job_dir, exist_ok=True)
+            tmp_path = '{}.{}'.format(self._job_path(job['job']), uuid.uuid4().hex)
+            with open(tmp_path, 'w') as f:
+                json.dump(job, f)
+            os.replace(tmp_path, self._job_path(job['job']))
+
+    def _expire(self):
+        now = time.time()
+        with self._lock:
+            expired = [k for k, v in self.jobs.items() if v.get('finished') and now - v['finished'] > self.ttl]
+            for job_id in expired:
+                del self.jobs[job_id]
+        if self.job_dir and os.path.isdir(self.job_dir):
+            for name in os.listdir(self.job_dir):
+                path = os.path.join(self.job_dir, name)
+                try:
+                    # a record is rewritten when its job finishes, so only older files can be expired
+                    if not name.endswith('.json') or now - os.path.getmtime(path) <= self.ttl:
+                        continue
+                    with open(path) as f:
+                        finished = json.load(f).get('finished')
+                    if finished and now - finished > self.ttl:
+                        os.remove(path)
+                except (OSError, ValueError):
+                    pass  # removed by another process meanwhile, or being replaced
+
+    def _run(self, job: Dict[str, Any], inpu: Union[str, Upload], profile: str):
+        self._store(dict(job, status='running', started=time.time()))
+        try:
+            result = validate_upload(inpu, profile)
+            self._store(dict(job, status='done', finished=time.time(), result=result))
         except Exception as e:
-            return default_unknown
+            logging.exception("Validation job {} failed".format(job['job']))
+            self._store(dict(job, status='failed', finished=time.time(), error=str(e)))
 
-        if type(target) != mzqc_file:
-            return default_unknown
-        else:
-            removed_items = list(filter(lambda x: not x.uri.startswith('http'), target.controlledVocabularies))
-            target.controlledVocabularies = list(filter(lambda x: x.uri.startswith('http'), target.controlledVocabularies))
-            me = os.getenv('MAX_ERR', 0)
-            if isinstance(me, str) and me.isnumeric():
-                me = int(me)
-            
-            sem_val = SemanticCheck(mzqc_obj=target, file_path='.')
+    def submit(self, inpu: Union[str, Upload], profile: str='full') -> Optional[Dict[str, Any]]:
+        """Queues the validation of an upload, returns the job record or None if the queue is full"""
+        self._expire()
+        with self._lock:
+            pool = self._pool()
+            if sum(1 for job in self.jobs.values() if job['status'] in ('queued', 'running')) >= self.limit:
+                return None
+            job = {'job': uuid.uuid4().hex, 'status': 'queued', 'profile': profile, 'submitted': time.time()}
+            self.jobs[job['job']] = job
+        self._store(job)
+        pool.submit(self._run, job, inpu, profile)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the record of a job, None if unknown or expired"""
+        self._expire()
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is None and self.job_dir and all(c in '0123456789abcdef' for c in job_id):
             try:
-                sem_val.validate(load_local=False, max_errors=me)
-            except ValidationError as e:
-                print(e)
-            proto_response = sem_val.string_export()
-            if removed_items:
-                proto_response.update({"ontology validation": 
-                                       ["invalid ontology URI for "+ str(it.name) for it in removed_items]})
+                with open(self._job_path(job_id)) as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                return None
+            if job.get('finished') and time.time() - job['finished'] > self.ttl:
+                return None
+        return job
 
-            valt = mzqc_io.to_json(target)
-            syn_val_res = SyntaxCheck().validate(valt)
-            # older versions of the validator report a generic response in an array - return first only
-            if type(syn_val_res.get('schema validation', None)) == list:
-                syn_val_res = {'schema validation': syn_val_res.get('schema validation', None)[0] if syn_val_res.get('schema validation', None) else ''}
-            proto_response.update(syn_val_res)
+jobs = JobQueue()
+
+def validate_upload_stream(upload: Upload, profile: str='full') -> Dict[str, Any]:
+    """Validates a spooled upload one run or set at a time (see MzQcStreamReader), returns the response object"""
+    reader = MzQcStreamReader(upload.file)
+    try:
+        with metrics.timed('stage_duration_seconds', stage='from_json'):
+            header = reader.read_header()
+    except ValueError:
+        return DEFAULT_UNKNOWN
+    controlled_vocabularies = header.get('controlledVocabularies', [])
+    if not isinstance(controlled_vocabularies, list) or \
+            not all(isinstance(cv, dict) for cv in controlled_vocabularies):
+        return DEFAULT_UNKNOWN
+    removed_items = [cv for cv in controlled_vocabularies if not str(cv.get('uri', '')).startswith('http')]
+    vocabularies = [cv for cv in controlled_vocabularies if str(cv.get('uri', '')).startswith('http')]
+    reader.replace['controlledVocabularies'] = vocabularies
+    me, deadline = _validation_parameters()
+
+    # the upload's digest stands in for the document, i.e. reformatted resubmissions are not recognised
+    cache_key = resources.result_key({'sha256': upload.digest},
+                                     [(cv.get('uri'), cv.get('version', '')) for cv in vocabularies
+                                      if 'ontology load errors' in resolve_checks(profile)],
+                                     validator='online', max_errors=me, profile=profile)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    if 'ontology load errors' in resolve_checks(profile):
+        resources.track((cv.get('uri'), cv.get('version', '')) for cv in vocabularies)
+
+    sem_val = SemanticCheck(mzqc_obj=reader, file_path='.')
+    try:
+        sem_val.validate(load_local=False, max_errors=me, profile=profile, deadline=deadline)
+    except ValidationError as e:
+        print(e)
+    _record_semantic_timings(sem_val)
+    if sem_val._invalid_mzqc_obj:
+        return DEFAULT_UNKNOWN
+    proto_response = sem_val.string_export()
+    if removed_items:
+        proto_response.update({"ontology validation": 
+                               ["invalid ontology URI for "+ str(it.get('name', '')) for it in removed_items]})
+    with metrics.timed('stage_duration_seconds', stage='schema_validation'):
+        proto_response.update(resources.syntax_check.validate_stream(reader, deadline=deadline))
 
-            # print(json.dumps(proto_response, indent=2, sort_keys=True))            
+    if not sem_val._exceeded_time and (deadline is None or time.monotonic() <= deadline):
+        result_cache.put(cache_key, proto_response)
+    return proto_response
+
+def _profile_error(profile: str) -> Optional[Dict[str, str]]:
+    if profile not in PROFILES:
+        return {"general": f"Unknown validation profile {profile}, use one of {list(PROFILES)}."}
+    return None
+
+def _read_request() -> Tuple[str, Union[None, str, Upload]]:
+    """Takes the profile and the document (see `read_upload`, not if the profile is unknown) of the current request"""
+    with metrics.timed('stage_duration_seconds', stage='body_parse'):
+        profile = _request_profile()
+        if profile not in PROFILES:
+            return profile, None
+        return profile, read_upload()
+
+class Validator(Resource):
+    def post(self):
+        try:
+            profile, inpu = _read_request()
+        except UploadError as e:
+            return {"general": str(e)}, e.status
+        error = _profile_error(profile)
+        if error:
+            return jsonify(error)
+        proto_response = validate_upload(inpu, profile)
+        with metrics.timed('stage_duration_seconds', stage='serialization'):
             return jsonify(proto_response)
-        return default_unknown
+
+class Jobs(Resource):
+    def post(self):
+        if jobs.full:
+            return ({"general": "Too many validations queued, please retry later."}, 429, {'Retry-After': '10'})
+        try:
+            profile, inpu = _read_request()
+        except UploadError as e:
+            return {"general": str(e)}, e.status
+        error = _profile_error(profile)
+        if error:
+            return error, 400
+        if not inpu:
+            return DEFAULT_UNKNOWN, 400
+        job = jobs.submit(inpu, profile)
+        if job is None:
+            if isinstance(inpu, Upload):
+                inpu.file.close()
+            return ({"general": "Too many validations queued, please retry later."}, 429,
+                    {'Retry-After': '10'})
+        return dict(job, location=f"/jobs/{job['job']}/"), 202, {'Location': f"/jobs/{job['job']}/"}
+
+class Job(Resource):
+    def get(self, job_id):
+        job = jobs.get(job_id)
+        if job is None:
+            return {"general": f"Unknown or expired job {job_id}."}, 404
+        return job
+
+@app.route('/metrics')
+def metrics_endpoint():
+    gauges = [('jobs_pending', {}, jobs.pending), ('jobs_limit', {}, jobs.limit)]
+    for cache, instance in (('result', result_cache), ('ontology', ontology_cache),
+                            ('document', ResourceCache.document_cache)):
+        gauges.append(('cache_hits_total', {'cache': cache}, getattr(instance, 'hits', 0)))
+        gauges.append(('cache_misses_total', {'cache': cache}, getattr(instance, 'misses', 0)))
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
 
 api.add_resource(Status, '/','/status/')
 api.add_resource(Documentation, '/documentation/')
 api.add_resource(Validator, '/validator/')
+api.add_resource(Jobs, '/jobs/')
+api.add_resource(Job, '/jobs/<string:job_id>/')
 
 if __name__ == '__main__':
     app.run()
@@ -1,4 +1,11 @@
-from accessories.onlinevalidator.mzqc_online_validator import app
+from mzqc_online_validator import app, resources
+
+# load schema, vocabularies, and documentation before serving; with `gunicorn --preload` this
+# happens once in the master and the forked workers start warm (each then refreshes in its own thread)
+try:
+    resources.warm_up()
+except Exception as e:
+    print("Could not preload the validation resources, loading on first request: {}".format(e))
 
 if __name__ == '__main__':
-    app.run()
\ No newline at end of file
+    app.run()
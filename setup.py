@@ -33,10 +33,13 @@ setup(
             'mzqc-fileinfo=mzqcaccessories.filehandling.mzqc_fileinfo:mzqcfileinfo',
             'mzqc-filemerger=mzqcaccessories.filehandling.mzqc_filemerger:mzqcfilemerger',
             'mzqc-fixdescriptions=mzqcaccessories.filehandling.mzqc_fixdescriptions:mzqcfixdescriptions',
+            'mzqc-split=mzqcaccessories.filehandling.mzqc_split:mzqcsplit',
             # 'mzQC-online-validator=mzqconlinevalidator.mzqc_online_validator:app.run',
             # Note: onlinevalidator has extra dependencies not covered by this setup!
             #       See accessories/onlinevalidator/requirements.txt!
-            'mzqc-validator=mzqcaccessories.offlinevalidator.mzqc_offline_validator:start'
+            'mzqc-validator=mzqcaccessories.offlinevalidator.mzqc_offline_validator:start',
+            'mzqc-bundle=mzqcaccessories.offlinevalidator.mzqc_bundle:mzqcbundle',
+            'mzqc-validator-daemon=mzqcaccessories.offlinevalidator.mzqc_validator_daemon:mzqcvalidatordaemon'
         ],
     }
 )
@@ -1,3 +1,4 @@
+import json
 import pytest
 
 def pytest_addoption(parser):
@@ -16,3 +17,123 @@ def pytest_collection_modifyitems(config, items):
     for item in items:
         if "check_versioning" in item.keywords:
             item.add_marker(skip_versioning)
+
+@pytest.fixture
+def http_stand_in():
+    """A local HTTP server standing in for remote schema and ontology hosts
+
+    Serves the documents of its `documents` dict (path to bytes) with ETag and Last-Modified
+    headers and answers conditional requests with 304. `fail` holds the number of requests
+    to answer with 503 before serving, `log` records (path, status, client port) per request.
+    """
+    import hashlib
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class StandIn(ThreadingHTTPServer):
+        daemon_threads = True
+        def __init__(self):
+            super().__init__(('127.0.0.1', 0), Handler)
+            self.documents = dict()
+            self.fail = 0
+            self.log = list()
+
+        def url(self, path):
+            return 'http://127.0.0.1:{}{}'.format(self.server_address[1], path)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive
+
+        def do_GET(self):
+            server = self.server
+            if server.fail > 0:
+                server.fail -= 1
+                return self._respond(503)
+            if self.path not in server.documents:
+                return self._respond(404)
+            content = server.documents[self.path]
+            etag = '"{}"'.format(hashlib.sha1(content).hexdigest())
+            headers = {'ETag': etag, 'Last-Modified': 'Mon, 19 Oct 2026 00:00:00 GMT'}
+            if self.headers.get('If-None-Match') == etag:
+                return self._respond(304, headers=headers)
+            self._respond(200, content, headers)
+
+        def _respond(self, status, content=b'', headers=None):
+            self.server.log.append((self.path, status, self.client_address[1]))
+            self.send_response(status)
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = StandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+PSI_MS = "https://github.com/HUPO-PSI/psi-ms-CV/releases/download/v4.1.186/psi-ms.obo"
+
+@pytest.fixture
+def offline_resources(tmp_path, monkeypatch):
+    """Serves the schema and PSI-MS (the local test vocabulary) from a resource bundle
+
+    The process-wide ontology and document caches are replaced with fresh ones in tmp_path
+    for the test, the bundle (its path is yielded) is in use until the test ends.
+    """
+    from mzqc import ResourceCache
+    from mzqc.OboLoader import load_vocabulary
+    from mzqc.ResourceBundle import ResourceBundle
+    from mzqc.ResourceCache import OntologyCache, DocumentCache, use_bundle
+    from mzqc.SyntaxCheck import SCHEMA_URL
+
+    path = str(tmp_path / "resources.zip")
+    with open("tests/schema.json", 'r') as f:
+        schema = f.read()
+    with ResourceBundle.create(path, pymzqc="test") as writer:
+        writer.add_document(SCHEMA_URL.format(branch="main"), schema)
+        writer.add_ontology(PSI_MS, load_vocabulary("tests/examples/local-qc-test.obo"), version="4.1.186")
+    monkeypatch.setattr(ResourceCache, 'ontology_cache', OntologyCache(cache_dir=str(tmp_path / "ontologies")))
+    monkeypatch.setattr(ResourceCache, 'document_cache', DocumentCache(cache_dir=str(tmp_path / "documents")))
+    use_bundle(path)
+    yield path
+    use_bundle(None)
+
+class MzQcBuilder(object):
+    """Builds plain JSON mzQC elements and documents for the file handling tests"""
+    controlled_vocabularies = [{'name': "PSI-MS", 'uri': "https://example.org/psi-ms.obo", 'version': "4.1.186"}]
+
+    def input_file(self, name, location=None, file_format=("MS:1000584", "mzML format")):
+        return {'name': name, 'location': location or "file:///data/" + name,
+                'fileFormat': {'accession': file_format[0], 'name': file_format[1]}}
+
+    def software(self, version="1.0", name="QC tool"):
+        return {'accession': "MS:1000752", 'name': name, 'version': version, 'uri': "https://example.org/tool"}
+
+    def quality(self, label, *accessions, input_files=None, analysis_software=None):
+        """a run or set with a metric (valued 1) per accession, by default of the input file and software named as the label and 1.0"""
+        return {'metadata': {'label': label,
+                             'inputFiles': [self.input_file(label)] if input_files is None else input_files,
+                             'analysisSoftware': [self.software()] if analysis_software is None else analysis_software},
+                'qualityMetrics': [{'accession': a, 'name': a, 'value': 1} for a in accessions]}
+
+    def write(self, path, runs, sets=(), controlled_vocabularies=None, **members):
+        """writes an mzQC file of the runs and sets (and other members of the mzQC object), returns its path"""
+        document = {'mzQC': dict({'version': "1.0.0", 'creationDate': "2020-12-01T11:56:34"}, **members,
+                                 runQualities=list(runs),
+                                 controlledVocabularies=list(controlled_vocabularies or self.controlled_vocabularies))}
+        if sets:
+            document['mzQC']['setQualities'] = list(sets)
+        with open(path, 'w') as f:
+            json.dump(document, f)
+        return str(path)
+
+@pytest.fixture
+def mzqc_builder():
+    """See MzQcBuilder"""
+    return MzQcBuilder()
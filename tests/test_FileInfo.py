@@ -0,0 +1,79 @@
+__author__ = 'walzer'
+import pytest  # Eeeeeeverything needs to be prefixed with test in order to be picked up by pytest, i.e. TestClass() and test_function()
+import os
+import json
+import shutil
+import click
+from click.testing import CliRunner
+from mzqcaccessories.filehandling import mzqc_fileinfo as fileinfo
+
+"""
+    mzQC fileinfo tests with pymzqc
+"""
+
+EXAMPLE = "tests/examples/individual-runs.mzQC"
+
+def archive(tmp_path):
+    """A directory of two copies of the example (one nested), an unreadable file, and a file of another type"""
+    root = tmp_path / "archive"
+    (root / "nested").mkdir(parents=True)
+    shutil.copy(EXAMPLE, str(root / "one.mzQC"))
+    shutil.copy(EXAMPLE, str(root / "nested" / "two.mzqc"))
+    (root / "broken.mzQC").write_text("{\"mzQC\": {\"version\": ")
+    (root / "notes.txt").write_text("not mzQC")
+    return str(root)
+
+def test_summarize():
+    summary = fileinfo.summarize(EXAMPLE)
+    assert(summary['version'] == "1.0.0" and summary['sets'] == 0)
+    assert(len(summary['runs']) == 1 and len(summary['metrics']) == 5)
+    run = summary['runs'][0]
+    assert(run['inputFiles'][0]['fileFormat'] == "mzML format")
+    assert(run['completionTime'] == "2012-02-03 11:00:41")
+    assert(["MS:4000059", "number of MS1 spectra"] in run['metrics'])
+
+def test_summarize_path(tmp_path):
+    summary = fileinfo.summarize(EXAMPLE)
+    compact = fileinfo.summarize_path(EXAMPLE)
+    assert(compact == {'file': EXAMPLE, 'version': "1.0.0", 'creationDate': summary['creationDate'],
+                       'runs': 1, 'sets': 0, 'metrics': summary['metrics'],
+                       'instruments': [r['instrument'] for r in summary['runs'] if r['instrument']]})
+    # JSON, but not mzQC as expected: reported, not raised (which would abort a pool)
+    malformed = tmp_path / "malformed.mzQC"
+    malformed.write_text(json.dumps({'mzQC': {'version': "1.0.0", 'runQualities': [{'qualityMetrics': 5}]}}))
+    assert('error' in fileinfo.summarize_path(str(malformed)))
+    total = fileinfo.aggregate(fileinfo.summarize_paths([EXAMPLE, str(malformed), EXAMPLE], workers=2))
+    assert((total['files'], total['unreadable'], total['runs']) == (3, 1, 2))
+
+def test_find_inputs(tmp_path):
+    root = archive(tmp_path)
+    found = [os.path.relpath(p, root) for p in fileinfo.find_inputs([root])]
+    assert(found == ["broken.mzQC", "one.mzQC", os.path.join("nested", "two.mzqc")])
+    assert(list(fileinfo.find_inputs([os.path.join(root, "**", "*.mzq*")])) ==
+           [os.path.join(root, "nested", "two.mzqc")])
+    with pytest.raises(click.BadParameter):
+        list(fileinfo.find_inputs([os.path.join(root, "nothing*")]))
+
+def test_aggregate(tmp_path):
+    root = archive(tmp_path)
+    total = fileinfo.aggregate(fileinfo.summarize_paths(list(fileinfo.find_inputs([root])), workers=1))
+    assert((total['files'], total['unreadable'], total['runs'], total['sets']) == (3, 1, 2, 0))
+    assert(len(total['metrics']) == 5 and set(total['metrics'].values()) == {2})
+
+def test_mzqcfileinfo_json(tmp_path):
+    result = CliRunner().invoke(fileinfo.mzqcfileinfo, [EXAMPLE, '--json'])
+    assert(result.exit_code == 0)
+    assert(json.loads(result.output) == fileinfo.summarize(EXAMPLE))
+
+    root = archive(tmp_path)
+    result = CliRunner().invoke(fileinfo.mzqcfileinfo, [root, '--json', '-w', '2'])
+    assert(result.exit_code == 0)
+    output = json.loads(result.output)
+    assert([os.path.basename(f['file']) for f in output['files']] == ["broken.mzQC", "one.mzQC", "two.mzqc"])
+    assert('error' in output['files'][0])
+    assert(output['aggregate']['files'] == 3 and output['aggregate']['runs'] == 2)
+
+    # a single file in aggregate, and as lines
+    result = CliRunner().invoke(fileinfo.mzqcfileinfo, [EXAMPLE, '-a', '-w', '1'])
+    assert(result.exit_code == 0)
+    assert(result.output.startswith(EXAMPLE + "\t1 runs\t0 sets\t5 metrics"))
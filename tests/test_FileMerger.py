@@ -0,0 +1,104 @@
+__author__ = 'walzer'
+import pytest  # Eeeeeeverything needs to be prefixed with test in order to be picked up by pytest, i.e. TestClass() and test_function()
+import json
+from click.testing import CliRunner
+from mzqcaccessories.filehandling import mzqc_filemerger as merger
+
+"""
+    mzQC file merger tests with pymzqc
+"""
+
+def test_match_and_merge_sets_files(mzqc_builder):
+    b = mzqc_builder
+    one, two, three = b.input_file("a"), b.input_file("b"), b.input_file("c")
+    sets = [b.quality("one", "MS:4000059", input_files=[one, two]),
+            b.quality("other", "MS:4000059", input_files=[one, three],
+                      analysis_software=[b.software("1.0", name="QC tool, renamed")]),
+            b.quality("two", "MS:4000060", input_files=[two, one],
+                      analysis_software=[b.software("1.0"), b.software("2.0")])]
+    merged = merger.match_and_merge_sets_files([(merger.set_key(s, 'location'), s) for s in sets])
+    # same input files in any order are the same sets, in order of first occurrence
+    assert([s['metadata']['label'] for s in merged] == ["one+two", "other"])
+    assert([m['accession'] for m in merged[0]['qualityMetrics']] == ["MS:4000059", "MS:4000060"])
+    assert(len(merged[0]['metadata']['inputFiles']) == 2)
+    # the software is deduplicated by accession and version across all sets, as it occurs first
+    assert([sw['version'] for sw in merged[0]['metadata']['analysisSoftware']] == ["1.0", "2.0"])
+    assert(merged[1]['metadata']['analysisSoftware'] == [b.software("1.0")])
+
+    by_metadata = merger.match_and_merge_sets_files([(merger.set_key(s, 'metadata'), s) for s in sets])
+    assert(len(by_metadata) == 3)
+
+def test_merge_shared_software(mzqc_builder):
+    b = mzqc_builder
+    shared = dict()
+    run = merger.merge_into_single_run([b.quality("run", input_files=[b.input_file("a")])], shared)
+    sets = merger.match_and_merge_sets_files(
+        [("key", b.quality("set", input_files=[b.input_file("a")],
+                           analysis_software=[b.software("1.0", name="QC tool, renamed")]))], shared)
+    assert(sets[0]['metadata']['analysisSoftware'] == run['metadata']['analysisSoftware'] == [b.software("1.0")])
+    assert(list(shared) == [("MS:1000752", "1.0")])
+
+def test_run_key(mzqc_builder):
+    b = mzqc_builder
+    mzml = b.input_file("run.mzML", "file:///data/run.mzML")
+    raw = b.input_file("run.raw", "file:///data/run.raw", ("MS:1000563", "Thermo RAW format"))
+    one = b.quality("one", input_files=[raw, mzml])
+    other = b.quality("other", input_files=[dict(mzml, fileProperties=[])], analysis_software=[b.software("2.0")])
+    # the preferred input file (mzML) decides, and comes first
+    assert(merger.run_key(one, 'location') == merger.run_key(other, 'location'))
+    assert(one['metadata']['inputFiles'][0]['name'] == "run.mzML")
+    assert(merger.run_key(one, 'metadata') != merger.run_key(other, 'metadata'))
+    renamed = b.quality("renamed", input_files=[b.input_file("run.mzML", "file:///elsewhere/run.mzML")],
+                        analysis_software=[])
+    assert(merger.run_key(renamed, 'name') == merger.run_key(other, 'name'))
+    assert(merger.run_key(renamed, 'location') != merger.run_key(other, 'location'))
+    with pytest.raises(ValueError):
+        merger.run_key(b.quality("none", input_files=[], analysis_software=[]), 'name')
+
+def test_RunSpill_groups(tmp_path, mzqc_builder):
+    b = mzqc_builder
+    def run(label, accession):  # of the input file named as the label's first letter
+        return b.quality(label, accession, input_files=[b.input_file(label[0])], analysis_software=[])
+    paths = [b.write(tmp_path / "first.mzQC", [run("a1", "MS:4000059"), run("b1", "MS:4000059")]),
+             b.write(tmp_path / "second.mzQC", [run("c2", "MS:4000060"), run("a2", "MS:4000060")]),
+             b.write(tmp_path / "third.mzQC", [run("b3", "MS:4000061"), run("a3", "MS:4000061")])]
+    spill = merger.RunSpill()
+    try:
+        for source, loaded in enumerate(merger.load_inputs(paths, 'name', spill.directory, workers=1)):
+            spill.add_index(source, loaded['index'])
+        assert(len(spill) == 6)
+        groups = [[run['metadata']['label'] for run in group] for group in spill.groups()]
+    finally:
+        spill.close()
+    # by first occurrence of the key, in input order within a group
+    assert(groups == [["a1", "a2", "a3"], ["b1", "b3"], ["c2"]])
+
+def test_mzqcfilemerger(tmp_path, mzqc_builder):
+    b = mzqc_builder
+    a, c = b.input_file("a"), b.input_file("b")
+    first = b.write(tmp_path / "first.mzQC", [b.quality("", "MS:4000059", input_files=[a])],
+                    [b.quality("set", "MS:4000060", input_files=[a, c], analysis_software=[])], contactName="tester")
+    second = b.write(tmp_path / "second.mzQC", [b.quality("", "MS:4000061", input_files=[a], analysis_software=[]),
+                                                b.quality("b", "MS:4000061", input_files=[c])], contactName="tester")
+    out = str(tmp_path / "merged.mzQC")
+    result = CliRunner().invoke(merger.mzqcfilemerger, [first, second, out, '--compare', 'name', '-w', '1'])
+    assert(result.exit_code == 0)
+    with open(out, 'r') as f:
+        merged = json.load(f)['mzQC']
+    runs = merged['runQualities']
+    assert([len(run['qualityMetrics']) for run in runs] == [2, 1])
+    # the metadata members required by the schema are there, also if empty
+    assert(runs[0]['metadata'] == {'label': "", 'inputFiles': [a], 'analysisSoftware': [b.software("1.0")]})
+    assert(runs[1]['metadata']['analysisSoftware'] == [b.software("1.0")])
+    assert([s['metadata']['label'] for s in merged['setQualities']] == ["set"])
+    assert(len(merged['controlledVocabularies']) == 1 and merged['contactName'] == "tester")
+    # laid out as the shards of mzqc-split
+    with open(out, 'r') as f:
+        assert(f.read().startswith('{"mzQC": \n{\n  "version": "v1.0",\n'))
+
+def test_mzqcfilemerger_single_input(tmp_path, mzqc_builder):
+    single = mzqc_builder.write(tmp_path / "single.mzQC", [mzqc_builder.quality("a", "MS:4000059")])
+    out = tmp_path / "merged.mzQC"
+    result = CliRunner().invoke(merger.mzqcfilemerger, [single, str(out), '-w', '1'])
+    assert(result.exit_code == 2 and "Need at least 2 mzQC files" in result.output)
+    assert(not out.exists())
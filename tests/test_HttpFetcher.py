@@ -0,0 +1,67 @@
+__author__ = 'walzer'
+import pytest  # Eeeeeeverything needs to be prefixed with test in order to be picked up by pytest, i.e. TestClass() and test_function()
+import requests
+from mzqc.HttpFetcher import HttpFetcher, DEFAULT_TIMEOUT
+
+"""
+    HTTP fetching tests with pymzqc
+
+    NOTE: all requests go to a local stand-in server (see conftest.py)
+"""
+
+def test_HttpFetcher_conditional(http_stand_in):
+    http_stand_in.documents['/schema.json'] = b'{"type": "object"}'
+    fetcher = HttpFetcher(retries=0)
+    url = http_stand_in.url('/schema.json')
+    first = fetcher.fetch(url)
+    assert(first.status == 200 and not first.not_modified)
+    assert(first.content == b'{"type": "object"}')
+    assert(first.etag and first.last_modified)
+
+    again = fetcher.fetch(url, etag=first.etag)
+    assert(again.not_modified and again.content is None)
+    assert(again.etag == first.etag)
+    assert(fetcher.requests == 2 and fetcher.revalidated == 1)
+
+    http_stand_in.documents['/schema.json'] = b'{"type": "array"}'
+    changed = fetcher.fetch(url, etag=first.etag)
+    assert(changed.status == 200 and changed.content == b'{"type": "array"}')
+    assert(changed.etag != first.etag)
+
+    # all requests went over the one pooled connection
+    assert(len({port for _, _, port in http_stand_in.log}) == 1)
+    fetcher.close()
+
+def test_HttpFetcher_retries(http_stand_in):
+    http_stand_in.documents['/psi-ms.obo'] = b'format-version: 1.2\n'
+    url = http_stand_in.url('/psi-ms.obo')
+    http_stand_in.fail = 2
+    assert(HttpFetcher(retries=2, backoff=0).fetch(url).content == b'format-version: 1.2\n')
+    assert([status for _, status, _ in http_stand_in.log] == [503, 503, 200])
+
+    http_stand_in.fail = 2
+    with pytest.raises(requests.RequestException):
+        HttpFetcher(retries=1, backoff=0).fetch(url)
+    with pytest.raises(requests.HTTPError):
+        HttpFetcher(retries=0).fetch(http_stand_in.url('/missing.obo'))
+
+def test_HttpFetcher_configuration(monkeypatch):
+    assert(HttpFetcher().timeout == DEFAULT_TIMEOUT)
+    monkeypatch.setenv('PYMZQC_HTTP_TIMEOUT', '2.5')
+    monkeypatch.setenv('PYMZQC_HTTP_RETRIES', '0')
+    fetcher = HttpFetcher()
+    assert(fetcher.timeout == 2.5 and fetcher.retries == 0)
+    assert(HttpFetcher(timeout=(1, 2), retries=5).retries == 5)
+    assert(fetcher.handles('https://example.org/ms.obo') and not fetcher.handles('ftp://example.org/ms.obo'))
+
+def test_SyntaxCheck_schema_fetch(http_stand_in, monkeypatch):
+    from mzqc import ResourceCache, SyntaxCheck
+    http_stand_in.documents['/main/schema.json'] = b'{"type": "object"}'
+    monkeypatch.setattr(SyntaxCheck, 'SCHEMA_URL', http_stand_in.url('/{branch}/schema.json'))
+    monkeypatch.setattr(ResourceCache, 'document_cache', ResourceCache.DocumentCache(cache_dir=""))
+    # the schema is fetched with few retries, not the shared fetcher's
+    http_stand_in.fail = SyntaxCheck.SCHEMA_RETRIES + 1
+    with pytest.raises(requests.RequestException):
+        SyntaxCheck.SyntaxCheck("main")
+    assert(len(http_stand_in.log) == SyntaxCheck.SCHEMA_RETRIES + 1)
+    assert(SyntaxCheck.SyntaxCheck("main").schema == {"type": "object"})
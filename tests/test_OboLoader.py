@@ -0,0 +1,109 @@
+__author__ = 'walzer'
+import pytest  # Eeeeeeverything needs to be prefixed with test in order to be picked up by pytest, i.e. TestClass() and test_function()
+import gzip
+import json
+import shutil
+import warnings
+from pronto import Ontology
+from mzqc.OboLoader import load_vocabulary, parse_obo, parse_obograph, parse_vocabulary
+from mzqc.VocabularyIndex import VocabularyIndex
+
+"""
+    OBO loader tests with pymzqc
+
+    NOTE: the lightweight loader is compared against pronto on the local example ontologies.
+"""
+
+ESCAPED_OBO = """format-version: 1.2
+data-version: 1.0.0
+
+[Typedef]
+id: has_units
+name: has_units
+
+[Term]
+id: UO:0000000
+name: unit
+
+[Term]
+id: MS:0000001
+name: escaped \\{name\\}
+def: "A \\"quoted\\" definition, with a backslash \\\\ and [brackets]." [PSI:MS] {comment="x"}
+synonym: "alias" EXACT []
+is_a: UO:0000000 {source="x"} ! unit
+relationship: has_units UO:0000000 ! unit
+is_obsolete: false
+
+[Instance]
+id: MS:0000002
+name: not a term
+"""
+
+OBOGRAPH = {"graphs": [{
+    "id": "http://purl.obolibrary.org/obo/ms.owl",
+    "meta": {"basicPropertyValues": [{"pred": "http://www.w3.org/2002/07/owl#versionInfo", "val": "4.1.999"}]},
+    "nodes": [
+        {"id": "http://purl.obolibrary.org/obo/MS_4000002", "lbl": "QC metric value type", "type": "CLASS"},
+        {"id": "http://purl.obolibrary.org/obo/MS_4000003", "lbl": "single value", "type": "CLASS",
+         "meta": {"definition": {"val": "Metrics consisting of a single value."}}},
+        {"id": "http://purl.obolibrary.org/obo/MS_4000059", "lbl": "number of MS1 spectra", "type": "CLASS"},
+        {"id": "http://purl.obolibrary.org/obo/UO_0000000", "lbl": "unit", "type": "CLASS"},
+        {"id": "http://purl.obolibrary.org/obo/UO_0000189", "lbl": "count unit", "type": "CLASS"},
+        {"id": "http://purl.obolibrary.org/obo/ms#has_units", "lbl": "has_units", "type": "PROPERTY"}],
+    "edges": [
+        {"sub": "http://purl.obolibrary.org/obo/MS_4000003", "pred": "is_a", "obj": "http://purl.obolibrary.org/obo/MS_4000002"},
+        {"sub": "http://purl.obolibrary.org/obo/MS_4000059", "pred": "is_a", "obj": "http://purl.obolibrary.org/obo/MS_4000003"},
+        {"sub": "http://purl.obolibrary.org/obo/UO_0000189", "pred": "is_a", "obj": "http://purl.obolibrary.org/obo/UO_0000000"},
+        {"sub": "http://purl.obolibrary.org/obo/MS_4000059", "pred": "http://purl.obolibrary.org/obo/ms#has_units",
+         "obj": "http://purl.obolibrary.org/obo/UO_0000189"}]}]}
+
+def pronto_index(path):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return VocabularyIndex.from_ontology(Ontology(str(path), import_depth=0))
+
+@pytest.mark.parametrize("path", ["tests/examples/local-qc-test.obo", "tests/examples/local-ambiguous-test.obo"])
+def test_OboLoader_same_as_pronto(path):
+    assert(load_vocabulary(path).to_dict() == pronto_index(path).to_dict())
+
+def test_OboLoader_escapes(tmp_path):
+    index = parse_obo(ESCAPED_OBO.splitlines())
+    term = index['MS:0000001']
+    assert(term.name == "escaped {name}")
+    assert(term.definition == 'A "quoted" definition, with a backslash \\ and [brackets].')
+    assert(term.parents == {'UO:0000000'} and term.units == ('UO:0000000',))
+    assert(term.is_unit)
+    assert('MS:0000002' not in index)
+    assert(index.data_version == "1.0.0")
+
+    local = tmp_path / "escaped.obo"
+    local.write_text(ESCAPED_OBO)
+    assert(load_vocabulary(str(local)).to_dict() == pronto_index(local).to_dict())
+
+def test_OboLoader_obograph(tmp_path):
+    index = parse_obograph(OBOGRAPH)
+    assert(index.data_version == "4.1.999")
+    assert(index.metrics == {'MS:4000002', 'MS:4000003', 'MS:4000059'})
+    assert(index['MS:4000059'].units == ('UO:0000189',))
+    assert(index['MS:4000003'].definition == "Metrics consisting of a single value.")
+    assert(index['UO:0000189'].is_unit)
+    assert('ms#has_units' not in index and 'has_units' not in index)
+
+    local = tmp_path / "ms.json"
+    local.write_text(json.dumps(OBOGRAPH))
+    assert(load_vocabulary(str(local)).to_dict() == index.to_dict())
+
+def test_OboLoader_gzip(tmp_path):
+    local = tmp_path / "local-qc-test.obo.gz"
+    with open("tests/examples/local-qc-test.obo", 'rb') as f_in, gzip.open(local, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    assert(load_vocabulary(str(local)).to_dict() == load_vocabulary("tests/examples/local-qc-test.obo").to_dict())
+    assert(parse_vocabulary(local.read_bytes()).to_dict() == load_vocabulary(str(local)).to_dict())
+
+def test_OboLoader_errors(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_vocabulary("tests/examples/does-not-exist.obo")
+    local = tmp_path / "not-an-ontology.txt"
+    local.write_text("just some text\n")
+    with pytest.raises(ValueError):
+        load_vocabulary(str(local))
@@ -0,0 +1,51 @@
+__author__ = 'walzer'
+import pytest  # Eeeeeeverything needs to be prefixed with test in order to be picked up by pytest, i.e. TestClass() and test_function()
+import io
+import json
+from mzqc.ResourceCache import ValidationResultCache
+from mzqcaccessories.offlinevalidator import mzqc_offline_validator as validator
+
+"""
+    Offline validator batch tests with pymzqc
+
+    NOTE: schema and ontology come from a resource bundle (see offline_resources in conftest.py).
+"""
+
+PSI_MS = "https://github.com/HUPO-PSI/psi-ms-CV/releases/download/v4.1.186/psi-ms.obo"
+EXAMPLE = "tests/examples/individual-runs.mzQC"  # with issues against the local test vocabulary
+
+def batch_inputs(tmp_path):
+    """A valid, an invalid, and an unreadable (missing) file"""
+    with open("tests/examples/local-runs.mzQC", 'r') as f:
+        document = json.load(f)
+    document['mzQC']['controlledVocabularies'] = [{'name': "PSI-MS", 'uri': PSI_MS, 'version': "4.1.186"}]
+    valid = str(tmp_path / "valid.mzQC")
+    with open(valid, 'w') as f:
+        json.dump(document, f)
+    return valid, EXAMPLE, str(tmp_path / "missing.mzQC")
+
+def validate_batch(paths, **options):
+    """the exit code and the results by file of a batch validation"""
+    out = io.StringIO()
+    code = validator.validate_batch(paths, out, **options)
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert(sorted(line['file'] for line in lines) == sorted(paths))
+    return code, {line['file']: line['result'] for line in lines}
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_validate_batch(offline_resources, tmp_path, monkeypatch, workers):
+    monkeypatch.setattr(validator, 'result_cache', ValidationResultCache(cache_dir=str(tmp_path / "results")))
+    valid, invalid, missing = batch_inputs(tmp_path)
+    options = {'workers': workers, 'bundle': offline_resources}
+
+    code, results = validate_batch([valid, invalid, missing], **options)
+    assert(code == validator.EXIT_FAILED)
+    assert(validator.is_valid(results[valid]))
+    assert(not validator.is_valid(results[invalid]) and 'general' not in results[invalid])
+    assert(results[invalid]['schema validation'] == "success")  # the schema is loaded in each worker
+    assert('general' in results[missing])
+    # the same as validated one by one here
+    assert(results[invalid] == validator.validate_path(invalid)[1])
+
+    assert(validate_batch([valid, invalid], **options)[0] == validator.EXIT_ISSUES)
+    assert(validate_batch([valid, valid], **options)[0] == validator.EXIT_VALID)
@@ -0,0 +1,247 @@
+__author__ = 'walzer'
+import pytest  # Eeeeeeverything needs to be prefixed with test in order to be picked up by pytest, i.e. TestClass() and test_function()
+import io
+import os
+import sys
+import gzip
+import time
+from mzqc import ResourceCache
+from mzqc.OboLoader import load_vocabulary
+from mzqc.ResourceCache import ValidationResultCache
+from mzqc.SyntaxCheck import SCHEMA_URL
+
+"""
+    Online validator tests with pymzqc
+
+    NOTE: skipped without the online validator's requirements (flask, flask_restful, flask_cors);
+        schema and ontology come from a resource bundle (see offline_resources in conftest.py).
+"""
+
+pytest.importorskip('flask_restful')
+pytest.importorskip('flask_cors')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mzqcaccessories', 'onlinevalidator'))
+import mzqc_online_validator as online
+
+OBO = "tests/examples/local-qc-test.obo"
+PSI_MS = "https://github.com/HUPO-PSI/psi-ms-CV/releases/download/v4.1.186/psi-ms.obo"
+EXAMPLE = "tests/examples/individual-runs.mzQC"
+
+def use_online_caches(tmp_path, monkeypatch):
+    """Has the online validator use the test's ontology cache and a fresh result cache in tmp_path"""
+    monkeypatch.setattr(online, 'ontology_cache', ResourceCache.ontology_cache)
+    monkeypatch.setattr(online, 'result_cache', ValidationResultCache(cache_dir=str(tmp_path / "results")))
+
+class RecordingCache(object):
+    """Records the (URI, version) of the indices loaded"""
+    def __init__(self):
+        self.loaded = list()
+
+    def load_index(self, uri, version=""):
+        self.loaded.append((uri, version))
+        return load_vocabulary(OBO)  # data-version 4.1.999
+
+def test_WarmResources_vocabularies(monkeypatch):
+    cache = RecordingCache()
+    monkeypatch.setattr(online, 'ontology_cache', cache)
+    monkeypatch.setattr(online, 'RECENT_VOCABULARIES', 2)
+    resources = online.WarmResources(ontologies=[("https://example.org/pinned.obo", "1.0"),
+                                                 ("https://example.org/latest.obo", "")], refresh_interval=0)
+    # unversioned preloads are kept under their data-version too, as declared in the files
+    resources._load_vocabularies()
+    assert(sorted(cache.loaded) == [("https://example.org/latest.obo", ""),
+                                    ("https://example.org/latest.obo", "4.1.999"),
+                                    ("https://example.org/pinned.obo", "1.0")])
+
+    # requested vocabularies: only the most recent few are kept, preloaded ones are not counted
+    resources.track([("https://example.org/a.obo", "1"), ("https://example.org/pinned.obo", "1.0")])
+    resources.track([("https://example.org/b.obo", "1"), ("https://example.org/c.obo", "1")])
+    assert(list(resources.recent) == [("https://example.org/b.obo", "1"), ("https://example.org/c.obo", "1")])
+    assert(len(resources.vocabularies) == 2)
+
+    # and only until they have not been requested for a while
+    resources.recent[("https://example.org/b.obo", "1")] = time.time() - online.RECENT_IDLE - 1
+    cache.loaded.clear()
+    resources._load_vocabularies()
+    assert(("https://example.org/c.obo", "1") in cache.loaded)
+    assert(("https://example.org/b.obo", "1") not in cache.loaded)
+    assert(list(resources.recent) == [("https://example.org/c.obo", "1")])
+
+def test_WarmResources_bundle_and_refresh(offline_resources, tmp_path, monkeypatch):
+    use_online_caches(tmp_path, monkeypatch)
+    resources = online.WarmResources(ontologies=(), refresh_interval=0.05)
+    cache = RecordingCache()
+    monkeypatch.setattr(online, 'ontology_cache', cache)
+    resources.warm_up()
+    # bundled vocabularies are kept under their bundled version
+    assert(cache.loaded[:1] == [(PSI_MS, "4.1.186")])
+    assert(resources.syntax_check.schema_url == SCHEMA_URL.format(branch="main"))
+    warmed = resources.refreshed
+    deadline = time.time() + 5
+    while resources.refreshed == warmed and time.time() < deadline:
+        time.sleep(0.01)
+    assert(resources.refreshed > warmed)  # refreshed in the background
+    resources.stop()
+
+class Unreachable(object):
+    """Fails any resource lookup, as if offline"""
+    def __getattr__(self, name):
+        def unreachable(*args, **kwargs):
+            raise ConnectionError("unreachable")
+        return unreachable
+
+def test_WarmResources_result_key(offline_resources, tmp_path, monkeypatch):
+    use_online_caches(tmp_path, monkeypatch)
+    resources = online.WarmResources(ontologies=(), refresh_interval=0)
+    resources.warm_up()
+    assert(resources.data_versions == {(PSI_MS, "4.1.186"): "4.1.999"})
+    expected = online.result_cache.key("{}", "main", [(PSI_MS, "4.1.186")], profile='full')
+    # keyed with the digest and data-versions of the last refresh, without looking them up
+    monkeypatch.setattr(ResourceCache, 'document_cache', Unreachable())
+    monkeypatch.setattr(ResourceCache, 'ontology_cache', Unreachable())
+    assert(resources.result_key("{}", [(PSI_MS, "4.1.186")], profile='full') == expected)
+
+def test_JobQueue_expiry(tmp_path, monkeypatch):
+    import threading
+    release = threading.Event()
+    def slow_validation(inpu, profile):
+        release.wait(5)
+        return {'validated': inpu}
+    monkeypatch.setattr(online, 'validate_upload', slow_validation)
+    queue = online.JobQueue(workers=1, limit=2, ttl=0.2, job_dir=str(tmp_path / "jobs"))
+    first = queue.submit("first")
+    second = queue.submit("second")
+    assert(first is not None and second is not None)
+    assert(queue.full and queue.submit("third") is None)
+    path = queue._job_path(first['job'])
+
+    # a job outlasting the ttl is not expired while it runs, also not its (older) record file
+    time.sleep(0.3)
+    old = time.time() - 60
+    os.utime(path, (old, old))
+    assert(queue.get(first['job'])['status'] == 'running')
+    assert(os.path.exists(path))
+
+    release.set()
+    deadline = time.time() + 5
+    while queue.pending and time.time() < deadline:
+        time.sleep(0.01)
+    done = queue.get(first['job'])
+    assert(done['status'] == 'done' and done['result'] == {'validated': "first"})
+    # any process sharing the job directory answers the poll
+    other = online.JobQueue(workers=1, ttl=0.2, job_dir=str(tmp_path / "jobs"))
+    assert(other.get(second['job'])['result'] == {'validated': "second"})
+
+    # finished jobs expire ttl seconds after they finished
+    time.sleep(0.3)
+    os.utime(path, (old, old))
+    assert(queue.get(first['job']) is None and other.get(second['job']) is None)
+    assert(not os.path.exists(path))
+
+def test_jobs_endpoint(offline_resources, tmp_path, monkeypatch):
+    use_online_caches(tmp_path, monkeypatch)
+    monkeypatch.setattr(online, 'jobs', online.JobQueue(workers=1, limit=1, ttl=60))
+    monkeypatch.setattr(online, 'resources', online.WarmResources(ontologies=(), refresh_interval=0))
+    client = online.app.test_client()
+    with open(EXAMPLE) as f:
+        document = f.read()
+    response = client.post('/jobs/', data={'validator_input': document, 'profile': 'structural'})
+    assert(response.status_code == 202)
+    location = response.headers['Location']
+    deadline = time.time() + 10
+    job = client.get(location).get_json()
+    while job['status'] in ('queued', 'running') and time.time() < deadline:
+        time.sleep(0.02)
+        job = client.get(location).get_json()
+    assert(job['status'] == 'done')
+    assert(set(job['result']) == {'label uniqueness', 'input files', 'schema validation'})
+
+    assert(client.post('/jobs/', data={'validator_input': document, 'profile': 'quick'}).status_code == 400)
+    assert(client.get('/jobs/0123456789abcdef/').status_code == 404)
+    monkeypatch.setattr(online.JobQueue, 'full', True)
+    refused = client.post('/jobs/', data={'validator_input': document})
+    assert(refused.status_code == 429 and refused.headers['Retry-After'] == '10')
+
+def test_spool_upload():
+    import hashlib
+    with open(EXAMPLE, 'rb') as f:
+        document = f.read()
+    # compressed uploads are detected and decompressed, chunk by chunk
+    for body, gzipped in ((document, None), (gzip.compress(document), None), (gzip.compress(document), True)):
+        upload = online.spool_upload(io.BytesIO(body), gzipped=gzipped)
+        assert(upload.file.read() == document)
+        assert(upload.size == len(document) and upload.digest == hashlib.sha256(document).hexdigest())
+        upload.file.close()
+
+    with pytest.raises(online.UploadError) as e:
+        online.spool_upload(io.BytesIO(document), max_size=len(document) - 1)
+    assert(e.value.status == 413)
+    # also when only the decompressed upload is too large
+    with pytest.raises(online.UploadError) as e:
+        online.spool_upload(io.BytesIO(gzip.compress(b'{' + b' ' * 10**6 + b'}')), max_size=10**5)
+    assert(e.value.status == 413)
+    for refused in (b'', b'[1, 2]', gzip.compress(document)[:-20], b'\x1f\x8b not gzip'):
+        with pytest.raises(online.UploadError) as e:
+            online.spool_upload(io.BytesIO(refused))
+        assert(e.value.status == 400)
+
+def test_validator_upload_streamed(offline_resources, tmp_path, monkeypatch):
+    use_online_caches(tmp_path, monkeypatch)
+    monkeypatch.setattr(online, 'resources', online.WarmResources(ontologies=(), refresh_interval=0))
+    client = online.app.test_client()
+    with open(EXAMPLE, 'rb') as f:
+        document = f.read()
+    form = client.post('/validator/', data={'validator_input': document.decode(), 'profile': 'structural'}).get_json()
+    # the same result for the file upload, the JSON body, and the gzip compressed body
+    uploaded = client.post('/validator/', data={'validator_input': (io.BytesIO(document), 'x.mzQC'),
+                                                'profile': 'structural'}).get_json()
+    body = client.post('/validator/?profile=structural', data=document,
+                       content_type='application/json').get_json()
+    compressed = client.post('/validator/?profile=structural', data=gzip.compress(document),
+                             content_type='application/json', headers={'Content-Encoding': 'gzip'}).get_json()
+    assert(uploaded == body == compressed)
+    assert(body['label uniqueness'] == form['label uniqueness'] and body['input files'] == form['input files'])
+    assert(online.result_cache.hits >= 2)  # resubmissions are answered from the result cache
+
+    broken = client.post('/validator/', data=b'\x1f\x8b broken', content_type='application/json')
+    assert(broken.status_code == 400)
+    assert(client.post('/validator/', data=b'[]', content_type='application/json').status_code == 400)
+
+def test_Metrics_render():
+    registry = online.Metrics(buckets=(0.1, 1.0))
+    registry.inc('requests_total', endpoint='/validator/', method='POST', status='200')
+    registry.inc('requests_total', endpoint='/validator/', method='POST', status='200')
+    registry.observe('stage_duration_seconds', 0.05, stage='from_json')
+    registry.observe('stage_duration_seconds', 0.5, stage='from_json')
+    registry.observe('stage_duration_seconds', 5.0, stage='from_json')
+    registry.inc('unlisted', label='a "quoted"\nvalue')
+    lines = registry.render([('jobs_pending', {}, 3)]).splitlines()
+    assert(lines[:2] == ["# HELP mzqc_validator_requests_total Requests handled, by endpoint, method, and status",
+                         "# TYPE mzqc_validator_requests_total counter"])
+    assert('mzqc_validator_requests_total{endpoint="/validator/",method="POST",status="200"} 2' in lines)
+    assert("# TYPE mzqc_validator_stage_duration_seconds histogram" in lines)
+    # cumulative buckets, sum and count
+    assert([l for l in lines if l.startswith('mzqc_validator_stage_duration_seconds')] == [
+        'mzqc_validator_stage_duration_seconds_bucket{stage="from_json",le="0.1"} 1',
+        'mzqc_validator_stage_duration_seconds_bucket{stage="from_json",le="1.0"} 2',
+        'mzqc_validator_stage_duration_seconds_bucket{stage="from_json",le="+Inf"} 3',
+        'mzqc_validator_stage_duration_seconds_sum{stage="from_json"} 5.55',
+        'mzqc_validator_stage_duration_seconds_count{stage="from_json"} 3'])
+    assert("mzqc_validator_jobs_pending 3" in lines)
+    assert('mzqc_validator_unlisted{label="a \\"quoted\\"\\nvalue"} 1' in lines)
+
+def test_metrics_endpoint(offline_resources, tmp_path, monkeypatch):
+    use_online_caches(tmp_path, monkeypatch)
+    monkeypatch.setattr(online, 'metrics', online.Metrics())
+    monkeypatch.setattr(online, 'resources', online.WarmResources(ontologies=(), refresh_interval=0))
+    client = online.app.test_client()
+    with open(EXAMPLE, 'rb') as f:
+        client.post('/validator/', data=f.read(), content_type='application/json')
+    response = client.get('/metrics')
+    assert(response.status_code == 200 and response.mimetype == 'text/plain')
+    text = response.get_data(as_text=True)
+    assert('mzqc_validator_requests_total{endpoint="/validator/",method="POST",status="200"} 1' in text)
+    for stage in ('body_parse', 'from_json', 'ontology_load', 'semantic_check', 'schema_validation', 'serialization'):
+        assert(f'mzqc_validator_stage_duration_seconds_count{{stage="{stage}"' in text)
+    assert('mzqc_validator_stage_duration_seconds_count{stage="semantic_check",check="metric use"} 1' in text)
+    assert('mzqc_validator_cache_misses_total{cache="result"} 1' in text)
+    assert('mzqc_validator_jobs_limit ' in text)
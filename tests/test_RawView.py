@@ -0,0 +1,49 @@
+__author__ = 'walzer'
+import pytest  # Eeeeeeverything needs to be prefixed with test in order to be picked up by pytest, i.e. TestClass() and test_function()
+import json
+import pickle
+from mzqc.RawView import raw_view, RawMzQcFile, RawRunQuality, RawQualityMetric, RawCvParameter, RawInputFile
+
+"""
+    Raw (plain JSON) view tests with pymzqc
+"""
+
+def load_local_json():
+    with open("tests/examples/local-runs.mzQC", 'r') as f:
+        return json.load(f)
+
+def test_RawView_attributes():
+    doc = load_local_json()
+    view = raw_view(doc)
+    assert(isinstance(view, RawMzQcFile))
+    assert(view.raw is doc['mzQC'])
+    assert(raw_view(doc['mzQC']) == view)
+    assert(view.version == doc['mzQC']['version'])
+    assert(view.setQualities == [])
+    run = view.runQualities[0]
+    assert(isinstance(run, RawRunQuality))
+    assert(run is view.runQualities[0])  # nested views are wrapped once
+    assert(run.metadata.label == "run_a")
+    assert(isinstance(run.metadata.inputFiles[0], RawInputFile))
+    metric = run.qualityMetrics[0]
+    assert(isinstance(metric, RawQualityMetric))
+    assert((metric.accession, metric.value) == ("MS:4000059", 13405))
+    assert(isinstance(metric.unit, RawCvParameter) and metric.unit.accession == "UO:0000189")
+    # the defaults of the MZQCFile classes apply
+    assert(run.qualityMetrics[2].unit == "" and run.qualityMetrics[2].description != "")
+    assert(RawCvParameter({"accession": "MS:4000059"}).description == "")
+
+def test_RawView_readonly():
+    view = raw_view(load_local_json())
+    with pytest.raises(AttributeError):
+        view.version = "0.0.0"
+    with pytest.raises(AttributeError):
+        view.runQualities[0].metadata.inputFiles[0].accession
+    assert(not hasattr(view.runQualities[0].metadata.inputFiles[0], 'accession'))
+
+def test_RawView_pickle():
+    view = raw_view(load_local_json())
+    view.runQualities  # partially resolved views are picklable, too
+    restored = pickle.loads(pickle.dumps(view))
+    assert(restored == view)
+    assert(restored.runQualities[1].qualityMetrics[1].value == view.runQualities[1].qualityMetrics[1].value)
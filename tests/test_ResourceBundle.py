@@ -0,0 +1,115 @@
+__author__ = 'walzer'
+import pytest  # Eeeeeeverything needs to be prefixed with test in order to be picked up by pytest, i.e. TestClass() and test_function()
+import json
+import zipfile
+import warnings
+from mzqc import ResourceCache
+from mzqc.OboLoader import load_vocabulary
+from mzqc.ResourceBundle import ResourceBundle
+from mzqc.ResourceCache import OntologyCache, DocumentCache, use_bundle, active_bundle
+from mzqc.SemanticCheck import SemanticCheck
+from mzqc.SyntaxCheck import SyntaxCheck, SCHEMA_URL
+from mzqc.MZQCFile import JsonSerialisable as mzqc_io
+
+"""
+    Offline resource bundle tests with pymzqc
+
+    NOTE: the remote ontology of the bundle is the local test ontology under a (never
+        requested) remote URI.
+"""
+
+OBO = "tests/examples/local-qc-test.obo"
+REMOTE = "https://example.org/no-network/local-qc-test.obo"
+
+@pytest.fixture
+def bundle(tmp_path):
+    path = str(tmp_path / "resources.zip")
+    with open(OBO, 'rb') as f:
+        source = f.read()
+    with open("tests/schema.json", 'r') as f:
+        schema = f.read()
+    with ResourceBundle.create(path, pymzqc="test") as writer:
+        writer.add_document(SCHEMA_URL.format(branch="main"), schema)
+        writer.add_ontology(REMOTE, load_vocabulary(OBO), version="1.0.0", source=source)
+    return path
+
+@pytest.fixture
+def offline(bundle, tmp_path, monkeypatch):
+    """Uses the bundle with fresh caches, any network access fails the test"""
+    from mzqc import HttpFetcher
+    class NoNetwork(HttpFetcher.HttpFetcher):
+        def fetch(self, *args, **kwargs):
+            raise AssertionError("network access with a bundle in use")
+    monkeypatch.setattr(HttpFetcher, 'http_fetcher', NoNetwork())
+    monkeypatch.setattr(ResourceCache, 'ontology_cache', OntologyCache(cache_dir=str(tmp_path / "ontologies")))
+    monkeypatch.setattr(ResourceCache, 'document_cache', DocumentCache(cache_dir=str(tmp_path / "documents")))
+    use_bundle(bundle)
+    yield bundle
+    use_bundle(None)
+
+def test_ResourceBundle_contents(bundle):
+    resources = ResourceBundle(bundle)
+    assert(resources.manifest['pymzqc'] == "test")
+    assert(resources.documents == [SCHEMA_URL.format(branch="main")])
+    assert(resources.ontologies == [REMOTE])
+    assert(resources.index(REMOTE).to_dict() == load_vocabulary(OBO).to_dict())
+    assert(resources.index(REMOTE) is resources.index(REMOTE))
+    assert(resources.data_version(REMOTE) == load_vocabulary(OBO).data_version)
+    with open(OBO, 'rb') as f:
+        assert(resources.source(REMOTE) == f.read())
+    with pytest.raises(LookupError):
+        resources.index("https://example.org/other.obo")
+    with pytest.raises(LookupError):
+        resources.document(SCHEMA_URL.format(branch="v1.0.0"))
+
+def test_ResourceBundle_invalid(tmp_path):
+    with pytest.raises(ValueError):
+        ResourceBundle(OBO)
+    path = str(tmp_path / "future.zip")
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('bundle.json', json.dumps({'format': 99}))
+    with pytest.raises(ValueError):
+        ResourceBundle(path)
+
+def test_ResourceBundle_setting(bundle, monkeypatch):
+    monkeypatch.setenv('PYMZQC_BUNDLE', bundle)
+    assert(active_bundle().path == bundle)
+    use_bundle('')
+    assert(active_bundle() is None)
+    use_bundle(None)
+    assert(active_bundle().path == bundle)
+    monkeypatch.delenv('PYMZQC_BUNDLE')
+    assert(active_bundle() is None)
+
+def test_ResourceBundle_validation(offline):
+    with open("tests/examples/local-runs.mzQC", 'r') as f:
+        inpu = f.read()
+    mzqcobject = mzqc_io.from_json(inpu)
+    local = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        local.validate(load_local=True)
+    for cv in mzqcobject.controlledVocabularies:
+        cv.uri = REMOTE
+    bundled = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        bundled.validate()
+    expected = dict(local.string_export(), **{'ontology load errors': []})  # no local load notice
+    assert(bundled.string_export() == expected)
+    assert(ResourceCache.ontology_cache.data_version(REMOTE) == load_vocabulary(OBO).data_version)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        assert(ResourceCache.ontology_cache.load(REMOTE)['MS:4000059'].name == "number of MS1 spectra")
+
+    assert(SyntaxCheck().validate(inpu) == {'schema validation': 'success'})
+    with pytest.raises(LookupError):
+        SyntaxCheck("v1.0.0")
+
+    # unbundled ontologies fail to load, without network access
+    mzqcobject.controlledVocabularies[0].uri = "https://example.org/other.obo"
+    unbundled = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        unbundled.validate()
+    assert(unbundled['ontology load errors'])
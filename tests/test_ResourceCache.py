@@ -0,0 +1,212 @@
+__author__ = 'walzer'
+import pytest  # Eeeeeeverything needs to be prefixed with test in order to be picked up by pytest, i.e. TestClass() and test_function()
+import os
+import shutil
+import time
+import warnings
+from mzqc.ResourceCache import LRUCache, OntologyCache, DocumentCache, ValidationResultCache, canonical_hash, default_cache_dir
+
+"""
+    Cache tests with pymzqc
+
+    NOTE: all ontologies are loaded from local files, the cache directories are
+        temporary per test.
+"""
+
+OBO = "tests/examples/local-ambiguous-test.obo"
+
+def test_default_cache_dir(monkeypatch):
+    monkeypatch.setenv('PYMZQC_CACHE_DIR', '/tmp/pymzqc-test')
+    assert(default_cache_dir() == '/tmp/pymzqc-test')
+    monkeypatch.delenv('PYMZQC_CACHE_DIR')
+    monkeypatch.setenv('XDG_CACHE_HOME', '/tmp/xdg')
+    assert(default_cache_dir() == os.path.join('/tmp/xdg', 'pymzqc'))
+
+def test_LRUCache_eviction():
+    lru = LRUCache(maxsize=2)
+    lru.put('a', 1)
+    lru.put('b', 2)
+    assert(lru.get('a') == 1)  # 'a' is now the most recently used
+    lru.put('c', 3)
+    assert('b' not in lru)
+    assert('a' in lru and 'c' in lru)
+    assert(len(lru) == 2)
+    assert(lru.get('b', 'default') == 'default')
+
+def test_OntologyCache_memory(tmp_path):
+    cache = OntologyCache(cache_dir=str(tmp_path))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        first = cache.load(OBO, "0")
+        second = cache.load(OBO, "0")
+    assert(first is second)
+    assert(cache.misses == 1 and cache.hits == 1)
+    assert(first['MS:4000095'].name == "slowest frequency for MS level 1 collection")
+
+def test_OntologyCache_disk(tmp_path):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        OntologyCache(cache_dir=str(tmp_path)).load(OBO, "0")
+        assert(any(fn.endswith('.ontology.json') for fn in os.listdir(tmp_path)))
+        assert(not any(fn.endswith('.pkl') for fn in os.listdir(tmp_path)))
+
+        fresh = OntologyCache(cache_dir=str(tmp_path))
+        onto = fresh.load(OBO, "0")
+    assert(fresh.misses == 0 and fresh.hits == 1)
+    assert(onto.metadata.data_version == "4.1.138")
+
+def test_OntologyCache_source_changed(tmp_path):
+    local = tmp_path / "copy.obo"
+    shutil.copy(OBO, local)
+    cache = OntologyCache(cache_dir=str(tmp_path / "cache"))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        cache.load(str(local), "0")
+        with open(local, 'a') as f:
+            f.write("\n")
+        os.utime(local, ns=(time.time_ns(), time.time_ns() + 10**9))
+        cache.load(str(local), "0")
+    assert(cache.misses == 2)
+
+def test_OntologyCache_remote_validity(tmp_path):
+    cache = OntologyCache(cache_dir=str(tmp_path), max_age=10)
+    uri = "https://github.com/HUPO-PSI/psi-ms-CV/releases/download/v4.1.130/psi-ms.obo"
+    entry = {'uri': uri, 'version': "4.1.130", 'created': 0}
+    assert(cache._is_valid(entry, uri, "4.1.130"))  # pinned release
+    entry = {'uri': uri, 'version': "", 'created': 0}
+    assert(not cache._is_valid(entry, uri, ""))  # unversioned and expired
+    entry['created'] = time.time()
+    assert(cache._is_valid(entry, uri, ""))
+    assert(not cache._is_valid(entry, uri, "4.1.131"))
+    # versions only pin as whole path segments (or data-versions), not as substrings
+    assert(not cache._is_valid({'uri': uri, 'version': "4", 'created': 0}, uri, "4"))
+    assert(not cache._is_valid({'uri': uri, 'version': "1.13", 'created': 0}, uri, "1.13"))
+    master = "https://raw.githubusercontent.com/HUPO-PSI/psi-ms-CV/master/psi-ms.obo"
+    assert(cache._is_valid({'uri': master, 'version': "4.1.130", 'created': 0,
+                            'data_version': "4.1.130"}, master, "4.1.130"))
+    assert(not cache._is_valid({'uri': master, 'version': "4.1.130", 'created': 0,
+                                'data_version': "4.1.131"}, master, "4.1.130"))
+
+def test_OntologyCache_load_error(tmp_path):
+    cache = OntologyCache(cache_dir=str(tmp_path))
+    with pytest.raises(Exception):
+        cache.load("tests/examples/does-not-exist.obo")
+    assert(len(cache._memory) == 0)
+
+def test_OntologyCache_backends(tmp_path):
+    obo = OntologyCache(cache_dir=str(tmp_path / "obo"))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        full = OntologyCache(cache_dir=str(tmp_path / "pronto"), backend='pronto')
+        assert(obo.load_index(OBO, "0").to_dict() == full.load_index(OBO, "0").to_dict())
+    assert(len(obo._memory) == 0)  # no full ontology loaded
+    assert(len(full._memory) == 1)
+    with pytest.raises(ValueError):
+        OntologyCache(backend='owl')
+
+def test_canonical_hash():
+    a = canonical_hash('{"mzQC": {"version": "1.0.0", "runQualities": []}}')
+    b = canonical_hash('{ "mzQC" : {\n "runQualities": [], "version": "1.0.0"}}')
+    assert(a == b)
+    assert(a != canonical_hash('{"mzQC": {"version": "1.0.1", "runQualities": []}}'))
+    with pytest.raises(ValueError):
+        canonical_hash("not json")
+
+def test_ValidationResultCache(tmp_path, monkeypatch):
+    from mzqc import ResourceCache
+    monkeypatch.setattr(ResourceCache, 'ontology_cache', OntologyCache(cache_dir=str(tmp_path / "ontologies")))
+    monkeypatch.setattr(ResourceCache, 'document_cache', DocumentCache(cache_dir=""))
+    schema = "file://" + os.path.abspath("tests/schema.json")
+    doc = '{"mzQC": {"version": "1.0.0"}}'
+    cache = ValidationResultCache(cache_dir=str(tmp_path / "results"))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        key = cache.key(doc, "main", [(OBO, "0")], schema_url=schema, max_errors=0)
+        assert(key == cache.key('{"mzQC":{"version":"1.0.0"}}', "main", [(OBO, "0")], schema_url=schema, max_errors=0))
+        assert(key != cache.key(doc, "v1.0.0", [(OBO, "0")], schema_url=schema, max_errors=0))
+        assert(key != cache.key(doc, "main", [(OBO, "0")], schema_url=schema, max_errors=5))
+        assert(key != cache.key(doc, "main", [], schema_url=schema, max_errors=0))
+        # a changed schema document changes the key
+        changed = tmp_path / "schema.json"
+        changed.write_text('{"type": "object"}')
+        assert(key != cache.key(doc, "main", [(OBO, "0")], schema_url=changed.as_uri(), max_errors=0))
+    # the data-version is answered from the index metadata
+    assert(ResourceCache.ontology_cache.data_version(OBO, "0") == "4.1.138")
+
+    assert(cache.get(key) is None)
+    result = {'schema validation': 'success', 'metric use': []}
+    cache.put(key, result)
+    assert(cache.get(key) == result)
+    fresh = ValidationResultCache(cache_dir=str(tmp_path / "results"))
+    assert(fresh.get(key) == result)
+    expired = ValidationResultCache(cache_dir=str(tmp_path / "results"), max_age=0)
+    assert(expired.get(key) is None)
+    fresh.clear(disk=True)
+    assert(fresh.get(key) is None)
+
+@pytest.fixture
+def stand_in_fetcher(http_stand_in, monkeypatch):
+    """Routes the process-wide fetcher to the stand-in server without retries"""
+    from mzqc import HttpFetcher
+    monkeypatch.setattr(HttpFetcher, 'http_fetcher', HttpFetcher.HttpFetcher(retries=0))
+    with open(OBO, 'rb') as f:
+        http_stand_in.documents['/psi-ms.obo'] = f.read()
+    http_stand_in.documents['/schema.json'] = b'{"type": "object"}'
+    return http_stand_in
+
+@pytest.mark.parametrize("backend", ["obo", "pronto"])
+def test_OntologyCache_remote_revalidation(tmp_path, stand_in_fetcher, backend):
+    uri = stand_in_fetcher.url('/psi-ms.obo')
+    cache = OntologyCache(cache_dir=str(tmp_path), max_age=0, backend=backend)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        index = cache.load_index(uri)
+        assert(index.data_version == "4.1.138")
+        # outdated at once (max_age=0), an unchanged ontology costs a 304 only
+        fresh = OntologyCache(cache_dir=str(tmp_path), max_age=0, backend=backend)
+        assert(fresh.load_index(uri).to_dict() == index.to_dict())
+    assert(cache.misses == 1 and fresh.misses == 0)
+    assert([status for _, status, _ in stand_in_fetcher.log] == [200, 304])
+
+    # the outdated entry is reused while the server is unreachable
+    stand_in_fetcher.fail = 1
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        assert(OntologyCache(cache_dir=str(tmp_path), max_age=0, backend=backend).load_index(uri).data_version == "4.1.138")
+    with pytest.raises(Exception):
+        OntologyCache(cache_dir=str(tmp_path / "empty"), backend=backend).load_index(stand_in_fetcher.url('/missing.obo'))
+
+def test_DocumentCache(tmp_path, stand_in_fetcher):
+    from mzqc.ResourceCache import DocumentCache
+    url = stand_in_fetcher.url('/schema.json')
+    cache = DocumentCache(cache_dir=str(tmp_path))
+    assert(cache.get(url) == '{"type": "object"}')
+    assert(cache.get(url) == '{"type": "object"}')
+    assert(cache.misses == 1 and cache.hits == 1)
+    assert(len(stand_in_fetcher.log) == 1)  # within max_age, no request at all
+
+    outdated = DocumentCache(cache_dir=str(tmp_path), max_age=0)
+    assert(outdated.get(url) == '{"type": "object"}')
+    assert(stand_in_fetcher.log[-1][1] == 304)
+    stand_in_fetcher.documents['/schema.json'] = b'{"type": "array"}'
+    assert(outdated.get(url) == '{"type": "array"}')
+    assert(outdated.misses == 1 and outdated.hits == 1)
+
+    stand_in_fetcher.fail = 1
+    assert(outdated.get(url) == '{"type": "array"}')
+    outdated.clear(disk=True)
+    stand_in_fetcher.fail = 1
+    with pytest.raises(Exception):
+        outdated.get(url)
+
+def test_OntologyCache_remote_source(tmp_path, stand_in_fetcher):
+    uri = stand_in_fetcher.url('/psi-ms.obo')
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        OntologyCache(cache_dir=str(tmp_path)).load(uri)
+        # the stored source document is parsed again, without another request
+        fresh = OntologyCache(cache_dir=str(tmp_path))
+        assert(fresh.load(uri).metadata.data_version == "4.1.138")
+    assert(fresh.hits == 1 and fresh.misses == 0)
+    assert(len(stand_in_fetcher.log) == 1)
+    assert(any(fn.endswith('.source') for fn in os.listdir(tmp_path)))
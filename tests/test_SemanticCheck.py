@@ -6,6 +6,8 @@ from mzqc.SemanticCheck import SemanticCheck
 from mzqc.SemanticCheck import SemanticIssue
 from mzqc.MZQCFile import MzQcFile as mzqc_file
 from mzqc.MZQCFile import JsonSerialisable as mzqc_io
+from mzqc.MZQCFile import QualityMetric, CvParameter, SetQuality
+import time
 import warnings
 from itertools import chain
 
@@ -58,6 +60,51 @@ def test_SemanticCheck_dictfunction():
 
     assert(sc._exceeded_errors)
 
+def test_SemanticCheck_issuecount():
+    sc = SemanticCheck(None)
+    sc["a"] = [1, 2]
+    sc.raising("a", 3)
+    sc.raising("b", 4)
+    assert(sc.issue_count == 4)
+    sc["a"] = [1]
+    assert(sc.issue_count == 2)
+    del sc["b"]
+    assert(sc.issue_count == 1)
+    sc.clear()
+    assert(sc.issue_count == 0)
+
+def test_SemanticCheck_issuesinks(local_cache):
+    streamed = list()
+    def callback(category, issue):
+        streamed.append((category, issue.name))
+    received = list()
+    def generator_sink():
+        while True:
+            category, issue = yield
+            received.append((category, issue.name))
+
+    mzqcobject = load_local_example()
+    mzqcobject.runQualities[1].metadata.label = mzqcobject.runQualities[0].metadata.label
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        sc = SemanticCheck(mzqcobject, file_path="")
+        sc.validate(load_local=True, issue_sink=callback)
+        registered = [(k, i.name) for k, v in sc.items() for i in v]
+        assert(sorted(streamed) == sorted(registered))
+        assert(("label uniqueness", "Metadata labels") in streamed)
+
+        sc.validate(load_local=True, issue_sink=generator_sink())
+        assert(received == streamed)
+
+        # the issue exceeding max_errors and the abort are streamed, too
+        streamed.clear()
+        with pytest.raises(ValidationError):
+            sc.validate(load_local=True, max_errors=1, issue_sink=callback)
+        assert(streamed == [("label uniqueness", "Metadata labels"),
+                            ("ontology load errors", "Loading local vocabulary"),
+                            ("general", "Max semantic issues")])
+        assert(sc.issue_count == 3)
+
 def test_SemanticCheck_clearfunction():
     sc = SemanticCheck(None)
     sc["test"] = [1]
@@ -181,3 +228,374 @@ def test_SemanticCheck_validation_success():
     # print(json.dumps(sem_val.string_export(), sort_keys=True, indent=4))
     for issue_type_category in sem_val.keys():
         assert(len(sem_val.get(issue_type_category,list()))==0)
+
+@pytest.fixture
+def local_cache(tmp_path, monkeypatch):
+    """Isolates the process-wide ontology cache for offline tests"""
+    from mzqc import ResourceCache
+    monkeypatch.setattr(ResourceCache, 'ontology_cache', ResourceCache.OntologyCache(cache_dir=str(tmp_path)))
+    return ResourceCache.ontology_cache
+
+def load_local_example():
+    with open("tests/examples/local-runs.mzQC", 'r') as f:
+        return mzqc_io.from_json(f)
+
+def test_SemanticCheck_validation_local_success(local_cache):
+    mzqcobject = load_local_example()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        sem_val = SemanticCheck(mzqc_obj=mzqcobject, file_path="tests/examples/local-runs.mzQC")
+        sem_val.validate(load_local=True)
+
+    assert([i.name for i in sem_val['ontology load errors']] == ["Loading local vocabulary"])
+    for issue_type_category in set(sem_val.keys()) - {'ontology load errors'}:
+        assert(len(sem_val[issue_type_category])==0)
+
+def load_local_issues_example():
+    mzqcobject = load_local_example()
+    run_a, run_b = mzqcobject.runQualities
+    run_b.metadata.label = run_a.metadata.label
+    run_a.qualityMetrics[0].name = "number of MS2 spectra"
+    run_a.qualityMetrics[1].unit = CvParameter(accession="UO:0000031", name="minute")
+    del run_a.qualityMetrics[2].value["UO:0000191"]
+    run_b.qualityMetrics.append(run_b.qualityMetrics[0])
+    run_b.qualityMetrics.append(QualityMetric(accession="MS:1002404", name="count of identified proteins",
+                                              description="The number of proteins that have been identified.",
+                                              value=12, unit=CvParameter(accession="UO:0000189", name="count unit")))
+    run_b.qualityMetrics.append(QualityMetric(accession="MS:9999999", name="unknown", value=1))
+    return mzqcobject
+
+def test_SemanticCheck_validation_local_issues(local_cache):
+    mzqcobject = load_local_issues_example()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        sem_val = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+        sem_val.validate(load_local=True)
+
+    assert([i.name for i in sem_val['label uniqueness']] == ["Metadata labels"])
+    assert([i.name for i in sem_val['ontology term errors']] == ["Used CVTerms name conflict", "Unknown CVTerm"])
+    assert([i.name for i in sem_val['metric use']] == ["Metric value unit misuse",
+                                                       "Metric value missing table column",
+                                                       "ID based metric but no ID input file",
+                                                       "Metric uniqueness",
+                                                       "Metric use",
+                                                       "Metric value undefined unit"])
+
+def test_SemanticCheck_validation_value_shapes(local_cache):
+    mzqcobject = load_local_example()
+    run_a, run_b = mzqcobject.runQualities
+    run_a.qualityMetrics[2].value = {"MS:1000041": [1, 2, "3", 4],
+                                     "UO:0000191": [0.1, float('nan'), float('inf'), 0.1]}
+    run_b.qualityMetrics[1].value["MS:1000894"][1] = None
+    run_b.qualityMetrics.append(QualityMetric(accession="MS:4000110", name="mass accuracy matrix",
+                                              value=[[1.0, 2.0], [3.0]]))
+    run_b.qualityMetrics.append(QualityMetric(accession="MS:4000110", name="mass accuracy matrix",
+                                              value=[[1, 2], [3, "4"]]))
+    run_b.qualityMetrics.append(QualityMetric(accession="MS:4000110", name="mass accuracy matrix",
+                                              value=[[1.0, float('-inf')], [3.0, 4.0]]))
+    run_b.qualityMetrics.append(QualityMetric(accession="MS:4000110", name="mass accuracy matrix",
+                                              value=[1.0, 2.0]))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        sem_val = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+        sem_val.validate(load_local=True)
+
+    # repeated matrix metrics in one run also raise uniqueness and (unit-less) unit issues
+    shape_issues = [i for i in sem_val['metric use']
+                    if i.name not in {"Metric value undefined unit", "Metric uniqueness"}]
+    assert([i.name for i in shape_issues] == ["Metric value mixed-type column",
+                                              "Metric value non-finite",
+                                              "Metric value mixed-type column",
+                                              "Metric value non-rectangular matrix",
+                                              "Metric value mixed-type matrix",
+                                              "Metric value non-finite",
+                                              "Metric value non-matrix"])
+    # all deviating columns are reported with the one issue
+    assert(shape_issues[0].message.endswith("column(s) = MS:1000041"))
+    assert(shape_issues[2].message.endswith("column(s) = MS:1000894"))
+
+def test_SemanticCheck_value_shapes_large_integers():
+    # JSON integers beyond the float range are finite values, not a failure of the check
+    sem_val = SemanticCheck(mzqc_obj=load_local_example(), file_path="")
+    assert(sem_val._table_value_issues("MS:4000000", {"MS:1000041": [10**400, 1.0], "UO:0000191": [1, 2]}) == [])
+    assert([i.name for i in sem_val._table_value_issues("MS:4000000", {"MS:1000041": [10**400, float('nan')]})] ==
+           ["Metric value non-finite"])
+    assert(sem_val._matrix_value_issues("MS:4000110", [[10**400, 1.0], [2.0, 3.0]]) == [])
+
+@pytest.mark.parametrize("mode", ["sequential", "process", "incremental"])
+def test_SemanticCheck_validation_raw(local_cache, mode):
+    options = {"process": {"executor": "process"}, "incremental": {"incremental": True}}.get(mode, {})
+    for mzqcobject, outer in ((load_local_example(), True), (load_local_issues_example(), False)):
+        raw = json.loads(mzqc_io.to_json(mzqcobject))  # with the outer mzQC object
+        raw = raw if outer else raw['mzQC']
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            graph = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+            graph.validate(load_local=True)
+            plain = SemanticCheck(mzqc_obj=raw, file_path="")
+            plain.validate(load_local=True, **options)
+        assert(plain.string_export() == graph.string_export())
+        assert([(c.accession, c.name) for c in plain._get_cv_parameters(plain.mzqc_obj)] ==
+               [(c.accession, c.name) for c in graph._get_cv_parameters(mzqcobject)])
+
+@pytest.mark.parametrize("cvs_last", [False, True])
+def test_SemanticCheck_validation_streaming(local_cache, cvs_last):
+    import io
+    from mzqc.StreamReader import MzQcStreamReader
+    for mzqcobject in (load_local_example(), load_local_issues_example()):
+        raw = json.loads(mzqc_io.to_json(mzqcobject))
+        if cvs_last:  # the vocabularies are only known after reading the runs
+            raw['mzQC']['controlledVocabularies'] = raw['mzQC'].pop('controlledVocabularies')
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            graph = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+            graph.validate(load_local=True)
+            streamed = SemanticCheck(mzqc_obj=MzQcStreamReader(io.StringIO(json.dumps(raw)), chunk_size=64), file_path="")
+            streamed.validate(load_local=True)
+        assert(streamed.string_export() == graph.string_export())
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        broken = SemanticCheck(mzqc_obj=MzQcStreamReader(io.StringIO('{"mzQC": {"runQualities": [{}, ]}}')), file_path="")
+        broken.validate(load_local=True)
+    assert(broken._invalid_mzqc_obj)
+
+def test_SemanticCheck_validation_streaming_sets_first(local_cache):
+    import io
+    import copy
+    from mzqc.StreamReader import MzQcStreamReader
+    mzqcobject = load_local_issues_example()
+    run_a, run_b = mzqcobject.runQualities
+    mzqcobject.setQualities = [SetQuality(metadata=copy.deepcopy(run_b.metadata),
+                                          qualityMetrics=copy.deepcopy(run_b.qualityMetrics))]
+    raw = json.loads(mzqc_io.to_json(mzqcobject))
+    # the sets precede the runs in the document, their issues still follow those of the runs
+    raw['mzQC'] = {k: raw['mzQC'][k] for k in sorted(raw['mzQC'], key=lambda k: k != 'setQualities')}
+    assert(list(raw['mzQC']).index('setQualities') < list(raw['mzQC']).index('runQualities'))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        graph = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+        graph.validate(load_local=True)
+        streamed = SemanticCheck(mzqc_obj=MzQcStreamReader(io.StringIO(json.dumps(raw)), chunk_size=64), file_path="")
+        streamed.validate(load_local=True)
+    assert(len(graph['label uniqueness']) == 2)
+    assert(streamed.string_export() == graph.string_export())
+
+def test_SemanticCheck_validation_streaming_not_rewindable(local_cache, monkeypatch):
+    import io
+    import tempfile
+    from mzqc import SemanticCheck as semantic_check
+    from mzqc.StreamReader import MzQcStreamReader
+    class Pipe(io.RawIOBase):  # read once only, like stdin or a request body
+        def __init__(self, data):
+            self._data = io.BytesIO(data)
+        def readable(self):
+            return True
+        def readinto(self, b):
+            return self._data.readinto(b)
+
+    # the runs before the vocabularies are spooled, rolled over to disk past the spool size
+    monkeypatch.setattr(semantic_check, 'PENDING_SPOOL_SIZE', 1)
+    spools = list()
+    spooled = tempfile.SpooledTemporaryFile
+    def record_spool(*args, **kwargs):
+        spools.append(spooled(*args, **kwargs))
+        return spools[-1]
+    monkeypatch.setattr(tempfile, 'SpooledTemporaryFile', record_spool)
+
+    mzqcobject = load_local_issues_example()
+    raw = json.loads(mzqc_io.to_json(mzqcobject))
+    raw['mzQC']['controlledVocabularies'] = raw['mzQC'].pop('controlledVocabularies')
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        graph = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+        graph.validate(load_local=True)
+        reader = MzQcStreamReader(Pipe(json.dumps(raw).encode()), chunk_size=64)
+        assert(not reader.rewindable)
+        streamed = SemanticCheck(mzqc_obj=reader, file_path="")
+        streamed.validate(load_local=True)
+    assert(streamed.string_export() == graph.string_export())
+    assert(spools[0]._rolled and all(spool.closed for spool in spools))
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_SemanticCheck_validation_parallel(local_cache, executor):
+    mzqcobject = load_local_issues_example()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        sequential = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+        sequential.validate(load_local=True)
+        parallel = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+        parallel.validate(load_local=True, executor=executor)
+    assert(parallel.string_export() == sequential.string_export())
+    assert(parallel.issue_count == sequential.issue_count)
+
+    # the abort happens at the same issue as in a sequential validation
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        with pytest.raises(ValidationError):
+            sequential.validate(load_local=True, max_errors=4)
+        with pytest.raises(ValidationError):
+            parallel.validate(load_local=True, max_errors=4, executor=executor)
+    assert(parallel.string_export() == sequential.string_export())
+
+def test_SemanticCheck_validation_parallel_executor(local_cache):
+    from concurrent.futures import ThreadPoolExecutor
+    mzqcobject = load_local_example()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            sem_val = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+            sem_val.validate(load_local=True, executor=pool)
+    assert(sem_val.issue_count == 1)  # Loading local vocabulary
+    with pytest.raises(ValueError):
+        sem_val.validate(executor="fibers")
+
+def test_SemanticCheck_validation_incremental(local_cache, monkeypatch):
+    mzqcobject = load_local_issues_example()
+    checked_runs = list()
+    metric_issues = SemanticCheck._quality_metric_issues
+    def counting_check(self, run_or_set_quality, *args):
+        checked_runs.append(run_or_set_quality.metadata.label)
+        return metric_issues(self, run_or_set_quality, *args)
+    monkeypatch.setattr(SemanticCheck, "_quality_metric_issues", counting_check)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        sem_val = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+        sem_val.validate(load_local=True, incremental=True)
+        assert(len(checked_runs) == 2)
+        full = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+        full.validate(load_local=True)
+    assert(sem_val.string_export() == full.string_export())
+
+    # unchanged file, nothing is rechecked
+    checked_runs.clear()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        sem_val.validate(load_local=True, incremental=True)
+    assert(checked_runs == [])
+    assert(sem_val.string_export() == full.string_export())
+
+    # one run changed, cross-run results are updated from the summaries
+    run_a, run_b = mzqcobject.runQualities
+    run_b.metadata.label = "run_b"
+    run_b.metadata.inputFiles[0].location = run_a.metadata.inputFiles[0].location
+    run_b.metadata.inputFiles[0].name = run_a.metadata.inputFiles[0].name
+    del run_b.qualityMetrics[-3:]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        sem_val.validate(load_local=True, incremental=True)
+        assert(checked_runs == ["run_b"])
+        full.validate(load_local=True)
+    assert(sem_val.string_export() == full.string_export())
+    assert(sem_val['label uniqueness'] == [])
+    assert(len(sem_val._incremental_state['qualities']) == 2)
+
+    # vocabulary changes invalidate all vocabulary dependent results
+    checked_runs.clear()
+    local_cache.clear()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        sem_val.validate(load_local=True, incremental=True)
+    assert(sorted(checked_runs) == ["run_a", "run_b"])
+    assert(sem_val.string_export() == full.string_export())
+
+def test_SemanticCheck_profiles(local_cache, monkeypatch):
+    mzqcobject = load_local_issues_example()
+    def no_loading(*args, **kwargs):
+        raise AssertionError("structural validation must not load vocabularies")
+    monkeypatch.setattr(local_cache, "load_index", no_loading)
+    sem_val = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+    sem_val.validate(load_local=True, profile='structural')
+    assert(set(sem_val.keys()) == {'label uniqueness', 'input files'})
+    assert([i.name for i in sem_val['label uniqueness']] == ["Metadata labels"])
+    # the time spent is recorded for the checks run only
+    assert(set(sem_val.timings) == {'label uniqueness', 'input files'})
+    assert(all(t >= 0 for t in sem_val.timings.values()))
+    sem_val.validate(load_local=True, profile='structural', executor='thread')
+    assert(set(sem_val.keys()) == {'label uniqueness', 'input files'})
+    assert(set(sem_val.timings) == {'label uniqueness', 'input files'})
+    sem_val.validate(load_local=True, profile='structural', incremental=True)
+    assert(set(sem_val.keys()) == {'label uniqueness', 'input files'})
+    assert(set(sem_val.timings) == {'label uniqueness', 'input files'})
+    monkeypatch.undo()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        sem_val.validate(load_local=True, profile='structural', enable=['metric use'], disable=['input files'])
+    # vocabulary dependent checks imply loading the vocabularies
+    assert(set(sem_val.keys()) == {'label uniqueness', 'ontology load errors', 'metric use'})
+    assert(len(sem_val['metric use']) == 6)
+    assert(set(sem_val.timings) == {'label uniqueness', 'ontology load errors', 'metric use'})
+    # also for the parallel and incremental validation
+    for options in ({'executor': 'thread'}, {'incremental': True}):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            sem_val.validate(load_local=True, enable=['ontology term errors'], **options)
+        assert(set(sem_val.timings) == set(sem_val.keys()))
+        assert(all(t >= 0 for t in sem_val.timings.values()))
+
+    with pytest.raises(ValueError):
+        sem_val.validate(profile='quick')
+    with pytest.raises(ValueError):
+        sem_val.validate(disable=['metric usage'])
+
+def test_SemanticCheck_profiles_no_pronto():
+    import subprocess, sys
+    script = ("import sys; from mzqc.MZQCFile import JsonSerialisable as mzqc_io; "
+              "from mzqc.SemanticCheck import SemanticCheck; "
+              "s = SemanticCheck(mzqc_io.from_json(open('tests/examples/local-runs.mzQC').read())); "
+              "s.validate(load_local=True, profile='structural'); "
+              "sys.exit('pronto' in sys.modules)")
+    assert(subprocess.run([sys.executable, "-c", script]).returncode == 0)
+
+@pytest.mark.parametrize("executor", [None, "thread"])
+def test_SemanticCheck_time_budget(local_cache, monkeypatch, executor):
+    mzqcobject = load_local_issues_example()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        unlimited = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+        unlimited.validate(load_local=True, executor=executor)
+        budgeted = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+        budgeted.validate(load_local=True, executor=executor, time_budget=60)
+        assert(budgeted.string_export() == unlimited.string_export() and not budgeted._exceeded_time)
+
+        # out of time before the first check
+        with pytest.raises(ValidationError):
+            budgeted.validate(load_local=True, executor=executor, deadline=time.monotonic()-1)
+        assert(budgeted._exceeded_time and not budgeted._exceeded_errors)
+        assert([i.name for i in budgeted['general']] == ["Time budget exceeded"])
+
+        # out of time during the metric use checks, the issues found until then are kept
+        check = SemanticCheck._quality_metric_issues
+        def slow_check(self, *args):
+            time.sleep(0.2)
+            return check(self, *args)
+        monkeypatch.setattr(SemanticCheck, '_quality_metric_issues', slow_check)
+        with pytest.raises(ValidationError):
+            budgeted.validate(load_local=True, executor=executor, time_budget=0.1)
+    assert(budgeted['label uniqueness'] == unlimited['label uniqueness'])
+    assert(budgeted['ontology term errors'] == unlimited['ontology term errors'])
+    assert(len(budgeted['metric use']) < len(unlimited['metric use']))
+    assert('input files' not in budgeted or not budgeted['input files'])
+    assert(budgeted._exceeded_time)
+
+def test_SemanticCheck_CVTerm_checked_once(local_cache, monkeypatch):
+    mzqcobject = load_local_example()
+    mzqcobject.runQualities[1].qualityMetrics[0].name = "number of MS2 spectra"
+    mzqcobject.runQualities.append(mzqcobject.runQualities[1])
+    calls = list()
+    check = SemanticCheck._check_CVTerm
+    def counting_check(self, issue_type_category, cv_parameter, file_vocabularies):
+        calls.append(cv_parameter.accession)
+        return check(self, issue_type_category, cv_parameter, file_vocabularies)
+    monkeypatch.setattr(SemanticCheck, '_check_CVTerm', counting_check)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        sem_val = SemanticCheck(mzqc_obj=mzqcobject, file_path="")
+        sem_val.validate(load_local=True)
+
+    occurrences = list(sem_val._get_cv_parameters(mzqcobject))
+    assert(len(calls) == len({(c.accession, c.name, c.description) for c in occurrences}) < len(occurrences))
+    # every occurrence still registers its issues
+    assert([i.name for i in sem_val['ontology term errors']] == ["Used CVTerms name conflict"]*2)
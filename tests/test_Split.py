@@ -0,0 +1,105 @@
+__author__ = 'walzer'
+import pytest  # Eeeeeeverything needs to be prefixed with test in order to be picked up by pytest, i.e. TestClass() and test_function()
+import os
+import json
+from click.testing import CliRunner
+from mzqc.ResourceCache import OntologyCache
+from mzqcaccessories.filehandling import mzqc_split as split
+
+"""
+    mzQC split tests with pymzqc
+"""
+
+OBO = "tests/examples/local-qc-test.obo"
+
+def read_shards(outdir):
+    shards = dict()
+    for name in sorted(os.listdir(outdir)):
+        with open(os.path.join(outdir, name), 'r') as f:
+            shards[name] = json.load(f)['mzQC']
+    return shards
+
+def test_mzqcsplit_runs(tmp_path, mzqc_builder):
+    infile = mzqc_builder.write(tmp_path / "big.mzQC",
+                                [mzqc_builder.quality("r{}".format(i), "MS:4000059") for i in range(5)],
+                                [mzqc_builder.quality("set", "MS:4000060")])
+    outdir = str(tmp_path / "shards")
+    result = CliRunner().invoke(split.mzqcsplit, [infile, outdir, '-n', '2', '--all-cvs'])
+    assert(result.exit_code == 0)
+    shards = read_shards(outdir)
+    assert(sorted(shards) == ["big.sets.mzQC", "big_00000.mzQC", "big_00001.mzQC", "big_00002.mzQC"])
+    assert([[r['metadata']['label'] for r in shards[name]['runQualities']] for name in sorted(shards)[1:]] ==
+           [["r0", "r1"], ["r2", "r3"], ["r4"]])
+    assert(shards["big.sets.mzQC"]['setQualities'][0]['metadata']['label'] == "set")
+    assert(all(s['creationDate'] == "2020-12-01T11:56:34" and len(s['controlledVocabularies']) == 1
+               for s in shards.values()))
+
+def test_mzqcsplit_one_run_each(tmp_path, mzqc_builder):
+    # by default one run per shard, the header members other than the qualities go to every shard
+    infile = mzqc_builder.write(tmp_path / "small.mzQC", [mzqc_builder.quality(l, "MS:4000059") for l in "ab"],
+                                contactName="tester", description="two runs")
+    outdir = str(tmp_path / "shards")
+    result = CliRunner().invoke(split.mzqcsplit, [infile, outdir, '--all-cvs'])
+    assert(result.exit_code == 0 and "Split into 2 shards." in result.output)
+    shards = read_shards(outdir)
+    assert(sorted(shards) == ["small_00000.mzQC", "small_00001.mzQC"])
+    assert(all((s['contactName'], s['description']) == ("tester", "two runs") and 'setQualities' not in s
+               for s in shards.values()))
+
+def test_mzqcsplit_label_prefix(tmp_path, monkeypatch, mzqc_builder):
+    # more label prefixes than open shards, interleaved, one named as the sets shard used to be
+    monkeypatch.setattr(split, 'MAX_OPEN_SHARDS', 2)
+    labels = ["a-1", "b-1", "c-1", "sets-1", "a-2", "c-2", "b-2", "sets-2", "a-3"]
+    infile = mzqc_builder.write(tmp_path / "big.mzQC", [mzqc_builder.quality(label, "MS:4000059") for label in labels],
+                                [mzqc_builder.quality("set", "MS:4000060")])
+    outdir = str(tmp_path / "shards")
+    result = CliRunner().invoke(split.mzqcsplit, [infile, outdir, '-l', '-', '--all-cvs'])
+    assert(result.exit_code == 0)
+    shards = read_shards(outdir)
+    assert(sorted(shards) == ["big.sets.mzQC", "big_a.mzQC", "big_b.mzQC", "big_c.mzQC", "big_sets.mzQC"])
+    assert([r['metadata']['label'] for r in shards["big_a.mzQC"]['runQualities']] == ["a-1", "a-2", "a-3"])
+    assert([r['metadata']['label'] for r in shards["big_sets.mzQC"]['runQualities']] == ["sets-1", "sets-2"])
+    assert(len(shards["big.sets.mzQC"]['setQualities']) == 1)
+
+    result = CliRunner().invoke(split.mzqcsplit, [infile, outdir, '-l', ''])
+    assert(result.exit_code == 2 and "--label-prefix" in result.output)
+
+def test_mzqcsplit_controlled_vocabularies(tmp_path, monkeypatch, mzqc_builder):
+    monkeypatch.setattr(split, 'ontology_cache', OntologyCache(cache_dir=str(tmp_path / "ontologies")))
+    cvs = [{'name': "local", 'uri': "file://" + os.path.abspath(OBO), 'version': ""},
+           {'name': "missing", 'uri': "file://" + str(tmp_path / "missing.obo"), 'version': ""},
+           {'name': "other", 'uri': "file://" + os.path.abspath(OBO), 'version': ""}]
+    # the local vocabulary is loaded under both names, a shard referencing no term keeps only the unknown one
+    run = mzqc_builder.quality("run", "MS:4000059")
+    bare = mzqc_builder.quality("bare", input_files=[], analysis_software=[])
+    infile = mzqc_builder.write(tmp_path / "big.mzQC", [run, bare], controlled_vocabularies=cvs)
+    outdir = str(tmp_path / "shards")
+    result = CliRunner().invoke(split.mzqcsplit, [infile, outdir])
+    assert(result.exit_code == 0)
+    shards = read_shards(outdir)
+    assert(shards["big_00000.mzQC"]['controlledVocabularies'] == cvs)
+    assert(shards["big_00001.mzQC"]['controlledVocabularies'] == [cvs[1]])
+
+def test_mzqcsplit_unreadable(tmp_path, mzqc_builder):
+    outdir = str(tmp_path / "shards")
+    notmzqc = tmp_path / "notmzqc.mzQC"
+    notmzqc.write_text("not JSON")
+    result = CliRunner().invoke(split.mzqcsplit, [str(notmzqc), outdir])
+    assert(result.exit_code == 2 and "No mzQC structure detected" in result.output)
+
+    # cut off after the first run: the header (with the controlledVocabularies after the runs) is incomplete
+    infile = mzqc_builder.write(tmp_path / "big.mzQC", [mzqc_builder.quality(l, "MS:4000059") for l in "ab"])
+    with open(infile, 'r') as f:
+        content = f.read()
+    truncated = tmp_path / "truncated.mzQC"
+    truncated.write_text(content[:content.index('{"metadata"', content.index('"label": "a"'))])
+    result = CliRunner().invoke(split.mzqcsplit, [str(truncated), outdir, '--all-cvs'])
+    assert(result.exit_code == 2 and "No mzQC structure detected" in result.output)
+    assert(not os.path.exists(outdir))
+
+def test_vocabulary_prefixes(tmp_path, monkeypatch):
+    monkeypatch.setattr(split, 'ontology_cache', OntologyCache(cache_dir=str(tmp_path / "ontologies")))
+    prefixes = split.vocabulary_prefixes([{'name': "local", 'uri': "file://" + os.path.abspath(OBO)},
+                                          {'name': "missing", 'uri': "file://" + str(tmp_path / "missing.obo")}])
+    assert(prefixes[0] >= {"MS", "UO"})
+    assert(prefixes[1] is None)
@@ -0,0 +1,112 @@
+__author__ = 'walzer'
+import pytest  # Eeeeeeverything needs to be prefixed with test in order to be picked up by pytest, i.e. TestClass() and test_function()
+import io
+import gzip
+import json
+import tempfile
+from mzqc.StreamReader import MzQcStreamReader
+
+"""
+    Streaming (incremental) reader tests with pymzqc
+"""
+
+LOCAL = "tests/examples/local-runs.mzQC"
+
+def load_local_json():
+    with open(LOCAL, 'r') as f:
+        return json.load(f)
+
+class NonSeekable(io.RawIOBase):
+    """A binary stream that can only be read once, like a pipe or a request body"""
+    def __init__(self, data: bytes):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self._data.readinto(b)
+
+def test_StreamReader_records():
+    doc = load_local_json()
+    reader = MzQcStreamReader(LOCAL, chunk_size=7)  # values span many buffer refills
+    records = list(reader)
+    assert(records == [('runQualities', r) for r in doc['mzQC']['runQualities']])
+    assert(reader.complete)
+    assert(reader.counts == {'runQualities': len(doc['mzQC']['runQualities']), 'setQualities': 0})
+    assert(reader.outer == {})
+    header = {k: v for k, v in doc['mzQC'].items() if k != 'runQualities'}
+    assert({k: v for k, v in reader.header.items() if k != 'runQualities'} == header)
+    assert(reader.header['runQualities'] is None)
+    assert(list(reader) == records)  # paths are read anew on each iteration
+
+def test_StreamReader_no_outer():
+    doc = load_local_json()['mzQC']
+    doc['setQualities'] = []
+    reader = MzQcStreamReader(io.StringIO(json.dumps(doc)))
+    assert(reader.outer is None and not reader.complete)
+    header = reader.read_header()
+    assert(reader.complete and reader.outer is None)
+    assert(header['setQualities'] == [] and header['version'] == doc['version'])
+    assert(len(list(reader)) == len(doc['runQualities']))
+
+def test_StreamReader_header_after_runs():
+    doc = load_local_json()
+    mzqc = doc['mzQC']
+    doc['mzQC'] = {'runQualities': mzqc.pop('runQualities'), **mzqc}
+    reader = MzQcStreamReader(io.StringIO(json.dumps(doc, indent=2)), chunk_size=16)
+    assert(reader.rewindable)
+    first_key, _ = next(iter(reader))
+    assert(first_key == 'runQualities' and 'controlledVocabularies' not in reader.header)
+    assert(reader.read_header()['controlledVocabularies'] == mzqc['controlledVocabularies'])
+
+def test_StreamReader_gzip_and_binary(tmp_path):
+    with open(LOCAL, 'rb') as f:
+        data = f.read()
+    local = tmp_path / "local-runs.mzQC.gz"
+    local.write_bytes(gzip.compress(data))
+    expected = list(MzQcStreamReader(LOCAL))
+    assert(list(MzQcStreamReader(str(local))) == expected)
+    with open(str(local), 'rb') as f:
+        assert(list(MzQcStreamReader(f)) == expected)
+        assert(not f.closed)
+
+    reader = MzQcStreamReader(NonSeekable(data))
+    assert(not reader.rewindable)
+    assert(list(reader) == expected)
+
+    # seekable files without peek (e.g. spooled uploads) are buffered, but stay open for rereading
+    with tempfile.SpooledTemporaryFile() as f:
+        f.write(data)
+        f.seek(0)
+        reader = MzQcStreamReader(f)
+        reader.read_header()
+        assert(list(reader) == expected)
+        assert(not f.closed)
+
+def test_StreamReader_replace():
+    doc = load_local_json()
+    reader = MzQcStreamReader(LOCAL, replace={'controlledVocabularies': []})
+    header = reader.read_header()
+    assert(header['controlledVocabularies'] == [])
+    assert(header['version'] == doc['mzQC']['version'])
+
+@pytest.mark.parametrize("text", ['', '[]', '{"mzQC": {"runQualities": [{}, }}', '{"mzQC": {}} {}',
+                                  '{"mzQC": {"version" "1.0.0"}}'])
+def test_StreamReader_invalid(text):
+    with pytest.raises(ValueError):
+        MzQcStreamReader(io.StringIO(text)).read_header()
+
+def test_StreamReader_malformed_fails_early():
+    # a malformed token early on fails without buffering the rest of the document
+    runs = ', '.join(['{"metadata": {"label": "%d"}, "qualityMetrics": []}' % i for i in range(20000)])
+    stream = io.StringIO('{"mzQC": {"runQualities": [{"metadata": {"label": tru}}, ' + runs + ']}}')
+    with pytest.raises(ValueError):
+        list(MzQcStreamReader(stream, chunk_size=1024))
+    assert(stream.tell() < 4096)
+
+    # values and literals split across chunks are still read
+    doc = '{"mzQC": {"runQualities": [{"metadata": {"label": "a\\u00e9"}, "qualityMetrics": [true, null, -1.5e3]}]}}'
+    for chunk_size in range(1, 12):
+        assert(list(MzQcStreamReader(io.StringIO(doc), chunk_size=chunk_size)) ==
+               [('runQualities', json.loads(doc)['mzQC']['runQualities'][0])])
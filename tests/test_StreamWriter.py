@@ -0,0 +1,50 @@
+__author__ = 'walzer'
+import pytest  # Eeeeeeverything needs to be prefixed with test in order to be picked up by pytest, i.e. TestClass() and test_function()
+import json
+from mzqc.StreamReader import MzQcStreamReader
+from mzqc.StreamWriter import ShardWriter, accessions
+
+"""
+    Streaming (incremental) writer tests with pymzqc
+"""
+
+def test_accessions(mzqc_builder):
+    run = mzqc_builder.quality("run", "MS:4000059", "MS:4000060")
+    run['qualityMetrics'][0]['unit'] = {'accession': "UO:0000189", 'name': "count unit"}
+    assert(list(accessions(run)) == ["MS:1000584", "MS:1000752", "MS:4000059", "UO:0000189", "MS:4000060"])
+    assert(list(accessions({'accession': 5, 'values': [{'accession': "XX:1"}]})) == ["XX:1"])
+
+def test_ShardWriter(tmp_path, mzqc_builder):
+    path = str(tmp_path / "written.mzQC")
+    shard = ShardWriter(path, {'version': "1.0.0", 'creationDate': "2020-12-01T11:56:34"})
+    for label in ("one", "two"):
+        shard.add(mzqc_builder.quality(label, "MS:4000059"))
+    shard.begin('setQualities')
+    shard.add(mzqc_builder.quality("set", "MS:4000060"))
+    shard.close([{'name': "PSI-MS"}])
+    assert(shard.count == 3 and shard.prefixes == {"MS"})
+    # read back one run or set at a time
+    reader = MzQcStreamReader(path)
+    assert([(kind, q['metadata']['label']) for kind, q in reader] ==
+           [('runQualities', "one"), ('runQualities', "two"), ('setQualities', "set")])
+    assert(reader.header['creationDate'] == "2020-12-01T11:56:34")
+
+def test_ShardWriter_suspend(tmp_path, mzqc_builder):
+    path = str(tmp_path / "shard.mzQC")
+    shard = ShardWriter(path, {'version': "1.0.0"})
+    shard.add(mzqc_builder.quality("one", "MS:4000059"))
+    shard.suspend()
+    assert(shard.suspended)
+    shard.add(mzqc_builder.quality("two", "UO:0000010"))
+    shard.begin('setQualities')
+    shard.suspend()
+    shard.add(mzqc_builder.quality("set", "MS:4000060"))
+    shard.suspend()
+    cvs = [{'name': "PSI-MS"}, {'name': "Other"}, {'name': "Unknown"}]
+    # only the vocabularies with referenced terms, or of unknown terms
+    shard.close(cvs, [{"MS", "UO"}, {"XX"}, None])
+    with open(path, 'r') as f:
+        written = json.load(f)['mzQC']
+    assert([r['metadata']['label'] for r in written['runQualities']] == ["one", "two"])
+    assert(len(written['setQualities']) == 1)
+    assert(written['controlledVocabularies'] == [cvs[0], cvs[2]])
@@ -1,6 +1,7 @@
 __author__ = 'walzer'
 import pytest  # Eeeeeeverything needs to be prefixed with test in order to be picked up by pytest, i.e. TestClass() and test_function()
 import json
+import time
 from mzqc.MZQCFile import MzQcFile as mzqc_file
 import mzqc.MZQCFile as mzqc_lib
 from mzqc.SyntaxCheck import SyntaxCheck
@@ -61,3 +62,35 @@ def test_SyntaxCheck_noOuter():
     syn_val = SyntaxCheck().validate(inpu)
     offenders = ["Additional properties are not allowed (", "controlledVocabularies", "creationDate", "version", "description", "contactAddress", "contactName", "runQualities", "were unexpected) @"]
     assert( all([x in syn_val.get('schema validation',"") for x in offenders] ))
+
+@pytest.fixture
+def local_schema(monkeypatch):
+    """Serves the schema from tests/schema.json instead of the mzQC repository"""
+    from mzqc import ResourceCache
+    class LocalSchema(object):
+        def get(self, url, fetcher=None):
+            with open("tests/schema.json", 'r') as schema_in:
+                return schema_in.read()
+    monkeypatch.setattr(ResourceCache, 'document_cache', LocalSchema())
+
+@pytest.mark.parametrize("infi", ["tests/examples/individual-runs_brokenAnalysisSoftware.mzQC",
+                                  "tests/examples/individual-runs_extraJSONcontent.mzQC",
+                                  "tests/examples/local-runs.mzQC"])
+def test_SyntaxCheck_time_budget(local_schema, infi):
+    with open(infi, 'r') as f:
+        inpu = f.read()
+    syn_check = SyntaxCheck()
+    assert(syn_check.validate(inpu, time_budget=60) == syn_check.validate(inpu))
+    syn_val = syn_check.validate(inpu, deadline=time.monotonic()-1)
+    assert(syn_val.get('schema validation',"").startswith("Schema validation time budget exceeded"))
+
+@pytest.mark.parametrize("infi", ["tests/examples/individual-runs_brokenAnalysisSoftware.mzQC",
+                                  "tests/examples/individual-runs_extraJSONcontent.mzQC",
+                                  "tests/examples/individual-runs-noOuter.json",
+                                  "tests/examples/local-runs.mzQC"])
+def test_SyntaxCheck_validate_stream(local_schema, infi):
+    from mzqc.StreamReader import MzQcStreamReader
+    with open(infi, 'r') as f:
+        inpu = f.read()
+    syn_check = SyntaxCheck()
+    assert(syn_check.validate_stream(MzQcStreamReader(infi, chunk_size=32)) == syn_check.validate(inpu))
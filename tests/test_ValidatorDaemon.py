@@ -0,0 +1,117 @@
+__author__ = 'walzer'
+import pytest  # Eeeeeeverything needs to be prefixed with test in order to be picked up by pytest, i.e. TestClass() and test_function()
+import io
+import json
+import http.client
+import threading
+from mzqc.OboLoader import load_vocabulary
+from mzqc.ResourceCache import ValidationResultCache
+from mzqcaccessories.offlinevalidator import mzqc_offline_validator as validator
+from mzqcaccessories.offlinevalidator import mzqc_validator_daemon as daemon
+
+"""
+    Validator daemon tests with pymzqc
+
+    NOTE: schema and ontology come from a resource bundle (see offline_resources in conftest.py).
+"""
+
+OBO = "tests/examples/local-qc-test.obo"
+PSI_MS = "https://github.com/HUPO-PSI/psi-ms-CV/releases/download/v4.1.186/psi-ms.obo"
+EXAMPLE = "tests/examples/individual-runs.mzQC"
+
+def use_result_cache(tmp_path, monkeypatch):
+    """Has the validator use a fresh result cache in tmp_path"""
+    monkeypatch.setattr(validator, 'result_cache', ValidationResultCache(cache_dir=str(tmp_path / "results")))
+
+def start_daemon(address="127.0.0.1:0", root=None):
+    """Runs a daemon on a free port in a thread, returns it and the address to send to"""
+    server = daemon.ValidatorDaemon(address, root)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "127.0.0.1:{}".format(server.server_address[1])
+
+def request(address, method, url, body=b''):
+    connection = http.client.HTTPConnection(*validator.parse_address(address))
+    try:
+        connection.request(method, url, body=body)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+class RecordingCache(object):
+    """Records the (URI, version) of the indices loaded"""
+    def __init__(self):
+        self.loaded = list()
+
+    def load_index(self, uri, version=""):
+        self.loaded.append((uri, version))
+        return load_vocabulary(OBO)  # data-version 4.1.999
+
+def test_parse_ontology():
+    assert(daemon.parse_ontology("https://example.org/cv.obo@4.1.186") == ("https://example.org/cv.obo", "4.1.186"))
+    assert(daemon.parse_ontology("https://example.org/cv.obo") == ("https://example.org/cv.obo", ""))
+    assert(daemon.parse_ontology("https://user@example.org/cv.obo") == ("https://user@example.org/cv.obo", ""))
+
+def test_ValidatorDaemon_warm_up(offline_resources, monkeypatch):
+    cache = RecordingCache()
+    monkeypatch.setattr(daemon, 'ontology_cache', cache)
+    server = daemon.ValidatorDaemon("127.0.0.1:0")
+    try:
+        server.warm_up(["https://example.org/pinned.obo@1.0", "https://example.org/latest.obo"])
+    finally:
+        server.server_close()
+    # loaded under the versions declared in the files: given, current data-version, bundled
+    assert(("https://example.org/pinned.obo", "1.0") in cache.loaded)
+    assert(("https://example.org/latest.obo", "") in cache.loaded)
+    assert(("https://example.org/latest.obo", "4.1.999") in cache.loaded)
+    assert(("https://example.org/pinned.obo", "4.1.999") not in cache.loaded)
+    assert((PSI_MS, "4.1.186") in cache.loaded)
+
+def test_ValidatorDaemon_requests(offline_resources, tmp_path, monkeypatch):
+    use_result_cache(tmp_path, monkeypatch)
+    server, address = start_daemon()
+    try:
+        status, body = request(address, 'GET', '/status')
+        assert(status == 200 and body['status'] == 'running' and body['validated'] == 0)
+        assert(request(address, 'GET', '/nothing')[0] == 404)
+        assert(request(address, 'POST', '/validate?profile=nothing')[0] == 400)
+
+        by_path = validator.request_validation(address, path=EXAMPLE)
+        with open(EXAMPLE, 'rb') as f:
+            by_body = validator.request_validation(address, document=f.read())
+        assert(by_path == by_body == validator.validate_path(EXAMPLE)[1])
+        assert(request(address, 'GET', '/status')[1]['validated'] == 2)
+
+        # a batch sent to the daemon, unreadable files are reported as failed
+        out = io.StringIO()
+        missing = str(tmp_path / "missing.mzQC")
+        assert(validator.validate_batch([EXAMPLE, missing], out, workers=2, daemon=address) == validator.EXIT_FAILED)
+        results = {line['file']: line['result'] for line in map(json.loads, out.getvalue().splitlines())}
+        assert(results[EXAMPLE] == by_path and 'general' in results[missing])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_ValidatorDaemon_path_restriction(offline_resources, tmp_path, monkeypatch):
+    use_result_cache(tmp_path, monkeypatch)
+    root = tmp_path / "root"
+    root.mkdir()
+    inside = root / "inside.mzQC"
+    with open(EXAMPLE, 'rb') as f:
+        inside.write_bytes(f.read())
+    public, public_address = start_daemon("0.0.0.0:0")
+    rooted, rooted_address = start_daemon(root=str(root))
+    try:
+        # not on loopback only, files are read for no one ...
+        assert(request(public_address, 'POST', '/validate?path=' + str(inside))[0] == 403)
+        with open(EXAMPLE, 'rb') as f:
+            assert(request(public_address, 'POST', '/validate', body=f.read())[0] == 200)
+        # ... and with a root only below it
+        assert(request(rooted_address, 'POST', '/validate?path=' + str(inside))[0] == 200)
+        assert(request(rooted_address, 'POST', '/validate?path=' + str(root / ".." / "resources.zip"))[0] == 403)
+        with pytest.raises(ConnectionError):
+            validator.request_validation(rooted_address, path=EXAMPLE)
+    finally:
+        for server in (public, rooted):
+            server.shutdown()
+            server.server_close()
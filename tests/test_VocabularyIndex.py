@@ -0,0 +1,95 @@
+__author__ = 'walzer'
+import pytest  # Eeeeeeverything needs to be prefixed with test in order to be picked up by pytest, i.e. TestClass() and test_function()
+import warnings
+from pronto import Ontology
+from mzqc.VocabularyIndex import VocabularyIndex, TermRecord, INDEX_FORMAT
+from mzqc.ResourceCache import OntologyCache
+
+"""
+    Vocabulary index tests with pymzqc
+
+    NOTE: the index is compiled from a local excerpt of PSI-MS and UO
+"""
+
+OBO = "tests/examples/local-qc-test.obo"
+
+@pytest.fixture(scope="module")
+def index():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return VocabularyIndex.from_ontology(Ontology(OBO, import_depth=0))
+
+def test_TermRecord_str():
+    tr = TermRecord(id="MS:4000059", name="number of MS1 spectra")
+    assert(str(tr) == "Term('MS:4000059', name='number of MS1 spectra')")
+    assert(TermRecord._from_dict(tr._to_dict()) == tr)
+
+def test_VocabularyIndex_sets(index):
+    assert(index.data_version == "4.1.999")
+    assert({'MS:4000002', 'MS:4000059', 'MS:4000063', 'MS:4000104', 'MS:1002404'}.issubset(index.metrics))
+    assert('UO:0000010' not in index.metrics)
+    assert(index.tables == {'MS:4000005', 'MS:4000063', 'MS:4000104'})
+    assert(index.matrices == {'MS:4000006', 'MS:4000110'})
+    assert(index.idmetrics == {'MS:1002404'})
+    assert(index.idfiles == {'MS:1002130', 'MS:1002073'})
+
+def test_VocabularyIndex_terms(index):
+    tic = index['MS:4000104']
+    assert(tic.name == "total ion currents")
+    assert(tic.required_columns == {'MS:1000285', 'MS:1000894'})
+    assert(tic.optional_columns == {'MS:1000767'})
+    assert(index['MS:4000070'].units == ('UO:0000010',))
+    assert(index['MS:4000070'].definition == "Upper and lower limit of retention time at which spectra are recorded.")
+    assert(index['UO:0000191'].is_unit)
+    assert(not index['UO:0000000'].is_unit)  # strict descendants only
+    assert(not index['MS:4000059'].is_unit)
+    assert(index.get('MS:0000000') is None)
+
+def test_VocabularyIndex_persistence(index, tmp_path):
+    target = str(tmp_path / "index.json")
+    index.save(target)
+    restored = VocabularyIndex.load(target)
+    assert(restored.terms == index.terms)
+    assert(restored.metrics == index.metrics and restored.tables == index.tables)
+    assert(restored.idmetrics == index.idmetrics and restored.idfiles == index.idfiles)
+
+    outdated = index.to_dict()
+    outdated['format'] = INDEX_FORMAT - 1
+    with pytest.raises(ValueError):
+        VocabularyIndex.from_dict(outdated)
+
+def test_OntologyCache_index(tmp_path):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        OntologyCache(cache_dir=str(tmp_path)).load_index(OBO, "4.1.999")
+        fresh = OntologyCache(cache_dir=str(tmp_path))
+        idx = fresh.load_index(OBO, "4.1.999")
+    # the persisted index is used without loading the ontology
+    assert(fresh.misses == 0 and len(fresh._memory) == 0)
+    assert(idx.tables == {'MS:4000005', 'MS:4000063', 'MS:4000104'})
+
+def test_VocabularyIndex_ancestors(index):
+    assert(index.ancestors('UO:0000191') == {'UO:0000190', 'UO:0000000'})
+    assert(index.ancestors('MS:4000104') == {'MS:4000005', 'MS:4000002'})
+    assert(index.ancestors('MS:0000000') == frozenset())
+    # memoized, including the closures visited on the way
+    assert('UO:0000190' in index._ancestors)
+    assert(index.ancestors('UO:0000191') is index.ancestors('UO:0000191'))
+
+def test_VocabularyIndex_ancestors_cycle():
+    cyclic = VocabularyIndex({'A:1': TermRecord(id='A:1', name='a', parents=frozenset({'A:2'})),
+                              'A:2': TermRecord(id='A:2', name='b', parents=frozenset({'A:1'}))})
+    assert(cyclic.ancestors('A:1') == {'A:1', 'A:2'})
+
+def test_VocabularyIndex_from_ontology_dangling(tmp_path):
+    # relations to terms of ontologies that are not imported are kept by accession
+    path = tmp_path / "dangling.obo"
+    path.write_text("format-version: 1.2\ndata-version: 1.0\nontology: test\n\n"
+                    "[Term]\nid: T:1\nname: one\ndef: \"The first.\" []\n\n"
+                    "[Term]\nid: T:2\nname: two\nis_a: T:1 ! one\nrelationship: has_units UO:0000010 ! second\n\n"
+                    "[Typedef]\nid: has_units\nname: has_units\n")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        index = VocabularyIndex.from_ontology(Ontology(str(path), import_depth=0))
+    assert(index['T:2'].units == ('UO:0000010',) and index['T:2'].parents == {'T:1'})
+    assert(index['T:1'].definition.startswith("The first."))